@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from fastapi.responses import FileResponse
 from app.core.db_manager import db_manager
+from app.core.db_switch import db_switch
+from app.core.snapshots import snapshot_service, SNAPSHOT_SUFFIXES
 from app.schemas import DatabaseResponse, ConnectionProfile
 from app.api.auth import get_current_user
 from app.models.auth import User
+import asyncio
 import shutil
 
 router = APIRouter(prefix="/admin/database", tags=["admin"])
@@ -20,36 +23,51 @@ def get_current_db(current_user: User = Depends(get_current_user)):
     )
 
 @router.post("/switch", response_model=DatabaseResponse)
-def switch_db(profile: ConnectionProfile, current_user: User = Depends(get_current_user)):
+async def switch_db(profile: ConnectionProfile, current_user: User = Depends(get_current_user)):
     if current_user.role.name != "Administrator":
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    res = db_manager.switch_database(profile.url)
+    res = await db_switch.switch(profile.url, profile.pool_overrides(), profile.replica_url)
     if not res.status:
         raise HTTPException(status_code=400, detail=res.message)
     
     return res
 
 @router.get("/snapshots")
-def list_snapshots(current_user: User = Depends(get_current_user)):
+async def list_snapshots(current_user: User = Depends(get_current_user)):
     if current_user.role.name != "Administrator":
         raise HTTPException(status_code=403, detail="Not authorized")
-    return db_manager.list_snapshots()
+    return await snapshot_service.list_snapshots()
 
-@router.post("/snapshots")
-def create_snapshot(current_user: User = Depends(get_current_user)):
+@router.post("/snapshots", response_model=DatabaseResponse)
+async def create_snapshot(current_user: User = Depends(get_current_user)):
     if current_user.role.name != "Administrator":
         raise HTTPException(status_code=403, detail="Not authorized")
-    return db_manager.create_snapshot()
+    try:
+        job = await snapshot_service.start_snapshot()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return DatabaseResponse(message=f"Snapshot {job['target']} started", status=True, data=job)
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, current_user: User = Depends(get_current_user)):
+    if current_user.role.name != "Administrator":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    job = await snapshot_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 @router.get("/snapshots/{filename}/download")
-def download_snapshot(filename: str, current_user: User = Depends(get_current_user)):
+async def download_snapshot(filename: str, current_user: User = Depends(get_current_user)):
     if current_user.role.name != "Administrator":
         raise HTTPException(status_code=403, detail="Not authorized")
+    snapshot = await snapshot_service.get_snapshot(filename)
     path = db_manager.get_snapshot_path(filename)
-    if not path.exists():
+    if not snapshot or snapshot["status"] != "ready" or not path.exists():
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(path, filename=filename)
+    # Streamed in chunks; Range requests are honoured so large downloads can resume
+    return FileResponse(path, filename=path.name, media_type="application/octet-stream")
 
 @router.post("/snapshots/upload")
 async def upload_snapshot(file: UploadFile = File(...), current_user: User = Depends(get_current_user)):
@@ -57,13 +75,23 @@ async def upload_snapshot(file: UploadFile = File(...), current_user: User = Dep
         raise HTTPException(status_code=403, detail="Not authorized")
     
     dest = db_manager.get_snapshot_path(file.filename)
-    with dest.open("wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    return {"message": f"Snapshot {file.filename} uploaded", "status": True}
+    if not dest.name.endswith(SNAPSHOT_SUFFIXES):
+        raise HTTPException(status_code=400, detail="Unsupported snapshot file type")
+
+    def save():
+        with dest.open("wb") as buffer:
+            shutil.copyfileobj(file.file, buffer, 1024 * 1024)
+
+    await asyncio.to_thread(save)
+    await snapshot_service.register_upload(dest.name)
+    return {"message": f"Snapshot {dest.name} uploaded", "status": True}
 
-@router.post("/snapshots/{filename}/restore")
-def restore_db(filename: str, current_user: User = Depends(get_current_user)):
+@router.post("/snapshots/{filename}/restore", response_model=DatabaseResponse)
+async def restore_db(filename: str, current_user: User = Depends(get_current_user)):
     if current_user.role.name != "Administrator":
         raise HTTPException(status_code=403, detail="Not authorized")
-    return db_manager.restore_snapshot(filename)
+    try:
+        job = await snapshot_service.start_restore(filename)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return DatabaseResponse(message=f"Restore of {filename} started", status=True, data=job)
@@ -1,84 +1,102 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from app.db.session import get_async_db
+from app.core.reference_cache import reference_cache
+from app.core.http_cache import cached_tag, conditional_get
 from app.models.attribute import Attribute, AttributeValue
 from app.schemas import AttributeCreate, AttributeResponse, AttributeValueCreate, AttributeUpdate, AttributeValueUpdate, AttributeValueResponse
 
 router = APIRouter()
 
+async def get_attribute_with_values(db: AsyncSession, attribute_id) -> Attribute | None:
+    result = await db.execute(
+        select(Attribute)
+        .options(selectinload(Attribute.values))
+        .filter(Attribute.id == attribute_id)
+    )
+    return result.scalars().first()
+
 @router.post("/attributes", response_model=AttributeResponse)
-def create_attribute(payload: AttributeCreate, db: Session = Depends(get_db)):
-    db_attr = db.query(Attribute).filter(Attribute.name == payload.name).first()
-    if db_attr:
+async def create_attribute(payload: AttributeCreate, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Attribute).filter(Attribute.name == payload.name))
+    if result.scalars().first():
         raise HTTPException(status_code=400, detail="Attribute already exists")
     
     attribute = Attribute(name=payload.name)
     db.add(attribute)
-    db.commit()
-    db.refresh(attribute)
+    await db.flush() # Get ID without committing
 
     for v in payload.values:
-        attr_val = AttributeValue(attribute_id=attribute.id, value=v.value)
-        db.add(attr_val)
+        db.add(AttributeValue(attribute_id=attribute.id, value=v.value))
     
-    db.commit()
-    db.refresh(attribute)
-    return attribute
+    reference_cache.bump(db, "attributes")
+    await db.commit()
+    return await get_attribute_with_values(db, attribute.id)
 
 @router.get("/attributes", response_model=list[AttributeResponse])
-def get_attributes(db: Session = Depends(get_db)):
-    return db.query(Attribute).all()
+async def get_attributes(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    attributes = await reference_cache.table(db, "attributes")
+    values = await reference_cache.table(db, "attribute_values")
+    return conditional_get(request, response, cached_tag(attributes, values)) or attributes.rows
 
 @router.put("/attributes/{attribute_id}", response_model=AttributeResponse)
-def update_attribute(attribute_id: str, payload: AttributeUpdate, db: Session = Depends(get_db)):
-    attribute = db.query(Attribute).filter(Attribute.id == attribute_id).first()
+async def update_attribute(attribute_id: str, payload: AttributeUpdate, db: AsyncSession = Depends(get_async_db)):
+    attribute = await get_attribute_with_values(db, attribute_id)
     if not attribute:
         raise HTTPException(status_code=404, detail="Attribute not found")
     
     attribute.name = payload.name
-    db.commit()
-    db.refresh(attribute)
+    reference_cache.bump(db, "attributes")
+    await db.commit()
     return attribute
 
 @router.delete("/attributes/{attribute_id}")
-def delete_attribute(attribute_id: str, db: Session = Depends(get_db)):
-    attribute = db.query(Attribute).filter(Attribute.id == attribute_id).first()
+async def delete_attribute(attribute_id: str, db: AsyncSession = Depends(get_async_db)):
+    # Values must be loaded for the delete-orphan cascade
+    attribute = await get_attribute_with_values(db, attribute_id)
     if not attribute:
         raise HTTPException(status_code=404, detail="Attribute not found")
     
-    db.delete(attribute)
-    db.commit()
+    await db.delete(attribute)
+    reference_cache.bump(db, "attributes")
+    await db.commit()
     return {"status": "success", "message": "Attribute deleted"}
 
 @router.post("/attributes/{attribute_id}/values", response_model=AttributeValueResponse)
-def add_attribute_value(attribute_id: str, payload: AttributeValueCreate, db: Session = Depends(get_db)):
-    attribute = db.query(Attribute).filter(Attribute.id == attribute_id).first()
+async def add_attribute_value(attribute_id: str, payload: AttributeValueCreate, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Attribute).filter(Attribute.id == attribute_id))
+    attribute = result.scalars().first()
     if not attribute:
         raise HTTPException(status_code=404, detail="Attribute not found")
         
     attr_val = AttributeValue(attribute_id=attribute.id, value=payload.value)
     db.add(attr_val)
-    db.commit()
-    db.refresh(attr_val)
+    reference_cache.bump(db, "attributes")
+    await db.commit()
     return attr_val
 
 @router.put("/attributes/values/{value_id}", response_model=AttributeValueResponse)
-def update_attribute_value(value_id: str, payload: AttributeValueUpdate, db: Session = Depends(get_db)):
-    val = db.query(AttributeValue).filter(AttributeValue.id == value_id).first()
+async def update_attribute_value(value_id: str, payload: AttributeValueUpdate, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(AttributeValue).filter(AttributeValue.id == value_id))
+    val = result.scalars().first()
     if not val:
         raise HTTPException(status_code=404, detail="Attribute Value not found")
     
     val.value = payload.value
-    db.commit()
-    db.refresh(val)
+    reference_cache.bump(db, "attributes")
+    await db.commit()
     return val
 
 @router.delete("/attributes/values/{value_id}")
-def delete_attribute_value(value_id: str, db: Session = Depends(get_db)):
-    val = db.query(AttributeValue).filter(AttributeValue.id == value_id).first()
+async def delete_attribute_value(value_id: str, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(AttributeValue).filter(AttributeValue.id == value_id))
+    val = result.scalars().first()
     if not val:
         raise HTTPException(status_code=404, detail="Attribute Value not found")
     
-    db.delete(val)
-    db.commit()
+    await db.delete(val)
+    reference_cache.bump(db, "attributes")
+    await db.commit()
     return {"status": "success", "message": "Value deleted"}
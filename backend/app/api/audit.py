@@ -1,31 +1,33 @@
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from app.db.session import get_async_read_db
 from app.models.audit import AuditLog
-from app.schemas import AuditLogResponse
+from app.schemas import AuditLogResponse, PaginatedAuditLogResponse
 from typing import Optional
 
 router = APIRouter()
 
-from app.schemas import AuditLogResponse, PaginatedAuditLogResponse # Add Paginated schema
-
 @router.get("/audit-logs", response_model=PaginatedAuditLogResponse)
-def get_audit_logs(
+async def get_audit_logs(
     skip: int = 0, 
     limit: int = 100, 
     entity_type: Optional[str] = Query(None),
     entity_id: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    query = db.query(AuditLog)
+    query = select(AuditLog)
     
     if entity_type:
         query = query.filter(AuditLog.entity_type == entity_type)
     if entity_id:
         query = query.filter(AuditLog.entity_id == entity_id)
         
-    total = query.count()
-    items = query.order_by(AuditLog.timestamp.desc()).offset(skip).limit(limit).all()
+    count_result = await db.execute(select(func.count()).select_from(query.subquery()))
+    total = count_result.scalar()
+    
+    result = await db.execute(query.order_by(AuditLog.timestamp.desc()).offset(skip).limit(limit))
+    items = result.scalars().all()
     
     return {
         "items": items,
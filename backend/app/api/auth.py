@@ -2,19 +2,65 @@ from datetime import timedelta
 from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app.db.session import get_db
-from app.models.auth import User, Role
+from itertools import chain
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, event
+from app.db.session import get_async_db
+from app.models.auth import User, Role, Permission
 from app.schemas import UserResponse, RoleResponse, PermissionResponse, UserUpdate
-from app.core.security import verify_password, create_access_token, get_password_hash, ALGORITHM, SECRET_KEY
+from app.core.security import create_access_token, ALGORITHM, SECRET_KEY
+from app.core.kdf_pool import kdf_pool, KDFPoolBusy
+from app.core.cache import TTLCache
+from app.core.invalidation import invalidation_bus
+from app.services import outbox_service
 from jose import JWTError, jwt
+import os
 
 router = APIRouter()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/token")
 
+# --- Authenticated user cache ---
+# Resolved principals (user, role, permissions, allowed_categories) keyed by user id,
+# so authenticated requests skip the user lookup on the hot path.
+user_cache = TTLCache(
+    maxsize=int(os.getenv("AUTH_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("AUTH_CACHE_TTL", "60"))
+)
+invalidation_bus.subscribe("user", user_cache.invalidate)
+
+def invalidate_user(user_id: str | None = None):
+    """Evicts a user (or everyone when None) on this and every other worker."""
+    invalidation_bus.publish("user", str(user_id) if user_id is not None else None)
+
+@event.listens_for(Session, "before_flush")
+def _invalidate_changed_principals(session, flush_context, instances):
+    # Every ORM write to users, roles or permissions (routers, scripts, deletes)
+    # evicts the principals it affects once its transaction commits
+    keys = set()
+    for obj in chain(session.dirty, session.deleted):
+        if isinstance(obj, User):
+            keys.add(str(obj.id))
+        elif isinstance(obj, (Role, Permission)):
+            # Shared by any number of users
+            keys = {None}
+            break
+    for key in keys:
+        outbox_service.enqueue_invalidation(session, "user", key)
+
+async def load_principal(db: AsyncSession, user_id: str) -> UserResponse | None:
+    result = await db.execute(
+        select(User)
+        .options(selectinload(User.role).selectinload(Role.permissions), selectinload(User.permissions))
+        .filter(User.id == user_id)
+        .execution_options(populate_existing=True)
+    )
+    user = result.scalars().first()
+    return UserResponse.model_validate(user) if user else None
+
 # --- Dependencies ---
-def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Session = Depends(get_db)):
+async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: AsyncSession = Depends(get_async_db)) -> UserResponse:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -28,58 +74,87 @@ def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Session
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = user_cache.get(user_id)
     if user is None:
-        raise credentials_exception
+        # AsyncSession only checks out a connection on this cache miss
+        user = await load_principal(db, user_id)
+        if user is None:
+            raise credentials_exception
+        user_cache.set(user_id, user)
     return user
 
-def get_current_active_user(current_user: Annotated[User, Depends(get_current_user)]):
+async def get_current_active_user(current_user: Annotated[UserResponse, Depends(get_current_user)]):
     return current_user
 
 # --- Endpoints ---
 
 @router.post("/token")
-def login_for_access_token(
+async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    result = await db.execute(select(User).filter(User.username == form_data.username))
+    user = result.scalars().first()
+    
+    valid, new_hash = False, None
+    if user:
+        try:
+            # KDF runs on the dedicated pool, never on the event loop or shared threadpool
+            valid, new_hash = await kdf_pool.verify_and_update(form_data.password, user.hashed_password)
+        except KDFPoolBusy:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Login service is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    # Transparently upgrade hashes created with a different cost
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
     
     access_token = create_access_token(subject=user.id)
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/users/me", response_model=UserResponse)
-def read_users_me(current_user: Annotated[User, Depends(get_current_active_user)]):
+async def read_users_me(current_user: Annotated[UserResponse, Depends(get_current_active_user)]):
     return current_user
 
 @router.get("/users", response_model=list[UserResponse])
-def get_users(db: Session = Depends(get_db)):
-    return db.query(User).all()
+async def get_users(db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(
+        select(User).options(selectinload(User.role).selectinload(Role.permissions), selectinload(User.permissions))
+    )
+    return result.scalars().all()
 
 @router.get("/roles", response_model=list[RoleResponse])
-def get_roles(db: Session = Depends(get_db)):
-    return db.query(Role).all()
+async def get_roles(db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Role).options(selectinload(Role.permissions)))
+    return result.scalars().all()
 
 @router.get("/permissions", response_model=list[PermissionResponse])
-def get_permissions(db: Session = Depends(get_db)):
-    from app.models.auth import Permission
-    return db.query(Permission).all()
+async def get_permissions(db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Permission))
+    return result.scalars().all()
 
 @router.put("/users/{user_id}", response_model=UserResponse)
-def update_user(user_id: str, payload: UserUpdate, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def update_user(user_id: str, payload: UserUpdate, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(User).options(selectinload(User.permissions)).filter(User.id == user_id))
+    user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     if payload.username is not None and payload.username != user.username:
         # Check if username exists
-        if db.query(User).filter(User.username == payload.username).first():
+        result = await db.execute(select(User.id).filter(User.username == payload.username))
+        if result.first():
             raise HTTPException(status_code=400, detail="Username already taken")
         user.username = payload.username
 
@@ -87,19 +162,22 @@ def update_user(user_id: str, payload: UserUpdate, db: Session = Depends(get_db)
         user.full_name = payload.full_name
     
     if payload.role_id is not None:
-        role = db.query(Role).filter(Role.id == payload.role_id).first()
-        if not role:
+        result = await db.execute(select(Role.id).filter(Role.id == payload.role_id))
+        if not result.first():
             raise HTTPException(status_code=400, detail="Role not found")
         user.role_id = payload.role_id
 
     if payload.password is not None:
-        user.hashed_password = get_password_hash(payload.password)
+        try:
+            user.hashed_password = await kdf_pool.hash(payload.password)
+        except KDFPoolBusy:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Password service is busy, please retry")
 
     if payload.permission_ids is not None:
-        from app.models.auth import Permission
-        perms = db.query(Permission).filter(Permission.id.in_(payload.permission_ids)).all()
-        user.permissions = perms
+        result = await db.execute(select(Permission).filter(Permission.id.in_(payload.permission_ids)))
+        user.permissions = result.scalars().all()
         
-    db.commit()
-    db.refresh(user)
-    return user
\ No newline at end of file
+    await db.commit()
+
+    principal = await load_principal(db, user.id)
+    return principal
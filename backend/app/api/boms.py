@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import select
@@ -6,113 +6,52 @@ from sqlalchemy.orm import selectinload, joinedload
 from app.db.session import get_async_db
 from app.models.bom import BOM, BOMLine, BOMOperation
 from app.models.item import Item
-from app.models.location import Location
-from app.models.routing import WorkCenter, Operation
-from app.schemas import BOMCreate, BOMResponse
+from app.schemas import BOMCreate, BOMResponse, ImportJobResponse
 from app.models.auth import User
 from app.api.auth import get_current_user
-from app.services import audit_service
-from app.models.attribute import AttributeValue
+from app.services import audit_service, bom_service
+from app.api.imports import enqueue_import
+from app.core.http_cache import table_tag, conditional_get
 
 router = APIRouter()
 
 @router.post("/boms", response_model=BOMResponse)
 async def create_bom(payload: BOMCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
-    # 1. Resolve Produced Item
-    result = await db.execute(select(Item).filter(Item.code == payload.item_code))
-    item = result.scalars().first()
-    if not item:
-        raise HTTPException(status_code=404, detail=f"Produced item '{payload.item_code}' not found")
-    
-    # 2. Check if BOM code exists
-    result = await db.execute(select(BOM).filter(BOM.code == payload.code))
-    if result.scalars().first():
-        raise HTTPException(status_code=400, detail="BOM Code already exists")
-
-    # 3. Create BOM Header
-    bom = BOM(
-        code=payload.code,
-        description=payload.description,
-        item_id=item.id,
-        qty=payload.qty
-    )
-    
-    if payload.attribute_value_ids:
-        result = await db.execute(select(AttributeValue).filter(AttributeValue.id.in_(payload.attribute_value_ids)))
-        vals = result.scalars().all()
-        bom.attribute_values = vals
-
-    db.add(bom)
-    await db.commit()
-
-    # 4. Create BOM Lines
-    for line in payload.lines:
-        result = await db.execute(select(Item).filter(Item.code == line.item_code))
-        material = result.scalars().first()
-        if not material:
-            raise HTTPException(status_code=404, detail=f"Material item '{line.item_code}' not found")
-        
-        bom_line = BOMLine(
-            bom_id=bom.id,
-            item_id=material.id,
-            qty=line.qty
-        )
-        
-        # Resolve source location if provided
-        if line.source_location_code:
-            result = await db.execute(select(Location).filter(Location.code == line.source_location_code))
-            loc = result.scalars().first()
-            if not loc:
-                raise HTTPException(status_code=404, detail=f"Source Location '{line.source_location_code}' not found")
-            bom_line.source_location_id = loc.id
-        
-        if line.attribute_value_ids:
-            result = await db.execute(select(AttributeValue).filter(AttributeValue.id.in_(line.attribute_value_ids)))
-            vals = result.scalars().all()
-            bom_line.attribute_values = vals
+    try:
+        bom = await bom_service.create_bom(db, payload)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="BOM Code already exists or references an unknown operation")
 
-        db.add(bom_line)
-    
-    await db.commit()
-    
-    # Re-fetch with FULL eager loading for serialization
-    result = await db.execute(
-        select(BOM)
-        .options(
-            joinedload(BOM.item), 
-            selectinload(BOM.attribute_values), 
-            selectinload(BOM.lines).joinedload(BOMLine.item), 
-            selectinload(BOM.lines).selectinload(BOMLine.attribute_values),
-            selectinload(BOM.operations)
-        )
-        .filter(BOM.id == bom.id)
-    )
-    refresh_bom = result.scalars().first()
-    
     await audit_service.log_activity(
         db,
         user_id=current_user.id,
         action="CREATE",
         entity_type="BOM",
-        entity_id=str(refresh_bom.id),
-        details=f"Created BOM {refresh_bom.code} for {item.code}",
+        entity_id=str(bom.id),
+        details=f"Created BOM {bom.code} for {bom.item.code}",
         changes=payload.dict()
     )
-    
-    # Pydantic picks up @property fields automatically via from_attributes
-    refresh_bom.attribute_value_ids = [v.id for v in refresh_bom.attribute_values]
-    for bl in refresh_bom.lines:
-        bl.attribute_value_ids = [v.id for v in bl.attribute_values]
-    
-    return refresh_bom
+    return bom
+
+@router.post("/boms/import", response_model=ImportJobResponse, status_code=202)
+async def import_boms(file: UploadFile = File(...), db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    # CSV (one row per line) or a JSON list of BOMs, queued as a "boms" import job
+    return await enqueue_import(db, "boms", file, current_user, suffixes=(".csv", ".json"))
 
 @router.get("/boms", response_model=list[BOMResponse])
-async def get_boms(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+async def get_boms(request: Request, response: Response, skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    # BOM responses embed their lines and operations and item codes and names, so those count too
+    not_modified = conditional_get(request, response, await table_tag(db, BOM, BOMLine, BOMOperation, Item), current_user.allowed_categories)
+    if not_modified:
+        return not_modified
     query = select(BOM).options(
         joinedload(BOM.item),
-        selectinload(BOM.attribute_values), 
         selectinload(BOM.lines).joinedload(BOMLine.item),
-        selectinload(BOM.lines).selectinload(BOMLine.attribute_values),
         selectinload(BOM.operations)
     )
     
@@ -120,13 +59,7 @@ async def get_boms(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(g
         query = query.join(Item, BOM.item_id == Item.id).filter(Item.category.in_(current_user.allowed_categories))
         
     result = await db.execute(query.offset(skip).limit(limit))
-    items_list = result.unique().scalars().all()
-    
-    for item in items_list:
-        item.attribute_value_ids = [v.id for v in item.attribute_values]
-        for bl in item.lines:
-            bl.attribute_value_ids = [v.id for v in bl.attribute_values]
-    return items_list
+    return result.unique().scalars().all()
 
 @router.get("/boms/{bom_id}", response_model=BOMResponse)
 async def get_bom(bom_id: str, db: AsyncSession = Depends(get_async_db)):
@@ -134,9 +67,7 @@ async def get_bom(bom_id: str, db: AsyncSession = Depends(get_async_db)):
         select(BOM)
         .options(
             joinedload(BOM.item),
-            selectinload(BOM.attribute_values), 
             selectinload(BOM.lines).joinedload(BOMLine.item),
-            selectinload(BOM.lines).selectinload(BOMLine.attribute_values),
             selectinload(BOM.operations)
         )
         .filter(BOM.id == bom_id)
@@ -144,11 +75,6 @@ async def get_bom(bom_id: str, db: AsyncSession = Depends(get_async_db)):
     bom = result.scalars().first()
     if not bom:
         raise HTTPException(status_code=404, detail="BOM not found")
-    
-    bom.attribute_value_ids = [v.id for v in bom.attribute_values]
-    for bl in bom.lines:
-        bl.attribute_value_ids = [v.id for v in bl.attribute_values]
-        
     return bom
 
 @router.delete("/boms/{bom_id}")
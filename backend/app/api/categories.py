@@ -1,32 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.db.session import get_async_db
+from app.core.reference_cache import reference_cache
+from app.core.http_cache import cached_tag, conditional_get
 from app.models.category import Category
 from app.schemas import CategoryCreate, CategoryResponse
 
 router = APIRouter()
 
 @router.post("/categories", response_model=CategoryResponse)
-def create_category(payload: CategoryCreate, db: Session = Depends(get_db)):
-    if db.query(Category).filter(Category.name == payload.name).first():
+async def create_category(payload: CategoryCreate, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Category).filter(Category.name == payload.name))
+    if result.scalars().first():
         raise HTTPException(status_code=400, detail="Category already exists")
     
     category = Category(name=payload.name)
     db.add(category)
-    db.commit()
-    db.refresh(category)
+    reference_cache.bump(db, "categories")
+    await db.commit()
     return category
 
 @router.get("/categories", response_model=list[CategoryResponse])
-def get_categories(db: Session = Depends(get_db)):
-    return db.query(Category).all()
+async def get_categories(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    table = await reference_cache.table(db, "categories")
+    return conditional_get(request, response, cached_tag(table)) or table.rows
 
 @router.delete("/categories/{category_id}")
-def delete_category(category_id: str, db: Session = Depends(get_db)):
-    category = db.query(Category).filter(Category.id == category_id).first()
+async def delete_category(category_id: str, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Category).filter(Category.id == category_id))
+    category = result.scalars().first()
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     
-    db.delete(category)
-    db.commit()
+    await db.delete(category)
+    reference_cache.bump(db, "categories")
+    await db.commit()
     return {"status": "success", "message": "Category deleted"}
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_async_db, get_async_read_db
 from app.services import kpi_service
 from app.api.auth import get_current_user
 from app.models.auth import User
@@ -8,11 +8,15 @@ from app.models.auth import User
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
 @router.get("/kpis")
-def get_dashboard_kpis(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    # You can choose to refresh if data is old, or just return cache
-    return kpi_service.get_all_cached_kpis(db)
+async def get_dashboard_kpis(
+    db: AsyncSession = Depends(get_async_db),
+    read_db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    # Served from the replica; only a stale cache touches the primary (to write the refresh)
+    return await kpi_service.get_all_cached_kpis(db, read_db=read_db)
 
 @router.post("/kpis/refresh")
-def refresh_kpis(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    kpi_service.refresh_all_kpis(db)
+async def refresh_kpis(db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    await kpi_service.refresh_all_kpis(db)
     return {"status": "success"}
@@ -0,0 +1,50 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_async_db
+from app.services import import_service, import_job_service
+from app.core.import_worker import import_worker
+from app.schemas import ImportJobResponse
+from app.models.auth import User
+from app.api.auth import get_current_user
+
+router = APIRouter()
+
+async def enqueue_import(db: AsyncSession, kind: str, file: UploadFile, user: User | None = None, suffixes: tuple[str, ...] = (".csv",)):
+    if not file.filename.lower().endswith(suffixes):
+        raise HTTPException(status_code=400, detail=f"Invalid file type. Please upload a {' or '.join(s[1:].upper() for s in suffixes)}.")
+    if import_service.get_importer(kind) is None:
+        raise HTTPException(status_code=400, detail=f"Unknown import type '{kind}'")
+
+    # The upload is spooled to disk and processed by the import worker
+    job = await import_job_service.create_job(db, kind, file.filename, file.file, user.id if user else None)
+    import_worker.notify()
+    return job
+
+@router.post("/imports", response_model=ImportJobResponse, status_code=202)
+async def create_import(
+    kind: str = Query(...),
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    return await enqueue_import(db, kind, file, current_user)
+
+@router.get("/imports", response_model=List[ImportJobResponse])
+async def list_imports(limit: int = 50, db: AsyncSession = Depends(get_async_db)):
+    return await import_job_service.list_jobs(db, limit)
+
+@router.get("/imports/templates/{kind}")
+def download_template(kind: str):
+    if import_service.get_importer(kind) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown import type '{kind}'")
+    content = import_service.generate_template(kind)
+    return Response(content=content, media_type="text/csv", headers={"Content-Disposition": f"attachment; filename={kind}_template.csv"})
+
+@router.get("/imports/{job_id}", response_model=ImportJobResponse)
+async def get_import(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    job = await import_job_service.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
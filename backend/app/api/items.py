@@ -1,14 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request
 from fastapi.responses import Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from asyncpg.exceptions import ForeignKeyViolationError
 from app.db.session import get_async_db
 from app.services import item_service, stock_service, import_service, audit_service
-from app.schemas import ItemCreate, ItemResponse, StockEntryCreate, ItemUpdate, VariantCreate, PaginatedItemResponse
-from app.models.location import Location
+from app.schemas import ItemCreate, ItemResponse, StockEntryCreate, ItemUpdate, VariantCreate, PaginatedItemResponse, ImportJobResponse, ItemSuggestion
 from app.models.auth import User
 from app.api.auth import get_current_user
+from app.api.imports import enqueue_import
+from app.core.reference_cache import reference_cache
+from app.core.http_cache import table_tag, conditional_get
+from app.models.item import Item
 from sqlalchemy import select
 
 router = APIRouter()
@@ -43,6 +46,8 @@ async def create_item_api(payload: ItemCreate, db: AsyncSession = Depends(get_as
 
 @router.get("/items", response_model=PaginatedItemResponse)
 async def get_items_api(
+    request: Request,
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
     search: str | None = None,
@@ -50,7 +55,10 @@ async def get_items_api(
     db: AsyncSession = Depends(get_async_db), 
     current_user: User = Depends(get_current_user)
 ):
-    items, total = await item_service.get_items(db, skip=skip, limit=limit, user=current_user, search=search, category=category)
+    not_modified = conditional_get(request, response, await table_tag(db, Item), current_user.allowed_categories)
+    if not_modified:
+        return not_modified
+    items, total, total_capped = await item_service.get_items(db, skip=skip, limit=limit, user=current_user, search=search, category=category)
     # Populate attribute_ids for response
     for item in items:
         item.attribute_ids = [a.id for a in item.attributes]
@@ -59,9 +67,20 @@ async def get_items_api(
         "items": items,
         "total": total,
         "page": (skip // limit) + 1,
-        "size": len(items)
+        "size": len(items),
+        "total_capped": total_capped
     }
 
+@router.get("/items/suggest", response_model=list[ItemSuggestion])
+async def suggest_items_api(
+    q: str,
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    # Type-ahead: id, code and name only, code prefixes first
+    return await item_service.suggest_items(db, q, limit=limit, user=current_user)
+
 @router.put("/items/{item_id}", response_model=ItemResponse)
 async def update_item_api(item_id: str, payload: ItemUpdate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     item = await item_service.update_item(db, item_id, payload.dict(exclude_unset=True))
@@ -88,20 +107,16 @@ async def add_stock_api(payload: StockEntryCreate, db: AsyncSession = Depends(ge
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
 
-    # Resolve Location
-    result = await db.execute(select(Location).filter(Location.code == payload.location_code))
-    location = result.scalars().first()
+    # Location and attribute values are dictionary hits in the reference cache
+    location = await reference_cache.lookup(db, "locations", payload.location_code)
     if not location:
         raise HTTPException(status_code=404, detail="Location not found")
 
-    # Validate Attribute Values if provided
     if payload.attribute_value_ids:
-        from app.models.attribute import AttributeValue
-        valid_attr_ids = [a.id for a in item.attributes]
-        
+        values = await reference_cache.table(db, "attribute_values", ids=payload.attribute_value_ids)
+        valid_attr_ids = {a.id for a in item.attributes}
         for val_id in payload.attribute_value_ids:
-            result = await db.execute(select(AttributeValue).filter(AttributeValue.id == val_id))
-            val = result.scalars().first()
+            val = values.get(val_id)
             if not val or val.attribute_id not in valid_attr_ids:
                  raise HTTPException(status_code=400, detail=f"Invalid attribute value {val_id} for this item")
 
@@ -133,18 +148,10 @@ async def get_items_template():
     content = import_service.generate_items_template()
     return Response(content=content, media_type="text/csv", headers={"Content-Disposition": "attachment; filename=items_template.csv"})
 
-@router.post("/items/import")
-async def import_items(file: UploadFile = File(...), db: AsyncSession = Depends(get_async_db)):
-    if not file.filename.endswith(".csv"):
-        raise HTTPException(status_code=400, detail="Invalid file type. Please upload a CSV.")
-    
-    content = await file.read()
-    results = await import_service.import_items_csv(db, content)
-    
-    if results["errors"]:
-        return {"status": "partial_success", "imported": results["success"], "errors": results["errors"]}
-    
-    return {"status": "success", "imported": results["success"]}
+@router.post("/items/import", response_model=ImportJobResponse, status_code=202)
+async def import_items(file: UploadFile = File(...), db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    # Queued as an import job; poll /imports/{id} or listen for IMPORT_PROGRESS events
+    return await enqueue_import(db, "items", file, current_user)
 
 @router.delete("/items/{item_id}")
 async def delete_item(item_id: str, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
@@ -1,15 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.db.session import get_async_db
+from app.core.reference_cache import reference_cache
+from app.core.http_cache import cached_tag, conditional_get
 from app.models.location import Location
 from app.schemas import LocationCreate, LocationResponse
 
 router = APIRouter()
 
 @router.post("/locations", response_model=LocationResponse)
-def create_location(payload: LocationCreate, db: Session = Depends(get_db)):
-    db_location = db.query(Location).filter(Location.code == payload.code).first()
-    if db_location:
+async def create_location(payload: LocationCreate, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Location).filter(Location.code == payload.code))
+    if result.scalars().first():
         raise HTTPException(status_code=400, detail="Location already exists")
     
     new_location = Location(
@@ -17,20 +20,23 @@ def create_location(payload: LocationCreate, db: Session = Depends(get_db)):
         name=payload.name
     )
     db.add(new_location)
-    db.commit()
-    db.refresh(new_location)
+    reference_cache.bump(db, "locations")
+    await db.commit()
     return new_location
 
 @router.get("/locations", response_model=list[LocationResponse])
-def get_locations(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return db.query(Location).offset(skip).limit(limit).all()
+async def get_locations(request: Request, response: Response, skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+    table = await reference_cache.table(db, "locations")
+    return conditional_get(request, response, cached_tag(table)) or table.rows[skip:skip + limit]
 
 @router.delete("/locations/{location_id}")
-def delete_location(location_id: str, db: Session = Depends(get_db)):
-    location = db.query(Location).filter(Location.id == location_id).first()
+async def delete_location(location_id: str, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Location).filter(Location.id == location_id))
+    location = result.scalars().first()
     if not location:
         raise HTTPException(status_code=404, detail="Location not found")
     
-    db.delete(location)
-    db.commit()
+    await db.delete(location)
+    reference_cache.bump(db, "locations")
+    await db.commit()
     return {"status": "success", "message": "Location deleted"}
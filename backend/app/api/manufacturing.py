@@ -2,85 +2,62 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, or_, inspect
 from sqlalchemy.orm import selectinload, joinedload, attributes as sa_attributes
-from app.db.session import get_async_db
+from app.db.session import get_async_db, get_async_read_db
 from app.models.manufacturing import WorkOrder
 from app.models.bom import BOM, BOMLine
-from app.models.location import Location
+from app.core.reference_cache import reference_cache
 from app.models.sales import SalesOrder
-from app.services import stock_service, audit_service
+from app.services import stock_service, audit_service, outbox_service
 from app.schemas import WorkOrderCreate, WorkOrderResponse, PaginatedWorkOrderResponse
 from app.models.auth import User
 from app.api.auth import get_current_user
 from app.models.item import Item
 from datetime import datetime
 from typing import Optional
-from app.core.ws_manager import manager
+from app.core.outbox_relay import outbox_relay
 import uuid
 
 router = APIRouter()
 
 # Helper for consistent eager loading
+# attribute_value_ids are columns on WorkOrder and BOMLine, so no attribute_values loads are needed
 def get_wo_options():
     # Base relationships for the main WO
     options = [
         selectinload(WorkOrder.item),
-        selectinload(WorkOrder.attribute_values),
         selectinload(WorkOrder.bom).selectinload(BOM.item),
-        selectinload(WorkOrder.bom).selectinload(BOM.attribute_values),
         selectinload(WorkOrder.bom).selectinload(BOM.operations),
-        selectinload(WorkOrder.bom).selectinload(BOM.lines).selectinload(BOMLine.item),
-        selectinload(WorkOrder.bom).selectinload(BOM.lines).selectinload(BOMLine.attribute_values)
+        selectinload(WorkOrder.bom).selectinload(BOM.lines).selectinload(BOMLine.item)
     ]
     
     # Sub-relationships for children (Level 1)
     child_rel = selectinload(WorkOrder.child_wos)
     options.append(child_rel.selectinload(WorkOrder.item))
-    options.append(child_rel.selectinload(WorkOrder.attribute_values))
     
     # Fully load BOM for children to avoid serialization errors
     child_bom = child_rel.selectinload(WorkOrder.bom)
     options.append(child_bom.selectinload(BOM.item))
-    options.append(child_bom.selectinload(BOM.attribute_values))
     options.append(child_bom.selectinload(BOM.operations))
     options.append(child_bom.selectinload(BOM.lines).selectinload(BOMLine.item))
-    options.append(child_bom.selectinload(BOM.lines).selectinload(BOMLine.attribute_values))
     
     # Support deeper levels if needed (Level 2)
     gchild_rel = child_rel.selectinload(WorkOrder.child_wos)
     options.append(gchild_rel.selectinload(WorkOrder.item))
-    options.append(gchild_rel.selectinload(WorkOrder.attribute_values))
     
     gchild_bom = gchild_rel.selectinload(WorkOrder.bom)
     options.append(gchild_bom.selectinload(BOM.item))
-    options.append(gchild_bom.selectinload(BOM.attribute_values))
     options.append(gchild_bom.selectinload(BOM.operations))
     options.append(gchild_bom.selectinload(BOM.lines).selectinload(BOMLine.item))
-    options.append(gchild_bom.selectinload(BOM.lines).selectinload(BOMLine.attribute_values))
     
     return options
 
-def populate_wo_ids(wo: WorkOrder):
-    """Recursively populate attribute_value_ids for WO and its children safely."""
+def stub_unloaded_children(wo: WorkOrder):
+    """Recursively stubs child_wos that were not eager-loaded as []."""
     # Use inspection to avoid triggering lazy loads in async context
     insp = inspect(wo)
-    
-    # 1. Populate Attribute Values (if loaded)
-    if "attribute_values" not in insp.unloaded:
-        wo.attribute_value_ids = [v.id for v in wo.attribute_values]
-    
-    # 2. Populate BOM IDs (if loaded)
-    if "bom" not in insp.unloaded and wo.bom:
-        bom_insp = inspect(wo.bom)
-        if "lines" not in bom_insp.unloaded:
-            for bl in wo.bom.lines:
-                bl_insp = inspect(bl)
-                if "attribute_values" not in bl_insp.unloaded:
-                    bl.attribute_value_ids = [v.id for v in bl.attribute_values]
-    
-    # 3. Recurse into children (if loaded); stub unloaded child_wos as []
     if "child_wos" not in insp.unloaded:
         for child in wo.child_wos:
-            populate_wo_ids(child)
+            stub_unloaded_children(child)
     else:
         # Prevent Pydantic from triggering a lazy-load in async context
         sa_attributes.set_committed_value(wo, "child_wos", [])
@@ -100,7 +77,7 @@ async def create_wo_recursive(
     # 1. Fetch BOM with lines
     result = await db.execute(
         select(BOM)
-        .options(selectinload(BOM.lines), selectinload(BOM.attribute_values))
+        .options(selectinload(BOM.lines))
         .filter(BOM.id == bom_id)
     )
     bom = result.scalars().first()
@@ -126,7 +103,7 @@ async def create_wo_recursive(
         target_end_date=target_end_date,
         status="PENDING"
     )
-    wo.attribute_values = bom.attribute_values
+    wo.attribute_values = await reference_cache.attribute_values(db, bom.attribute_value_ids)
     db.add(wo)
     await db.flush() # Get ID without committing
 
@@ -167,8 +144,7 @@ async def create_work_order(payload: WorkOrderCreate, db: AsyncSession = Depends
     if not bom:
         raise HTTPException(status_code=404, detail="BOM not found")
 
-    result = await db.execute(select(Location).filter(Location.code == payload.location_code))
-    location = result.scalars().first()
+    location = await reference_cache.lookup(db, "locations", payload.location_code)
     if not location:
         raise HTTPException(status_code=404, detail="Location not found")
 
@@ -210,11 +186,8 @@ async def create_work_order(payload: WorkOrderCreate, db: AsyncSession = Depends
             target_end_date=payload.target_end_date,
             status="PENDING"
         )
-        # Load attributes from BOM
-        result = await db.execute(select(BOM).filter(BOM.id == payload.bom_id).options(selectinload(BOM.attribute_values)))
-        bom_with_attrs = result.scalars().first()
-        if bom_with_attrs:
-            wo.attribute_values = bom_with_attrs.attribute_values
+        # Attributes from the BOM
+        wo.attribute_values = await reference_cache.attribute_values(db, bom.attribute_value_ids)
 
         db.add(wo)
         await db.commit()
@@ -228,13 +201,6 @@ async def create_work_order(payload: WorkOrderCreate, db: AsyncSession = Depends
     wo = result.unique().scalars().first()
     
     await audit_service.log_activity(db, current_user.id, "CREATE", "WorkOrder", str(wo.id), f"Created {'Nested' if payload.create_nested else 'Single'} WO {wo.code}")
-    
-    # Populate IDs for response
-    wo.attribute_value_ids = [v.id for v in wo.attribute_values]
-    if wo.bom and wo.bom.lines:
-        for bl in wo.bom.lines:
-            bl.attribute_value_ids = [v.id for v in bl.attribute_values]
-
     return wo
 
 @router.get("/work-orders/available-code")
@@ -258,7 +224,7 @@ async def get_work_orders(
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
     all_levels: bool = False, # New flag to include children in the flat list if desired
-    db: AsyncSession = Depends(get_async_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: User = Depends(get_current_user)
 ):
     query = select(WorkOrder)
@@ -288,7 +254,7 @@ async def get_work_orders(
 
     requirements = []
     for item in items_list:
-        populate_wo_ids(item)
+        stub_unloaded_children(item)
 
         if item.status == "PENDING" and item.bom:
             for line in item.bom.lines:
@@ -296,7 +262,7 @@ async def get_work_orders(
                 requirements.append({
                     "item_id": line.item_id,
                     "location_id": check_loc_id,
-                    "attribute_value_ids": [str(v.id) for v in line.attribute_values]
+                    "variant_id": line.variant_id
                 })
     
     balances_map = await stock_service.get_batch_stock_balances(db, requirements) if requirements else {}
@@ -311,8 +277,7 @@ async def get_work_orders(
                 if tol > 0: req *= (1 + (tol / 100))
 
                 check_loc_id = line.source_location_id or item.source_location_id or item.location_id
-                v_key = ",".join(sorted([str(v.id) for v in line.attribute_values]))
-                key = (str(line.item_id), str(check_loc_id), v_key)
+                key = (str(line.item_id), str(check_loc_id), line.variant_id)
                 if balances_map.get(key, 0) < req:
                     item.is_material_available = False
                     break
@@ -349,7 +314,7 @@ async def update_work_order_status(wo_id: str, status: str, db: AsyncSession = D
                 if tol > 0: req *= (1 + (tol / 100))
                 
                 check_loc_id = line.source_location_id or wo.source_location_id or wo.location_id
-                stock = await stock_service.get_stock_balance(db, line.item_id, check_loc_id, [v.id for v in line.attribute_values])
+                stock = await stock_service.get_stock_balance(db, line.item_id, check_loc_id, line.attribute_value_ids)
                 if stock < req:
                     raise HTTPException(status_code=400, detail=f"Insufficient stock for component {line.item_id}")
         
@@ -374,7 +339,7 @@ async def update_work_order_status(wo_id: str, status: str, db: AsyncSession = D
                     qty_change=-req, 
                     reference_type="Work Order", 
                     reference_id=wo.code, 
-                    attribute_value_ids=[v.id for v in line.attribute_values]
+                    attribute_value_ids=line.attribute_value_ids
                 )
         
         # 2. ADD Finished Goods
@@ -385,7 +350,7 @@ async def update_work_order_status(wo_id: str, status: str, db: AsyncSession = D
             qty_change=wo.qty, 
             reference_type="Work Order", 
             reference_id=wo.code, 
-            attribute_value_ids=[v.id for v in wo.attribute_values]
+            attribute_value_ids=wo.attribute_value_ids
         )
 
         # 3. UPDATE Sales Order status if root WO
@@ -397,10 +362,19 @@ async def update_work_order_status(wo_id: str, status: str, db: AsyncSession = D
                 await audit_service.log_activity(db, current_user.id, "STATUS_CHANGE", "SalesOrder", str(so.id), f"Ready by root WO {wo.code}")
 
     wo.status = status
+    # Event is committed atomically with the status change and relayed afterwards
+    outbox_service.enqueue(db, "WORK_ORDER_UPDATE", {
+        "wo_id": wo_id,
+        "status": status,
+        "previous_status": previous_status,
+        "code": wo.code,
+        "actual_start_date": wo.actual_start_date,
+        "actual_end_date": wo.actual_end_date
+    })
     await db.commit()
+    outbox_relay.notify()
     
     await audit_service.log_activity(db, current_user.id, "UPDATE_STATUS", "WorkOrder", wo_id, f"{previous_status} -> {status}")
-    await manager.broadcast({"type": "WORK_ORDER_UPDATE", "wo_id": wo_id, "status": status, "code": wo.code})
     
     return {"status": "success", "message": f"Updated to {status}"}
 
@@ -1,17 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.db.session import get_async_db
 from app.schemas import PartnerCreate, PartnerResponse, PartnerUpdate
 from app.models.partner import Partner
 from app.api.auth import get_current_user
 from app.models.auth import User
+from app.core.http_cache import table_tag, conditional_get
 from typing import List, Optional
 import uuid
 
 router = APIRouter(prefix="/partners", tags=["partners"])
 
 @router.post("", response_model=PartnerResponse)
-def create_partner(payload: PartnerCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def create_partner(payload: PartnerCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     partner = Partner(
         name=payload.name,
         address=payload.address,
@@ -19,20 +21,24 @@ def create_partner(payload: PartnerCreate, db: Session = Depends(get_db), curren
         active=payload.active
     )
     db.add(partner)
-    db.commit()
-    db.refresh(partner)
+    await db.commit()
     return partner
 
 @router.get("", response_model=List[PartnerResponse])
-def get_partners(type: Optional[str] = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    query = db.query(Partner)
+async def get_partners(request: Request, response: Response, type: Optional[str] = None, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    not_modified = conditional_get(request, response, await table_tag(db, Partner))
+    if not_modified:
+        return not_modified
+    query = select(Partner)
     if type:
         query = query.filter(Partner.type == type)
-    return query.all()
+    result = await db.execute(query)
+    return result.scalars().all()
 
 @router.put("/{partner_id}", response_model=PartnerResponse)
-def update_partner(partner_id: uuid.UUID, payload: PartnerUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    partner = db.query(Partner).filter(Partner.id == partner_id).first()
+async def update_partner(partner_id: uuid.UUID, payload: PartnerUpdate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    result = await db.execute(select(Partner).filter(Partner.id == partner_id))
+    partner = result.scalars().first()
     if not partner:
         raise HTTPException(status_code=404, detail="Partner not found")
     
@@ -40,16 +46,16 @@ def update_partner(partner_id: uuid.UUID, payload: PartnerUpdate, db: Session =
     for key, value in update_data.items():
         setattr(partner, key, value)
     
-    db.commit()
-    db.refresh(partner)
+    await db.commit()
     return partner
 
 @router.delete("/{partner_id}")
-def delete_partner(partner_id: uuid.UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    partner = db.query(Partner).filter(Partner.id == partner_id).first()
+async def delete_partner(partner_id: uuid.UUID, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    result = await db.execute(select(Partner).filter(Partner.id == partner_id))
+    partner = result.scalars().first()
     if not partner:
         raise HTTPException(status_code=404, detail="Partner not found")
     
-    db.delete(partner)
-    db.commit()
+    await db.delete(partner)
+    await db.commit()
     return {"status": "success"}
@@ -49,7 +49,7 @@ async def create_purchase_order(payload: PurchaseOrderCreate, db: AsyncSession =
     # Refresh with eager loading
     final_result = await db.execute(
         select(PurchaseOrder)
-        .options(selectinload(PurchaseOrder.lines).selectinload(PurchaseOrderLine.attribute_values))
+        .options(selectinload(PurchaseOrder.lines))
         .filter(PurchaseOrder.id == po.id)
     )
     return final_result.scalars().first()
@@ -58,7 +58,7 @@ async def create_purchase_order(payload: PurchaseOrderCreate, db: AsyncSession =
 async def receive_purchase_order(po_id: uuid.UUID, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     result = await db.execute(
         select(PurchaseOrder)
-        .options(selectinload(PurchaseOrder.lines).selectinload(PurchaseOrderLine.attribute_values))
+        .options(selectinload(PurchaseOrder.lines))
         .filter(PurchaseOrder.id == po_id)
     )
     po = result.scalars().first()
@@ -78,7 +78,7 @@ async def receive_purchase_order(po_id: uuid.UUID, db: AsyncSession = Depends(ge
             db,
             item_id=line.item_id,
             location_id=po.target_location_id,
-            attribute_value_ids=[str(v.id) for v in line.attribute_values],
+            attribute_value_ids=line.attribute_value_ids,
             qty_change=line.qty,
             reference_type="Purchase Order",
             reference_id=po.po_number
@@ -102,7 +102,7 @@ async def receive_purchase_order(po_id: uuid.UUID, db: AsyncSession = Depends(ge
 async def get_purchase_orders(db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     result = await db.execute(
         select(PurchaseOrder)
-        .options(selectinload(PurchaseOrder.lines).selectinload(PurchaseOrderLine.attribute_values))
+        .options(selectinload(PurchaseOrder.lines))
         .order_by(PurchaseOrder.created_at.desc())
     )
     return result.scalars().all()
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.db.session import get_async_db
+from app.core.reference_cache import reference_cache
 from app.models.routing import WorkCenter, Operation
 from app.schemas import WorkCenterCreate, WorkCenterResponse, OperationCreate, OperationResponse
 
@@ -8,8 +10,9 @@ router = APIRouter()
 
 # --- Work Centers ---
 @router.post("/work-centers", response_model=WorkCenterResponse)
-def create_work_center(payload: WorkCenterCreate, db: Session = Depends(get_db)):
-    if db.query(WorkCenter).filter(WorkCenter.code == payload.code).first():
+async def create_work_center(payload: WorkCenterCreate, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(WorkCenter).filter(WorkCenter.code == payload.code))
+    if result.scalars().first():
         raise HTTPException(status_code=400, detail="Work Center Code already exists")
     
     wc = WorkCenter(
@@ -19,27 +22,30 @@ def create_work_center(payload: WorkCenterCreate, db: Session = Depends(get_db))
         cost_per_hour=payload.cost_per_hour
     )
     db.add(wc)
-    db.commit()
-    db.refresh(wc)
+    reference_cache.bump(db, "work_centers")
+    await db.commit()
     return wc
 
 @router.get("/work-centers", response_model=list[WorkCenterResponse])
-def get_work_centers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return db.query(WorkCenter).offset(skip).limit(limit).all()
+async def get_work_centers(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+    return (await reference_cache.table(db, "work_centers")).rows[skip:skip + limit]
 
 @router.delete("/work-centers/{wc_id}")
-def delete_work_center(wc_id: str, db: Session = Depends(get_db)):
-    wc = db.query(WorkCenter).filter(WorkCenter.id == wc_id).first()
+async def delete_work_center(wc_id: str, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(WorkCenter).filter(WorkCenter.id == wc_id))
+    wc = result.scalars().first()
     if not wc:
         raise HTTPException(status_code=404, detail="Work Center not found")
-    db.delete(wc)
-    db.commit()
+    await db.delete(wc)
+    reference_cache.bump(db, "work_centers")
+    await db.commit()
     return {"status": "success", "message": "Work Center deleted"}
 
 # --- Operations ---
 @router.post("/operations", response_model=OperationResponse)
-def create_operation(payload: OperationCreate, db: Session = Depends(get_db)):
-    if db.query(Operation).filter(Operation.code == payload.code).first():
+async def create_operation(payload: OperationCreate, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Operation).filter(Operation.code == payload.code))
+    if result.scalars().first():
         raise HTTPException(status_code=400, detail="Operation Code already exists")
     
     op = Operation(
@@ -48,19 +54,21 @@ def create_operation(payload: OperationCreate, db: Session = Depends(get_db)):
         description=payload.description
     )
     db.add(op)
-    db.commit()
-    db.refresh(op)
+    reference_cache.bump(db, "operations")
+    await db.commit()
     return op
 
 @router.get("/operations", response_model=list[OperationResponse])
-def get_operations(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return db.query(Operation).offset(skip).limit(limit).all()
+async def get_operations(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+    return (await reference_cache.table(db, "operations")).rows[skip:skip + limit]
 
 @router.delete("/operations/{op_id}")
-def delete_operation(op_id: str, db: Session = Depends(get_db)):
-    op = db.query(Operation).filter(Operation.id == op_id).first()
+async def delete_operation(op_id: str, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Operation).filter(Operation.id == op_id))
+    op = result.scalars().first()
     if not op:
         raise HTTPException(status_code=404, detail="Operation not found")
-    db.delete(op)
-    db.commit()
+    await db.delete(op)
+    reference_cache.bump(db, "operations")
+    await db.commit()
     return {"status": "success", "message": "Operation deleted"}
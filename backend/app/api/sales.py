@@ -56,38 +56,25 @@ async def create_sales_order(payload: SalesOrderCreate, db: AsyncSession = Depen
     # Refresh with eager loading
     final_result = await db.execute(
         select(SalesOrder)
-        .options(selectinload(SalesOrder.lines).selectinload(SalesOrderLine.attribute_values))
+        .options(selectinload(SalesOrder.lines))
         .filter(SalesOrder.id == so.id)
     )
-    so_refreshed = final_result.scalars().first()
-    
-    # Manually populate attribute_value_ids for the response
-    for line in so_refreshed.lines:
-        line.attribute_value_ids = [v.id for v in line.attribute_values]
-        
-    return so_refreshed
+    return final_result.scalars().first()
 
 @router.get("", response_model=list[SalesOrderResponse])
 async def get_sales_orders(db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     result = await db.execute(
         select(SalesOrder)
-        .options(selectinload(SalesOrder.lines).selectinload(SalesOrderLine.attribute_values))
+        .options(selectinload(SalesOrder.lines))
         .order_by(SalesOrder.created_at.desc())
     )
-    orders = result.scalars().all()
-    
-    # Manually populate attribute_value_ids for the response
-    for so in orders:
-        for line in so.lines:
-            line.attribute_value_ids = [v.id for v in line.attribute_values]
-            
-    return orders
+    return result.scalars().all()
 
 @router.put("/{so_id}/status", response_model=SalesOrderResponse)
 async def update_sales_order_status(so_id: uuid.UUID, status: str, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     result = await db.execute(
         select(SalesOrder)
-        .options(selectinload(SalesOrder.lines).selectinload(SalesOrderLine.attribute_values))
+        .options(selectinload(SalesOrder.lines))
         .filter(SalesOrder.id == so_id)
     )
     so = result.scalars().first()
@@ -105,10 +92,6 @@ async def update_sales_order_status(so_id: uuid.UUID, status: str, db: AsyncSess
     
     await db.commit()
     
-    # Populate attribute_value_ids
-    for line in so.lines:
-        line.attribute_value_ids = [v.id for v in line.attribute_values]
-    
     await audit_service.log_activity(
         db,
         user_id=current_user.id,
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from app.db.session import get_async_db
 from app.models.sample import SampleRequest
 from app.models.sales import SalesOrder
 from app.models.item import Item
@@ -14,10 +15,11 @@ from datetime import datetime
 router = APIRouter()
 
 @router.post("/samples", response_model=SampleRequestResponse)
-def create_sample_request(payload: SampleRequestCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def create_sample_request(payload: SampleRequestCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     # 1. Generate Code (Simple Auto-Increment Logic for MVP)
     # In production, use a dedicated sequence generator
-    count = db.query(SampleRequest).count()
+    count_result = await db.execute(select(func.count()).select_from(SampleRequest))
+    count = count_result.scalar()
     code = f"SMP-{datetime.now().year}-{str(count + 1).zfill(3)}"
     
     sample = SampleRequest(
@@ -30,14 +32,13 @@ def create_sample_request(payload: SampleRequestCreate, db: Session = Depends(ge
     
     # 2. Link Attributes
     if payload.attribute_value_ids:
-        attrs = db.query(AttributeValue).filter(AttributeValue.id.in_(payload.attribute_value_ids)).all()
-        sample.attribute_values = attrs
+        result = await db.execute(select(AttributeValue).filter(AttributeValue.id.in_(payload.attribute_value_ids)))
+        sample.attribute_values = result.scalars().all()
         
     db.add(sample)
-    db.commit()
-    db.refresh(sample)
+    await db.commit()
     
-    audit_service.log_activity(
+    await audit_service.log_activity(
         db,
         user_id=current_user.id,
         action="CREATE",
@@ -50,12 +51,16 @@ def create_sample_request(payload: SampleRequestCreate, db: Session = Depends(ge
     return sample
 
 @router.get("/samples", response_model=list[SampleRequestResponse])
-def get_samples(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return db.query(SampleRequest).order_by(SampleRequest.created_at.desc()).offset(skip).limit(limit).all()
+async def get_samples(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(
+        select(SampleRequest).order_by(SampleRequest.created_at.desc()).offset(skip).limit(limit)
+    )
+    return result.scalars().all()
 
 @router.put("/samples/{sample_id}/status")
-def update_sample_status(sample_id: str, status: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    sample = db.query(SampleRequest).filter(SampleRequest.id == sample_id).first()
+async def update_sample_status(sample_id: str, status: str, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    result = await db.execute(select(SampleRequest).filter(SampleRequest.id == sample_id))
+    sample = result.scalars().first()
     if not sample:
         raise HTTPException(status_code=404, detail="Sample not found")
         
@@ -69,9 +74,9 @@ def update_sample_status(sample_id: str, status: str, db: Session = Depends(get_
     # Logic for Rejection -> Version Bump?
     # For now, we just update status. V2 creation is a manual "Duplicate" action on frontend.
     
-    db.commit()
+    await db.commit()
     
-    audit_service.log_activity(
+    await audit_service.log_activity(
         db,
         user_id=current_user.id,
         action="UPDATE_STATUS",
@@ -84,17 +89,18 @@ def update_sample_status(sample_id: str, status: str, db: Session = Depends(get_
     return {"status": "success", "message": f"Sample updated to {status}"}
 
 @router.delete("/samples/{sample_id}")
-def delete_sample(sample_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    sample = db.query(SampleRequest).filter(SampleRequest.id == sample_id).first()
+async def delete_sample(sample_id: str, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    result = await db.execute(select(SampleRequest).filter(SampleRequest.id == sample_id))
+    sample = result.scalars().first()
     if not sample:
         raise HTTPException(status_code=404, detail="Sample not found")
     
     details = f"Deleted Sample {sample.code}"
     
-    db.delete(sample)
-    db.commit()
+    await db.delete(sample)
+    await db.commit()
     
-    audit_service.log_activity(
+    await audit_service.log_activity(
         db,
         user_id=current_user.id,
         action="DELETE",
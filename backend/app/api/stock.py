@@ -1,14 +1,21 @@
-from fastapi import APIRouter, Depends, Query
+import csv
+import io
+import json
+from fastapi import APIRouter, Depends, Query, HTTPException, UploadFile, File, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from app.db.session import get_async_db
-from app.services import stock_service
-from app.schemas import StockLedgerResponse, StockBalanceResponse, PaginatedStockLedgerResponse
+from app.db.session import get_async_db, get_async_read_db
+from app.core.db_manager import db_manager
+from app.core.read_routing import read_your_writes
+from app.core.security import token_subject
+from app.services import stock_service, stock_load_service, audit_service
+from app.schemas import StockLedgerResponse, StockBalanceResponse, PaginatedStockLedgerResponse, PaginatedStockBalanceResponse
 from app.models.auth import User
 from app.api.auth import get_current_user
 from app.models.item import Item
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 
 router = APIRouter()
 
@@ -18,7 +25,7 @@ async def get_stock_ledger(
     limit: int = 100, 
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
-    db: AsyncSession = Depends(get_async_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: User = Depends(get_current_user)
 ):
     from app.models.stock_ledger import StockLedger
@@ -52,5 +59,117 @@ async def get_stock_ledger(
     }
 
 @router.get("/stock/balance", response_model=list[StockBalanceResponse])
-async def get_stock_balance_api(db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+async def get_stock_balance_api(db: AsyncSession = Depends(get_async_read_db), current_user: User = Depends(get_current_user)):
     return await stock_service.get_all_stock_balances(db, user=current_user)
+
+def balance_filters(
+    group_by: stock_service.BalanceGrouping = Query("none"),
+    item_id: Optional[str] = Query(None),
+    category: Optional[str] = Query(None),
+    location_id: Optional[str] = Query(None),
+    attribute_value_id: list[str] = Query([])
+) -> dict:
+    # attribute_value_id may repeat; a balance must carry all of them
+    return {
+        "group_by": group_by,
+        "item_id": item_id,
+        "category": category,
+        "location_id": location_id,
+        "attribute_value_ids": attribute_value_id
+    }
+
+@router.get("/stock/balances", response_model=PaginatedStockBalanceResponse, response_model_exclude_none=True)
+async def query_stock_balances(
+    skip: int = 0,
+    limit: int = Query(100, le=1000),
+    filters: dict = Depends(balance_filters),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Non-zero balances, filtered and optionally summed per item, location or variant."""
+    rows, total = await stock_service.query_stock_balances(db, skip=skip, limit=limit, user=current_user, **filters)
+    return {
+        "items": rows,
+        "total": total,
+        "page": (skip // limit) + 1,
+        "size": len(rows),
+        "group_by": filters["group_by"]
+    }
+
+@router.get("/stock/balances/export")
+async def export_stock_balances(
+    request: Request,
+    format: Literal["csv", "ndjson"] = Query("csv"),
+    filters: dict = Depends(balance_filters),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Streams every matching balance (same filters as /stock/balances) without
+    building the whole result in memory.
+    """
+    user_id = token_subject(request.headers.get("authorization"))
+
+    async def rows():
+        # The session lives in the generator: dependency sessions close before streaming starts
+        async for db in db_manager.get_read_session(use_primary=read_your_writes.pinned(user_id)):
+            async for row in stock_service.stream_stock_balances(db, user=current_user, **filters):
+                yield row
+
+    async def body():
+        if format == "ndjson":
+            async for row in rows():
+                yield json.dumps(row, default=str) + "\n"
+            return
+        columns = stock_service.BALANCE_COLUMNS[filters["group_by"]]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        async for row in rows():
+            value_ids = row.get("attribute_value_ids")
+            if value_ids is not None:
+                row["attribute_value_ids"] = " ".join(map(str, value_ids))
+            writer.writerow([row[key] for key in columns])
+            if buffer.tell() > 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="stock_balances.{format}"'}
+    )
+
+@router.post("/stock/bulk-load")
+async def bulk_load_stock(
+    file: UploadFile = File(...),
+    mode: Literal["opening", "count"] = Query("opening"),
+    dry_run: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Go-live opening balances (mode=opening) or stock-take results (mode=count).
+    Qty is the counted quantity; differences to the current balance are posted.
+    """
+    if not file.filename.lower().endswith(".csv"):
+        raise HTTPException(status_code=400, detail="Invalid file type. Please upload a CSV.")
+
+    reference = f"{mode.upper()}-{datetime.utcnow():%Y%m%d%H%M%S}"
+    try:
+        result = await stock_load_service.bulk_load(db, file.file, mode=mode, reference=reference, dry_run=dry_run)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not dry_run:
+        await audit_service.log_activity(
+            db,
+            user_id=current_user.id,
+            action="CREATE",
+            entity_type="StockEntry",
+            entity_id=reference,
+            details=f"Bulk stock load ({mode}) from {file.filename}: {result['posted']} adjustments, {result['error_count']} rejected rows"
+        )
+    return {**result, "reference": reference}
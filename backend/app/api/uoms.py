@@ -1,32 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.db.session import get_async_db
+from app.core.reference_cache import reference_cache
+from app.core.http_cache import cached_tag, conditional_get
 from app.models.uom import UOM
 from app.schemas import UOMCreate, UOMResponse
 
 router = APIRouter()
 
 @router.post("/uoms", response_model=UOMResponse)
-def create_uom(payload: UOMCreate, db: Session = Depends(get_db)):
-    if db.query(UOM).filter(UOM.name == payload.name).first():
+async def create_uom(payload: UOMCreate, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(UOM).filter(UOM.name == payload.name))
+    if result.scalars().first():
         raise HTTPException(status_code=400, detail="UOM already exists")
     
     uom = UOM(name=payload.name)
     db.add(uom)
-    db.commit()
-    db.refresh(uom)
+    reference_cache.bump(db, "uoms")
+    await db.commit()
     return uom
 
 @router.get("/uoms", response_model=list[UOMResponse])
-def get_uoms(db: Session = Depends(get_db)):
-    return db.query(UOM).all()
+async def get_uoms(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    table = await reference_cache.table(db, "uoms")
+    return conditional_get(request, response, cached_tag(table)) or table.rows
 
 @router.delete("/uoms/{uom_id}")
-def delete_uom(uom_id: str, db: Session = Depends(get_db)):
-    uom = db.query(UOM).filter(UOM.id == uom_id).first()
+async def delete_uom(uom_id: str, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(UOM).filter(UOM.id == uom_id))
+    uom = result.scalars().first()
     if not uom:
         raise HTTPException(status_code=404, detail="UOM not found")
     
-    db.delete(uom)
-    db.commit()
+    await db.delete(uom)
+    reference_cache.bump(db, "uoms")
+    await db.commit()
     return {"status": "success", "message": "UOM deleted"}
@@ -1,30 +1,96 @@
+import asyncio
+import gzip
 import threading
+import time
 import logging
 import os
+import re
+import uuid
 import subprocess
 import shutil
 from datetime import datetime
 from pathlib import Path
-from typing import Generator, AsyncGenerator, Optional, List
+from typing import Generator, AsyncGenerator, Optional
 from sqlalchemy import create_engine, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.engine import make_url
-from app.db.base import Base
-from app.schemas import DatabaseResponse, ConnectionProfile
+from app.db.migrations import run_migrations
+from app.core.db_pool import TimedQueuePool, TimedAsyncQueuePool, pool_status
+from app.schemas import DatabaseResponse
 
 logger = logging.getLogger(__name__)
 
+# Databases created by prepare_restore: <name>_restore_<YYYYmmdd_HHMMSS>
+RESTORE_SUFFIX = re.compile(r"_restore_\d{8}_\d{6}$")
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+def pool_settings(overrides: Optional[dict] = None) -> dict:
+    """
+    Connection pool settings for the async (API) engine.
+
+    Size the pool per worker: pool_size + max_overflow, multiplied by the number
+    of workers, must stay below Postgres max_connections (or the PgBouncer pool).
+    Profile values override the environment.
+    """
+    settings = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "5")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": _env_flag("DB_POOL_PRE_PING", "true"),
+        "pgbouncer": _env_flag("DB_PGBOUNCER", "false"),
+    }
+    settings.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    return settings
+
+def asyncpg_connect_args(pgbouncer: bool) -> dict:
+    """
+    PgBouncer in transaction mode hands each transaction a different server
+    connection, so asyncpg must not cache prepared statements and must use
+    unique statement names to avoid collisions between clients.
+    """
+    if not pgbouncer:
+        return {}
+    return {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+    }
+
+class EngineSet:
+    """
+    Everything bound to one database: sync engine, async engine, optional replica
+    engine and their session factories. DatabaseManager swaps whole sets, so a
+    request never sees the primary of one database with the replica of another.
+    """
+
+    def __init__(self, url: str, pool_overrides: Optional[dict] = None, replica_url: Optional[str] = None):
+        self.url = url
+        self.pool_overrides = pool_overrides
+        self.replica_url = replica_url
+        self.engine = None
+        self.session_factory = None
+        self.async_engine = None
+        self.async_session_factory = None
+        self.replica_engine = None
+        self.replica_session_factory = None
+
+    def checked_out(self) -> int:
+        return sum(
+            (pool_status(engine) or {}).get("checked_out", 0)
+            for engine in (self.engine, self.async_engine, self.replica_engine)
+        )
+
 class DatabaseManager:
     _instance = None
     _init_lock = threading.Lock()
 
     def __init__(self):
-        self._engine = None
-        self._async_engine = None
-        self._session_factory = None
-        self._async_session_factory = None
-        self._current_url = None
+        self._active = EngineSet(None)
+        self._drain_tasks: set[asyncio.Task] = set()
         self._profiles_path = Path("database_profiles.json")
         self._snapshots_dir = Path("snapshots")
         self._snapshots_dir.mkdir(exist_ok=True)
@@ -37,193 +103,355 @@ class DatabaseManager:
                     cls._instance = cls()
         return cls._instance
 
-    def create_snapshot(self, label: str = "manual") -> DatabaseResponse:
-        """Creates a snapshot of the current database."""
-        if not self._current_url:
-            return DatabaseResponse(message="No database connection", status=False)
-
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"snapshot_{label}_{timestamp}"
-        
-        try:
-            if "postgresql" in self._current_url:
-                url = make_url(self._current_url)
-                
-                env = os.environ.copy()
-                if url.password:
-                    env["PGPASSWORD"] = url.password
-                
-                filepath = self._snapshots_dir / f"{filename}.sql"
-                
-                cmd = [
-                    "pg_dump",
-                    "-h", url.host or "localhost",
-                    "-p", str(url.port or 5432),
-                    "-U", url.username or "postgres",
-                    "-f", str(filepath),
-                    url.database
-                ]
-                subprocess.run(cmd, env=env, check=True)
-                return DatabaseResponse(message=f"Postgres snapshot created: {filename}", status=True, data={"filename": f"{filename}.sql"})
-
-            elif "sqlite" in self._current_url:
-                db_path = self._current_url.replace("sqlite:///", "")
-                filepath = self._snapshots_dir / f"{filename}.sqlite"
-                shutil.copy2(db_path, filepath)
-                return DatabaseResponse(message=f"SQLite snapshot created: {filename}", status=True, data={"filename": f"{filename}.sqlite"})
-
-            return DatabaseResponse(message="Unsupported database provider for snapshots", status=False)
-        except Exception as e:
-            logger.error(f"Snapshot failed: {e}")
-            return DatabaseResponse(message=f"Snapshot failed: {str(e)}", status=False)
-
-    def list_snapshots(self) -> List[dict]:
-        """Lists all available snapshots."""
-        files = []
-        for f in self._snapshots_dir.glob("*"):
-            stats = f.stat()
-            files.append({
-                "name": f.name,
-                "size": stats.st_size,
-                "created_at": datetime.fromtimestamp(stats.st_ctime).isoformat()
-            })
-        return sorted(files, key=lambda x: x["created_at"], reverse=True)
+    @property
+    def snapshots_dir(self) -> Path:
+        return self._snapshots_dir
 
     def get_snapshot_path(self, filename: str) -> Path:
-        """Returns the absolute path to a snapshot file."""
-        return self._snapshots_dir / filename
+        """Returns the path to a snapshot file (directory components are stripped)."""
+        return self._snapshots_dir / Path(filename).name
 
-    def restore_snapshot(self, filename: str) -> DatabaseResponse:
-        """Restores the current database from a snapshot."""
-        if not self._current_url:
+    def prepare_restore(self, filename: str) -> DatabaseResponse:
+        """
+        Loads a snapshot into a new database next to the current one and returns
+        its URL in `data["url"]`. The live database is never touched; traffic
+        moves over when the caller switches to the returned URL.
+        """
+        if not self.current_url:
             return DatabaseResponse(message="No active database connection", status=False)
         
-        filepath = self._snapshots_dir / filename
+        filepath = self.get_snapshot_path(filename)
         if not filepath.exists():
             return DatabaseResponse(message="Snapshot file not found", status=False)
 
+        suffix = datetime.now().strftime("%Y%m%d_%H%M%S")
         try:
-            if self._engine:
-                self._engine.dispose()
-
-            if "postgresql" in self._current_url:
-                url = make_url(self._current_url)
+            if "postgresql" in self.current_url:
+                if not filepath.name.endswith((".dump", ".sql")):
+                    return DatabaseResponse(message="Not a PostgreSQL snapshot", status=False)
+                url = make_url(self.current_url)
+                # Restoring while on a restored database keeps the original name as the base
+                target = f"{RESTORE_SUFFIX.sub('', url.database)}_restore_{suffix}"
                 
                 env = os.environ.copy()
                 if url.password:
                     env["PGPASSWORD"] = url.password
-                
-                cmd = [
-                    "psql", 
+                conn_args = [
                     "-h", url.host or "localhost",
                     "-p", str(url.port or 5432),
                     "-U", url.username or "postgres",
-                    "-d", url.database,
-                    "-f", str(filepath)
                 ]
-                subprocess.run(cmd, env=env, check=True)
-                
-            elif "sqlite" in self._current_url:
-                db_path = self._current_url.replace("sqlite:///", "")
-                shutil.copy2(filepath, db_path)
+                subprocess.run(["createdb", *conn_args, target], env=env, check=True)
+                if filepath.name.endswith(".dump"):
+                    # Custom-format archives restore tables and indexes in parallel
+                    jobs = os.getenv("SNAPSHOT_RESTORE_JOBS", str(min(4, os.cpu_count() or 1)))
+                    subprocess.run(["pg_restore", *conn_args, "--jobs", jobs, "--no-owner", "--exit-on-error", "-d", target, str(filepath)], env=env, check=True)
+                else:
+                    # Plain SQL snapshots taken before the custom format was introduced
+                    subprocess.run(["psql", *conn_args, "-d", target, "-v", "ON_ERROR_STOP=1", "-f", str(filepath)], env=env, check=True)
+                new_url = url.set(database=target).render_as_string(hide_password=False)
+
+            elif "sqlite" in self.current_url:
+                db_path = Path(self.current_url.replace("sqlite:///", ""))
+                target = db_path.with_name(f"{RESTORE_SUFFIX.sub('', db_path.stem)}_restore_{suffix}{db_path.suffix}")
+                if filepath.name.endswith(".gz"):
+                    with gzip.open(filepath, "rb") as src, open(target, "wb") as dst:
+                        shutil.copyfileobj(src, dst, 1024 * 1024)
+                else:
+                    shutil.copy2(filepath, target)
+                new_url = f"sqlite:///{target}"
 
-            return self.initialize(self._current_url)
+            else:
+                return DatabaseResponse(message="Unsupported database provider for snapshots", status=False)
+
+            return DatabaseResponse(message=f"Snapshot {filename} restored into a new database", status=True, data={"url": new_url})
         except Exception as e:
             logger.error(f"Restore failed: {e}")
             return DatabaseResponse(message=f"Restore failed: {str(e)}", status=False)
 
-    def initialize(self, database_url: str) -> DatabaseResponse:
+    def prune_restores(self, keep: int) -> list[str]:
         """
-        Initializes both sync and async database engines.
+        Drops restore databases of the active database's family beyond the newest
+        `keep` (the active one is always kept). A database that still has
+        connections, e.g. pools draining after the switch, is skipped and
+        retried on the next prune. Returns the names dropped.
+        """
+        url = make_url(self.current_url)
+        if url.get_backend_name() == "postgresql":
+            active = url.database
+            base = RESTORE_SUFFIX.sub("", active)
+            with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                names = conn.execute(text("SELECT datname FROM pg_database")).scalars().all()
+                restores = sorted((n for n in names if RESTORE_SUFFIX.sub("", n) == base and n != base), reverse=True)
+                dropped = []
+                for name in restores[keep:]:
+                    if name == active:
+                        continue
+                    try:
+                        conn.execute(text(f'DROP DATABASE "{name}"'))
+                        dropped.append(name)
+                    except Exception as e:
+                        logger.warning(f"Could not drop restore database {name}: {e}")
+                return dropped
+
+        if url.get_backend_name() == "sqlite":
+            active = Path(url.database)
+            base = RESTORE_SUFFIX.sub("", active.stem)
+            restores = sorted(
+                (p for p in active.parent.glob(f"{base}_restore_*{active.suffix}") if RESTORE_SUFFIX.sub("", p.stem) == base),
+                key=lambda p: p.name, reverse=True
+            )
+            dropped = []
+            for path in restores[keep:]:
+                if path.resolve() != active.resolve():
+                    path.unlink(missing_ok=True)
+                    dropped.append(path.name)
+            return dropped
+        return []
+
+    def _create_async_engine(self, database_url: str, pool: dict, read_only: bool = False):
+        async_url = database_url.replace("postgresql+psycopg2://", "postgresql+asyncpg://")
+        connect_args = asyncpg_connect_args(pool["pgbouncer"])
+        if read_only and not pool["pgbouncer"]:
+            # A hot standby rejects writes anyway; this also holds when the replica URL
+            # is a stand-in pointing at the primary. (PgBouncer refuses unknown startup params.)
+            connect_args["server_settings"] = {"default_transaction_read_only": "on"}
+        # pre-ping is safe as long as a pool is only used from one event loop
+        # (tests dispose it between loops); it catches connections dropped by
+        # PgBouncer/Postgres restarts before a request sees them
+        return create_async_engine(
+            async_url,
+            poolclass=TimedAsyncQueuePool,
+            pool_pre_ping=pool["pool_pre_ping"],
+            pool_size=pool["pool_size"],
+            max_overflow=pool["max_overflow"],
+            pool_timeout=pool["pool_timeout"],
+            pool_recycle=pool["pool_recycle"],
+            connect_args=connect_args
+        )
+
+    def _create_async_session_factory(self, engine):
+        return async_sessionmaker(
+            autocommit=False,
+            autoflush=False,
+            expire_on_commit=False, # Critical for Pydantic serialization
+            bind=engine,
+            class_=AsyncSession
+        )
+
+    def _build(self, database_url: str, pool_overrides: Optional[dict] = None, replica_url: Optional[str] = None) -> EngineSet:
+        """Creates engines and session factories for a database without connecting."""
+        engines = EngineSet(database_url, pool_overrides, replica_url)
+        pool = pool_settings(pool_overrides)
+        connect_args = {"check_same_thread": False} if "sqlite" in database_url else {}
+        
+        # Sync engine only serves scripts, migrations and init_db; API routes use the async engine
+        engines.engine = create_engine(
+            database_url,
+            poolclass=TimedQueuePool,
+            pool_pre_ping=pool["pool_pre_ping"],
+            pool_size=int(os.getenv("DB_SYNC_POOL_SIZE", "2")),
+            max_overflow=int(os.getenv("DB_SYNC_MAX_OVERFLOW", "3")),
+            pool_timeout=pool["pool_timeout"],
+            pool_recycle=pool["pool_recycle"],
+            connect_args=connect_args
+        )
+        engines.session_factory = sessionmaker(
+            autocommit=False,
+            autoflush=False,
+            bind=engines.engine
+        )
+
+        # Async Engine (only for PostgreSQL)
+        if "postgresql" in database_url:
+            engines.async_engine = self._create_async_engine(database_url, pool)
+            engines.async_session_factory = self._create_async_session_factory(engines.async_engine)
+
+        # Read replica (optional; reads fall back to the primary without it)
+        if replica_url and "postgresql" in replica_url:
+            engines.replica_engine = self._create_async_engine(replica_url, pool, read_only=True)
+            engines.replica_session_factory = self._create_async_session_factory(engines.replica_engine)
+        return engines
+
+    def configure(self, database_url: str, pool_overrides: Optional[dict] = None, replica_url: Optional[str] = None):
+        """
+        Records the database to use without creating engines; they are built on
+        first use (normally the API lifespan). Keeps imports free of engine and
+        driver setup.
         """
         with self._init_lock:
-            try:
-                # 1. Sync Engine
-                if self._engine:
-                    self._engine.dispose()
+            self._active = EngineSet(database_url, pool_overrides, replica_url)
 
-                self._current_url = database_url
-                connect_args = {"check_same_thread": False} if "sqlite" in database_url else {}
-                
-                self._engine = create_engine(
-                    database_url,
-                    pool_pre_ping=False, # Disabled to prevent shared-state Greenlet errors
-                    pool_size=20,
-                    max_overflow=10,
-                    pool_recycle=3600,
-                    connect_args=connect_args
-                )
-                
-                self._session_factory = sessionmaker(
-                    autocommit=False,
-                    autoflush=False,
-                    bind=self._engine
-                )
-
-                # 2. Async Engine (only for PostgreSQL)
-                if "postgresql" in database_url:
-                    async_url = database_url.replace("postgresql+psycopg2://", "postgresql+asyncpg://")
-                    self._async_engine = create_async_engine(
-                        async_url,
-                        pool_pre_ping=False, # Disabled to prevent asyncpg do_ping Greenlet errors
-                        pool_size=20,
-                        max_overflow=10,
-                        pool_recycle=3600
-                    )
-                    self._async_session_factory = async_sessionmaker(
-                        autocommit=False,
-                        autoflush=False,
-                        expire_on_commit=False, # Critical for Pydantic serialization
-                        bind=self._async_engine,
-                        class_=AsyncSession
-                    )
-
-                # Ensure tables exist
-                Base.metadata.create_all(bind=self._engine)
-                
+    def initialize(self, database_url: str, pool_overrides: Optional[dict] = None, replica_url: Optional[str] = None) -> DatabaseResponse:
+        """
+        Initializes both sync and async database engines, plus an optional
+        read-only async engine for a streaming replica. Used by scripts and
+        tests; a running API switches databases with `hot_swap`. Tables are
+        created by `init_db`, not here.
+        """
+        with self._init_lock:
+            try:
+                if self._active.engine:
+                    self._active.engine.dispose()
+                self._active = self._build(database_url, pool_overrides, replica_url)
                 return DatabaseResponse(message="Database initialized successfully", status=True)
             except Exception as e:
                 logger.error(f"Database initialization failed: {e}")
                 return DatabaseResponse(message=str(e), status=False)
 
-    def switch_database(self, new_url: str) -> DatabaseResponse:
-        return self.initialize(new_url)
+    def ensure_engines(self) -> EngineSet:
+        """Builds the configured engines now rather than on first use (no connections are opened)."""
+        return self._engines
+
+    @property
+    def _engines(self) -> EngineSet:
+        """The active engine set, built on first use after `configure`."""
+        engines = self._active
+        if engines.engine is None and engines.url:
+            with self._init_lock:
+                if self._active is engines:
+                    self._active = self._build(engines.url, engines.pool_overrides, engines.replica_url)
+                engines = self._active
+        return engines
+
+    async def _warm(self, engines: EngineSet):
+        """Opens a few connections on each new pool so the first requests after a swap do not pay for connects."""
+        warm = int(os.getenv("DB_WARM_CONNECTIONS", "2"))
+
+        async def ping(engine):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+
+        for engine in (engines.async_engine, engines.replica_engine):
+            if engine is not None:
+                await asyncio.gather(*(ping(engine) for _ in range(warm)))
+
+    async def hot_swap(self, database_url: str, pool_overrides: Optional[dict] = None, replica_url: Optional[str] = None) -> DatabaseResponse:
+        """
+        Switches this worker to another database without dropping requests:
+        the new engines are built, checked and warmed first, then swapped in as
+        one unit. Sessions already open finish on the old engines, which are
+        disposed once drained (or after DB_DRAIN_TIMEOUT seconds).
+        """
+        try:
+            engines = self._build(database_url, pool_overrides, replica_url)
+        except Exception as e:
+            logger.error(f"Database switch failed: {e}")
+            return DatabaseResponse(message=str(e), status=False)
+
+        try:
+            # Brings the target up to the current schema (under the migration lock) through
+            # the sync engine, so a bad URL or an old snapshot fails here and not after the swap
+            await asyncio.to_thread(run_migrations, engines.engine)
+            await self._warm(engines)
+        except Exception as e:
+            logger.error(f"Database switch failed: {e}")
+            await self._dispose(engines)
+            return DatabaseResponse(message=f"Database switch failed: {str(e)}", status=False)
+
+        with self._init_lock:
+            previous, self._active = self._active, engines
+
+        task = asyncio.create_task(self._drain(previous))
+        self._drain_tasks.add(task)
+        task.add_done_callback(self._drain_tasks.discard)
+        return DatabaseResponse(message="Database switched successfully", status=True)
+
+    async def _drain(self, engines: EngineSet):
+        timeout = float(os.getenv("DB_DRAIN_TIMEOUT", "30"))
+        deadline = time.monotonic() + timeout
+        while engines.checked_out() and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if engines.checked_out():
+            logger.warning(f"Disposing previous database engines with {engines.checked_out()} connections still checked out")
+        await self._dispose(engines)
+
+    async def _dispose(self, engines: EngineSet):
+        for engine in (engines.async_engine, engines.replica_engine):
+            if engine is not None:
+                await engine.dispose()
+        if engines.engine is not None:
+            engines.engine.dispose()
+
+    def pool_metrics(self) -> dict:
+        """Per-pool size, checked-out, overflow and checkout wait figures."""
+        return {
+            "settings": pool_settings(self._active.pool_overrides),
+            "async": pool_status(self._engines.async_engine),
+            "sync": pool_status(self._engines.engine),
+            "replica": pool_status(self._engines.replica_engine),
+            "draining": len(self._drain_tasks),
+        }
 
     def get_session(self) -> Generator[Session, None, None]:
-        if not self._session_factory:
+        if not self._engines.session_factory:
             raise RuntimeError("DatabaseManager not initialized.")
         
-        db = self._session_factory()
+        db = self._engines.session_factory()
         try:
             yield db
         finally:
             db.close()
 
     async def get_async_session(self) -> AsyncGenerator[AsyncSession, None]:
-        if not self._async_session_factory:
+        factory = self._engines.async_session_factory
+        if not factory:
             raise RuntimeError("Async DatabaseManager not initialized.")
         
-        async with self._async_session_factory() as session:
+        async with factory() as session:
             try:
                 yield session
             finally:
                 await session.close()
 
+    async def get_read_session(self, use_primary: bool = False) -> AsyncGenerator[AsyncSession, None]:
+        """
+        Yields a session on the read replica when one is configured, otherwise on
+        the primary. Sessions from the replica are read-only and may lag slightly.
+        """
+        factory = self._engines.replica_session_factory
+        if use_primary or not factory:
+            async for session in self.get_async_session():
+                yield session
+            return
+
+        async with factory() as session:
+            try:
+                yield session
+            finally:
+                await session.close()
+
+    @property
+    def has_replica(self) -> bool:
+        return self._engines.replica_session_factory is not None
+
+    @property
+    def replica_engine(self):
+        return self._engines.replica_engine
+
     @property
     def engine(self):
-        return self._engine
+        return self._engines.engine
 
     @property
     def async_engine(self):
-        return self._async_engine
+        return self._engines.async_engine
 
     @property
     def session_factory(self):
-        return self._session_factory
+        return self._engines.session_factory
 
     @property
     def current_url(self):
-        return self._current_url
+        return self._active.url
+
+    @property
+    def pool_overrides(self):
+        return self._active.pool_overrides
+
+    @property
+    def replica_url(self):
+        return self._active.replica_url
 
 # Global instance
 db_manager = DatabaseManager.get_instance()
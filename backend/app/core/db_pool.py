@@ -0,0 +1,74 @@
+import threading
+import time
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+class PoolWaitStats:
+    """Checkout wait-time figures for one connection pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, waited: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def as_dict(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+        }
+
+class _TimedPoolMixin:
+    """Times how long callers wait for a connection to be handed out."""
+
+    @property
+    def wait_stats(self) -> PoolWaitStats:
+        if not hasattr(self, "_wait_stats"):
+            self._wait_stats = PoolWaitStats()
+        return self._wait_stats
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            self.wait_stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - started)
+        return conn
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+def pool_status(engine) -> dict | None:
+    """Snapshot of size, checked-out, overflow and wait-time figures for an engine's pool."""
+    if engine is None:
+        return None
+    pool = getattr(engine, "sync_engine", engine).pool
+    status = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+        })
+    if isinstance(pool, _TimedPoolMixin):
+        status.update(pool.wait_stats.as_dict())
+    return status
@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import os
+import orjson
+from datetime import datetime
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import NullPool
+from app.core.db_manager import db_manager
+from app.core.invalidation import invalidation_bus
+from app.core.outbox_relay import outbox_relay
+from app.services import outbox_service
+from app.schemas import DatabaseResponse
+
+logger = logging.getLogger(__name__)
+
+# Restore databases kept, counting the active one; older ones are dropped after a restore
+RESTORE_KEEP = max(1, int(os.getenv("SNAPSHOT_RESTORE_KEEP", "3")))
+
+# One row (id 1) in the boot database naming the database the cluster runs on
+RECORD_TABLE = """
+    CREATE TABLE IF NOT EXISTS active_database (
+        id INTEGER PRIMARY KEY,
+        generation INTEGER NOT NULL,
+        url TEXT NOT NULL,
+        pool_overrides TEXT,
+        replica_url TEXT,
+        switched_at TIMESTAMP NOT NULL
+    )
+"""
+
+class DatabaseSwitchCoordinator:
+    """
+    Keeps every worker on the same database.
+
+    The worker that handles the admin request hot-swaps first, so a bad URL
+    fails there and nowhere else. It then records the target, under a new
+    generation number, in the `active_database` row of the boot database
+    (DATABASE_URL), which is never switched away from or dropped, so the
+    choice survives Redis resets and full restarts. The generation is
+    announced on the invalidation bus; the other workers hot-swap when they
+    see a newer one, poll the row every DB_SWITCH_POLL_SECONDS in case an
+    announcement was lost, and read it in `start` before engines are built.
+    """
+
+    def __init__(self, db=None):
+        self.db = db or db_manager
+        self.generation = 0
+        self.poll_interval = float(os.getenv("DB_SWITCH_POLL_SECONDS", "15"))
+        self._boot_url: str | None = None
+        self._record_engine: Engine | None = None
+        self._poll_task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+        invalidation_bus.subscribe("database", self._on_announce)
+
+    def _on_announce(self, generation: str | None):
+        # Workers that have not started yet read the record in `start`
+        if self._boot_url and generation and int(generation) > self.generation:
+            asyncio.get_running_loop().create_task(self.sync())
+
+    async def start(self):
+        self._boot_url = self.db.current_url
+        await self.sync()
+        self._poll_task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._poll_task:
+            self._poll_task.cancel()
+        if self._record_engine:
+            self._record_engine.dispose()
+            self._record_engine = None
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            await self.sync()
+
+    def _record_conn(self):
+        if self._record_engine is None:
+            self._record_engine = create_engine(self._boot_url, poolclass=NullPool)
+        conn = self._record_engine.connect()
+        conn.execute(text(RECORD_TABLE))
+        return conn
+
+    def _load_record(self) -> dict | None:
+        with self._record_conn() as conn:
+            row = conn.execute(text(
+                "SELECT generation, url, pool_overrides, replica_url FROM active_database WHERE id = 1"
+            )).mappings().first()
+            conn.commit()
+        if not row:
+            return None
+        return {**row, "pool_overrides": orjson.loads(row["pool_overrides"]) if row["pool_overrides"] else None}
+
+    def _save_record(self, url: str, pool_overrides: dict | None, replica_url: str | None) -> int:
+        """Stores the target and returns its generation, incremented atomically in the same statement."""
+        with self._record_conn() as conn:
+            generation = conn.execute(text("""
+                INSERT INTO active_database (id, generation, url, pool_overrides, replica_url, switched_at)
+                VALUES (1, 1, :url, :pool_overrides, :replica_url, :at)
+                ON CONFLICT (id) DO UPDATE SET
+                    generation = active_database.generation + 1, url = excluded.url,
+                    pool_overrides = excluded.pool_overrides, replica_url = excluded.replica_url,
+                    switched_at = excluded.switched_at
+                RETURNING generation
+            """), {
+                "url": url,
+                "pool_overrides": orjson.dumps(pool_overrides).decode() if pool_overrides else None,
+                "replica_url": replica_url,
+                "at": datetime.utcnow(),
+            }).scalar()
+            conn.commit()
+        return generation
+
+    async def sync(self):
+        """Moves this worker to the cluster-wide database if the record is newer than what it runs."""
+        try:
+            record = await asyncio.to_thread(self._load_record)
+        except Exception as e:
+            logger.error(f"Failed to read active database record: {e}")
+            return
+        if not record or record["generation"] <= self.generation:
+            return
+
+        async with self._lock:
+            if record["generation"] <= self.generation:
+                return
+            target = (record["url"], record["pool_overrides"], record["replica_url"])
+            if target != (self.db.current_url, self.db.pool_overrides, self.db.replica_url):
+                res = await self.db.hot_swap(*target)
+                if not res.status:
+                    logger.error(f"Failed to follow database switch: {res.message}")
+                    return
+                self._clear_caches()
+            self.generation = record["generation"]
+
+    def _clear_caches(self):
+        # Cached principals, reference data and variant ids belong to the previous database
+        invalidation_bus.apply_local("user")
+        invalidation_bus.apply_local("refdata")
+        invalidation_bus.apply_local("variants")
+
+    async def switch(self, url: str, pool_overrides: dict | None = None, replica_url: str | None = None) -> DatabaseResponse:
+        self._boot_url = self._boot_url or self.db.current_url
+        async with self._lock:
+            previous = (self.db.current_url, self.db.pool_overrides, self.db.replica_url)
+            res = await self.db.hot_swap(url, pool_overrides, replica_url)
+            if not res.status:
+                return res
+            try:
+                self.generation = await asyncio.to_thread(self._save_record, url, pool_overrides, replica_url)
+            except Exception as e:
+                # Unrecorded, the switch would be undone by the next restart: go back now
+                logger.error(f"Failed to record database switch: {e}")
+                await self.db.hot_swap(*previous)
+                return DatabaseResponse(message=f"Database switch not recorded, switched back: {e}", status=False)
+            self._clear_caches()
+
+        invalidation_bus.publish("database", str(self.generation))
+        try:
+            await asyncio.to_thread(self._queue_resync)
+            outbox_relay.notify()
+        except Exception as e:
+            logger.error(f"Failed to queue RESYNC after database switch: {e}")
+        return res
+
+    def _queue_resync(self):
+        # Everything clients hold came from the previous database. The event is
+        # committed to the new database's outbox, so the relay delivers it even
+        # if this worker dies right after the switch
+        with self.db.session_factory() as session:
+            outbox_service.enqueue(session, "RESYNC", {})
+            session.commit()
+
+    async def restore(self, filename: str) -> DatabaseResponse:
+        """Restores a snapshot into a new database, then switches every worker to it."""
+        res = await asyncio.to_thread(self.db.prepare_restore, filename)
+        if not res.status:
+            return res
+
+        new_url = res.data["url"]
+        replica_url = self.db.replica_url
+        if replica_url and "postgresql" in new_url:
+            # A streaming replica follows the whole cluster, including the new database
+            replica_url = make_url(replica_url).set(database=make_url(new_url).database).render_as_string(hide_password=False)
+
+        switched = await self.switch(new_url, self.db.pool_overrides, replica_url)
+        if not switched.status:
+            return switched
+        try:
+            dropped = await asyncio.to_thread(self.db.prune_restores, RESTORE_KEEP)
+            if dropped:
+                logger.info(f"Dropped old restore databases: {', '.join(dropped)}")
+        except Exception as e:
+            logger.error(f"Failed to prune restore databases: {e}")
+        return DatabaseResponse(message=f"Snapshot {filename} restored. {switched.message}", status=True, data={"database": make_url(new_url).database})
+
+db_switch = DatabaseSwitchCoordinator()
@@ -0,0 +1,98 @@
+import time
+import logging
+from collections import deque
+from redis import asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+def parse_event_id(event_id: str | None) -> tuple[int, int]:
+    """Turns a stream id ("<ms>-<seq>") into a sortable tuple. Invalid ids sort first."""
+    try:
+        ms, _, seq = str(event_id).partition("-")
+        return int(ms), int(seq or 0)
+    except (TypeError, ValueError):
+        return (0, 0)
+
+# XADD that also stores the id of the entry before it, atomically, so readers can
+# tell exactly where trimming stopped (see trimmed_upto)
+APPEND_SCRIPT = """
+local last = redis.call('XREVRANGE', KEYS[1], '+', '-', 'COUNT', 1)
+local prev = '0-0'
+if #last > 0 then prev = last[1][1] end
+return redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[2], '*', 'frame', ARGV[1], 'prev', prev)
+"""
+
+class RedisEventStream:
+    """
+    Durable event log backed by a Redis Stream.
+    Every frame gets a monotonically increasing id that clients can resume from.
+    """
+
+    def __init__(self, redis: aioredis.Redis, key: str, maxlen: int = 10000):
+        self.redis = redis
+        self.key = key
+        self.maxlen = maxlen
+        self._append = redis.register_script(APPEND_SCRIPT)
+
+    async def append(self, frame: str) -> str:
+        return await self._append(keys=[self.key], args=[frame, self.maxlen])
+
+    async def last_id(self) -> str:
+        entries = await self.redis.xrevrange(self.key, count=1)
+        return entries[0][0] if entries else "0-0"
+
+    async def trimmed_upto(self) -> str:
+        """Id of the newest entry trimmed away ("0-0" if none): every later entry is still here."""
+        entries = await self.redis.xrange(self.key, count=1)
+        if not entries:
+            return "0-0"
+        entry_id, fields = entries[0]
+        # Entries written before "prev" was recorded: assume the first one is the boundary
+        return fields.get("prev", entry_id)
+
+    async def read_range(self, after_id: str, upto_id: str) -> list[tuple[str, str]]:
+        """Returns (id, frame) pairs with after_id < id <= upto_id."""
+        entries = await self.redis.xrange(self.key, min=f"({after_id}", max=upto_id)
+        return [(entry_id, fields["frame"]) for entry_id, fields in entries]
+
+    async def read_new(self, after_id: str, block_ms: int = 1000) -> list[tuple[str, str]]:
+        """Blocks until frames newer than after_id arrive (or the timeout expires)."""
+        response = await self.redis.xread({self.key: after_id}, block=block_ms, count=500)
+        frames = []
+        for _key, entries in response or []:
+            frames.extend((entry_id, fields["frame"]) for entry_id, fields in entries)
+        return frames
+
+class LocalEventStream:
+    """
+    In-process stand-in for single-node / no-Redis mode.
+    Keeps the newest `maxlen` frames in memory with Redis-compatible ids.
+    """
+
+    def __init__(self, maxlen: int = 10000):
+        self._entries: deque[tuple[str, str]] = deque(maxlen=maxlen)
+        self._last = (0, 0)
+        self._trimmed = "0-0"
+
+    async def append(self, frame: str) -> str:
+        ms = int(time.time() * 1000)
+        last_ms, last_seq = self._last
+        self._last = (ms, 0) if ms > last_ms else (last_ms, last_seq + 1)
+        event_id = f"{self._last[0]}-{self._last[1]}"
+        if len(self._entries) == self._entries.maxlen:
+            self._trimmed = self._entries[0][0]
+        self._entries.append((event_id, frame))
+        return event_id
+
+    async def last_id(self) -> str:
+        return self._entries[-1][0] if self._entries else "0-0"
+
+    async def trimmed_upto(self) -> str:
+        return self._trimmed
+
+    async def read_range(self, after_id: str, upto_id: str) -> list[tuple[str, str]]:
+        lower, upper = parse_event_id(after_id), parse_event_id(upto_id)
+        return [
+            (event_id, frame) for event_id, frame in self._entries
+            if lower < parse_event_id(event_id) <= upper
+        ]
@@ -0,0 +1,72 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import NamedTuple
+from fastapi import Request, Response
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.reference_cache import RefTable
+
+class CollectionTag(NamedTuple):
+    """Version of a list resource: changes whenever a row is added, changed or deleted."""
+    version: str
+    last_modified: datetime | None
+
+def _tag(parts: list[tuple[datetime | None, int]]) -> CollectionTag:
+    stamps = [latest for latest, _ in parts if latest]
+    return CollectionTag(
+        "|".join(f"{latest.isoformat() if latest else '-'}:{count}" for latest, count in parts),
+        max(stamps) if stamps else None
+    )
+
+async def table_tag(db: AsyncSession, *models) -> CollectionTag:
+    """
+    max(updated_at) and count(*) of each table in one round trip. The max
+    comes from the updated_at index; the count catches deletes.
+    """
+    columns = []
+    for model in models:
+        columns.append(select(func.max(model.updated_at)).scalar_subquery())
+        columns.append(select(func.count()).select_from(model).scalar_subquery())
+    row = (await db.execute(select(*columns))).one()
+    return _tag([(row[i], row[i + 1]) for i in range(0, len(row), 2)])
+
+def cached_tag(*tables: RefTable) -> CollectionTag:
+    """Same tag computed from reference cache tables, without a query."""
+    return _tag([
+        (max((row.updated_at for row in table.rows if row.updated_at), default=None), len(table.rows))
+        for table in tables
+    ])
+
+def _http_date(value: datetime) -> str:
+    return format_datetime(value.replace(tzinfo=timezone.utc), usegmt=True)
+
+def conditional_get(request: Request, response: Response, tag: CollectionTag, *vary) -> Response | None:
+    """
+    Sets ETag/Last-Modified on `response` and returns a 304 when the client's
+    copy is current; the caller returns that before running its list query.
+    The query string and `vary` (e.g. category visibility) are part of the
+    ETag, so each page, filter and audience is validated on its own.
+    """
+    key = "\n".join([tag.version, request.url.query, *(repr(v) for v in vary)])
+    etag = f'W/"{hashlib.blake2b(key.encode(), digest_size=12).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if tag.last_modified:
+        headers["Last-Modified"] = _http_date(tag.last_modified)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison: W/ prefixes are ignored on both sides
+        candidates = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        if "*" in candidates or etag.removeprefix("W/") in candidates:
+            return Response(status_code=304, headers=headers)
+    elif tag.last_modified and (if_modified_since := request.headers.get("if-modified-since")):
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            since = None
+        if since and since.tzinfo and tag.last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since:
+            return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
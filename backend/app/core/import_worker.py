@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import os
+import time
+from app.core.db_manager import db_manager
+from app.core.outbox_relay import outbox_relay
+from app.models.import_job import ImportJob
+from app.services import import_service, import_job_service
+
+logger = logging.getLogger(__name__)
+
+class ImportWorker:
+    """
+    Background task that runs queued import jobs one at a time per process.
+    Each batch commits on the data session and then records progress on the
+    job row, so a crash loses at most one batch of progress reporting. Progress
+    events are committed to the outbox with the job row and sent by the relay.
+    """
+
+    def __init__(self):
+        self.poll_interval = float(os.getenv("IMPORT_POLL_INTERVAL", "2.0"))
+        # Minimum seconds between progress events queued for /ws/events
+        self.progress_interval = 0.5
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def notify(self):
+        """Called after a job is queued on this worker, to skip the poll delay."""
+        self._wakeup.set()
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def run_next(self) -> bool:
+        """Claims and runs one job. Returns False when the queue is empty."""
+        job = None
+        async for jobs_db in db_manager.get_async_session():
+            job = await import_job_service.claim_next(jobs_db)
+            if job:
+                outbox_relay.notify()
+                await self._process(jobs_db, job)
+        return job is not None
+
+    async def _process(self, jobs_db, job: ImportJob):
+        importer = import_service.get_importer(job.kind)
+        last_push = 0.0
+
+        async def on_batch(rows_processed: int, results: import_service.ImportResults):
+            nonlocal last_push
+            publish = time.monotonic() - last_push >= self.progress_interval
+            await import_job_service.record_progress(jobs_db, job, rows_processed, results, publish)
+            if publish:
+                last_push = time.monotonic()
+                outbox_relay.notify()
+
+        error = None
+        try:
+            if importer is None:
+                raise ValueError(f"No importer for '{job.kind}'")
+            with import_job_service.spool_file(job) as file:
+                async for data_db in db_manager.get_async_session():
+                    await importer(data_db, file, on_batch, str(job.id))
+        except Exception as e:
+            logger.error(f"Import job {job.id} failed: {e}")
+            await jobs_db.rollback()
+            await jobs_db.refresh(job)
+            error = str(e)
+
+        await import_job_service.finish(jobs_db, job, error)
+        outbox_relay.notify()
+
+    async def _run(self):
+        while True:
+            try:
+                while await self.run_next():
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Import worker failed: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+import_worker = ImportWorker()
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import os
+import uuid
+import orjson
+from typing import Callable
+from redis import asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+class InvalidationBus:
+    """
+    Propagates cache invalidations to every worker through Redis pub/sub.
+    Invalidations are applied locally first, so a worker never serves its own
+    stale entry; other workers follow as soon as the message arrives (entry TTLs
+    bound the staleness if Redis is unavailable).
+    """
+
+    def __init__(self):
+        self.redis_url = os.getenv("REDIS_URL", "redis://redis:6379/0")
+        self.channel_name = "terras_invalidations"
+        self.redis: aioredis.Redis | None = None
+        self.pubsub: aioredis.client.PubSub | None = None
+        self._listener_task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._handlers: dict[str, list[Callable[[str | None], None]]] = {}
+        # Lets a worker skip its own messages (already applied locally)
+        self.origin = uuid.uuid4().hex
+
+    def subscribe(self, kind: str, callback: Callable[[str | None], None]):
+        self._handlers.setdefault(kind, []).append(callback)
+
+    async def initialize(self):
+        self._loop = asyncio.get_running_loop()
+        # A re-initialisation after a listener failure replaces the client
+        await self._close_redis()
+        try:
+            self.redis = aioredis.from_url(self.redis_url, decode_responses=True)
+            self.pubsub = self.redis.pubsub()
+            await self.pubsub.subscribe(self.channel_name)
+            self._listener_task = asyncio.create_task(self._listen())
+        except Exception as e:
+            logger.error(f"Failed to initialize Redis for cache invalidation: {e}")
+            await self._close_redis()
+
+    async def stop(self):
+        if self._listener_task:
+            self._listener_task.cancel()
+        await self._close_redis()
+
+    async def _close_redis(self):
+        pubsub, redis = self.pubsub, self.redis
+        self.pubsub, self.redis = None, None
+        try:
+            if pubsub:
+                await pubsub.unsubscribe(self.channel_name)
+                await pubsub.close()
+        except Exception as e:
+            logger.warning(f"Failed to close invalidation pubsub: {e}")
+        try:
+            if redis:
+                await redis.close()
+        except Exception as e:
+            logger.warning(f"Failed to close invalidation Redis client: {e}")
+
+    def _dispatch(self, kind: str, key: str | None):
+        for callback in self._handlers.get(kind, []):
+            try:
+                callback(key)
+            except Exception as e:
+                logger.error(f"Invalidation handler for {kind} failed: {e}")
+
+    def apply_local(self, kind: str, key: str | None = None):
+        """Runs the handlers for `kind` on this worker only."""
+        self._dispatch(kind, key)
+
+    def publish(self, kind: str, key: str | None = None):
+        """
+        Invalidates `key` (or everything for `kind` when None) on all workers.
+        Safe to call from async handlers and from threadpool (sync) handlers.
+        """
+        self._dispatch(kind, key)
+        if not self.redis or not self._loop:
+            return
+
+        message = orjson.dumps({"origin": self.origin, "kind": kind, "key": key}).decode()
+        try:
+            asyncio.get_running_loop()
+            asyncio.create_task(self._publish(message))
+        except RuntimeError:
+            asyncio.run_coroutine_threadsafe(self._publish(message), self._loop)
+
+    async def _publish(self, message: str):
+        try:
+            await self.redis.publish(self.channel_name, message)
+        except Exception as e:
+            logger.error(f"Failed to publish invalidation: {e}")
+
+    async def _listen(self):
+        try:
+            async for message in self.pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                data = orjson.loads(message["data"])
+                if data.get("origin") != self.origin:
+                    self._dispatch(data["kind"], data.get("key"))
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Invalidation listener encountered error: {e}")
+            await asyncio.sleep(5)
+            asyncio.create_task(self.initialize())
+
+invalidation_bus = InvalidationBus()
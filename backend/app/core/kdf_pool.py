@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from app.core import security
+
+logger = logging.getLogger(__name__)
+
+class KDFPoolBusy(Exception):
+    """Raised when the KDF queue is full and the caller should back off."""
+
+class KDFPool:
+    """
+    Dedicated, bounded executor for password hashing and verification.
+
+    KDF work is deliberately slow, so it runs off the event loop and off the
+    shared AnyIO threadpool. A process pool sidesteps the GIL; at most
+    `max_queue` jobs may be waiting or running at once, beyond which callers
+    wait up to `queue_timeout` seconds and then get KDFPoolBusy.
+    """
+
+    def __init__(self):
+        self.mode = os.getenv("KDF_EXECUTOR", "process") # process | thread
+        self.workers = int(os.getenv("KDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.max_queue = int(os.getenv("KDF_MAX_QUEUE", str(self.workers * 16)))
+        self.queue_timeout = float(os.getenv("KDF_QUEUE_TIMEOUT", "5"))
+        self._executor: Executor | None = None
+        self._slots: asyncio.Semaphore | None = None
+
+        # Metrics
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self._total_seconds = 0.0
+        self._max_seconds = 0.0
+
+    def _ensure_started(self):
+        if self._executor is None:
+            if self.mode == "thread":
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="kdf")
+            else:
+                # spawn: workers import only app.core.security, never the app graph or its pools
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_queue)
+
+    async def _run(self, fn, *args):
+        self._ensure_started()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise KDFPoolBusy("Password hashing queue is full")
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.in_flight -= 1
+            self.completed += 1
+            self._total_seconds += elapsed
+            self._max_seconds = max(self._max_seconds, elapsed)
+            self._slots.release()
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+        return await self._run(security.verify_and_update, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(security.get_password_hash, password)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            # Jobs waiting for a worker (in_flight includes the ones running)
+            "queue_depth": max(0, self.in_flight - self.workers),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_ms": round(self._total_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+            "max_ms": round(self._max_seconds * 1000, 2),
+        }
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._slots = None
+
+kdf_pool = KDFPool()
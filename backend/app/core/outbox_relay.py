@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import os
+import time
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.db_manager import db_manager
+from app.core.invalidation import invalidation_bus
+from app.core.ws_manager import manager
+from app.services import outbox_service, kpi_service
+
+logger = logging.getLogger(__name__)
+
+async def _broadcast_handler(db: AsyncSession, topic: str, payload: dict):
+    if topic != outbox_service.INVALIDATE:
+        await manager.broadcast(payload, topic=topic)
+
+async def _invalidation_handler(db: AsyncSession, topic: str, payload: dict):
+    invalidation_bus.publish(payload["kind"], payload.get("key"))
+
+async def _kpi_handler(db: AsyncSession, topic: str, payload: dict):
+    if topic == "WORK_ORDER_UPDATE":
+        await kpi_service.apply_work_order_transition(db, payload.get("previous_status"), payload["status"])
+
+outbox_service.register_handler("*", _broadcast_handler)
+outbox_service.register_handler("WORK_ORDER_UPDATE", _kpi_handler)
+outbox_service.register_handler(outbox_service.INVALIDATE, _invalidation_handler)
+
+class OutboxRelay:
+    """
+    Background task that drains `outbox_events` in batches and fans them out
+    (WebSocket stream, KPI counters, cache invalidators) after the producing
+    transaction has committed.
+    """
+
+    def __init__(self):
+        self.batch_size = int(os.getenv("OUTBOX_BATCH_SIZE", "200"))
+        self.poll_interval = float(os.getenv("OUTBOX_POLL_INTERVAL", "1.0"))
+        self.purge_interval = 3600
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._last_purge = 0.0
+
+    def notify(self):
+        """Called after a commit that enqueued events, to skip the poll delay."""
+        self._wakeup.set()
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def drain(self) -> int:
+        """Drains until the outbox is empty. Returns the number of events relayed."""
+        total = 0
+        while True:
+            async for db in db_manager.get_async_session():
+                processed = await outbox_service.drain_batch(db, limit=self.batch_size)
+                # External sinks must be flushed before the batch is marked processed
+                await manager.flush()
+                await db.commit()
+
+                if time.monotonic() - self._last_purge > self.purge_interval:
+                    await outbox_service.purge_processed(db)
+                    self._last_purge = time.monotonic()
+            total += processed
+            if processed < self.batch_size:
+                return total
+
+    async def _run(self):
+        while True:
+            try:
+                await self.drain()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Outbox relay failed: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+outbox_relay = OutboxRelay()
@@ -0,0 +1,56 @@
+import os
+from app.core.cache import TTLCache
+from app.core.db_manager import db_manager
+from app.core.invalidation import invalidation_bus
+from app.core.security import token_subject
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+class ReadYourWrites:
+    """
+    Keeps a user's replica reads on the primary for a short window after they
+    write, so replication lag never hides their own changes from them. The pin
+    is shared with the other workers through the invalidation bus.
+    """
+
+    def __init__(self):
+        self.window = float(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))
+        self._pinned = TTLCache(maxsize=10000, ttl=self.window)
+
+    def _pin(self, user_id: str | None):
+        if user_id:
+            self._pinned.set(user_id, True)
+
+    def mark_write(self, user_id: str | None):
+        if user_id:
+            self._pin(user_id)
+            invalidation_bus.publish("primary_sticky", user_id)
+
+    def pinned(self, user_id: str | None) -> bool:
+        return user_id is not None and self._pinned.get(user_id) is not None
+
+read_your_writes = ReadYourWrites()
+# Subscribed once for the process: an instance's own writes are pinned by mark_write
+invalidation_bus.subscribe("primary_sticky", read_your_writes._pin)
+
+class ReadYourWritesMiddleware:
+    """
+    Pins the caller to the primary after every successful non-GET request. The pin
+    is set before the response starts, so the client cannot read before it exists.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or not db_manager.has_replica:
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = dict(scope["headers"])
+                authorization = headers.get(b"authorization")
+                read_your_writes.mark_write(token_subject(authorization.decode() if authorization else None))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,174 @@
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Hashable, Iterable
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from app.core.invalidation import invalidation_bus
+from app.services import outbox_service
+from app.models.attribute import Attribute, AttributeValue
+from app.models.location import Location
+from app.models.uom import UOM
+from app.models.category import Category
+from app.models.routing import WorkCenter, Operation
+
+logger = logging.getLogger(__name__)
+
+class RefTable:
+    """One reference table as id -> row and key -> row maps. Never mutated after load."""
+
+    def __init__(self, rows: Iterable, key: Callable[[Any], Hashable]):
+        self.rows = list(rows)
+        self.by_id = {row.id: row for row in self.rows}
+        self.by_key = {key(row): row for row in self.rows}
+
+    def get(self, id) -> Any | None:
+        if isinstance(id, str):
+            try:
+                id = uuid.UUID(id)
+            except ValueError:
+                return None
+        return self.by_id.get(id)
+
+    def lookup(self, key: Hashable) -> Any | None:
+        return self.by_key.get(key)
+
+    def id_for(self, key: Hashable) -> uuid.UUID | None:
+        row = self.by_key.get(key)
+        return row.id if row else None
+
+@dataclass(frozen=True)
+class AttributeRef:
+    id: uuid.UUID
+    name: str
+    updated_at: datetime | None = None
+    values: list = field(default_factory=list)
+
+def _columns(model):
+    return select(*model.__table__.columns)
+
+async def _load_attributes(db: AsyncSession) -> dict[str, RefTable]:
+    attributes = (await db.execute(_columns(Attribute))).all()
+    values = (await db.execute(_columns(AttributeValue))).all()
+    names = {a.id: a.name for a in attributes}
+    by_attribute: dict[uuid.UUID, list] = {}
+    for value in values:
+        by_attribute.setdefault(value.attribute_id, []).append(value)
+    return {
+        "attributes": RefTable(
+            (AttributeRef(a.id, a.name, a.updated_at, by_attribute.get(a.id, [])) for a in attributes),
+            key=lambda a: a.name
+        ),
+        # Keyed by (attribute name, value), both lowercased, for CSV-style "Color=Red" lookups
+        "attribute_values": RefTable(values, key=lambda v: (names[v.attribute_id].lower(), v.value.lower())),
+    }
+
+def _simple(kind: str, model, key: str) -> Callable[[AsyncSession], Awaitable[dict[str, RefTable]]]:
+    async def load(db: AsyncSession) -> dict[str, RefTable]:
+        rows = (await db.execute(_columns(model))).all()
+        return {kind: RefTable(rows, key=lambda row: getattr(row, key))}
+    return load
+
+# Invalidation group -> loader filling every table in the group
+_LOADERS: dict[str, Callable[[AsyncSession], Awaitable[dict[str, RefTable]]]] = {
+    "attributes": _load_attributes,
+    "locations": _simple("locations", Location, "code"),
+    "uoms": _simple("uoms", UOM, "name"),
+    "categories": _simple("categories", Category, "name"),
+    "work_centers": _simple("work_centers", WorkCenter, "code"),
+    "operations": _simple("operations", Operation, "code"),
+}
+_GROUP_OF = {"attribute_values": "attributes"}
+
+class ReferenceCache:
+    """
+    Process-wide cache of small, rarely changing master data (attributes and
+    their values, locations, UOMs, categories, work centers, operations).
+
+    Each group carries a version counter. Routers that change a group call
+    `bump` before committing; the commit bumps it here and the outbox relay
+    bumps it on every other worker over the invalidation bus. A load
+    that started before a bump is used once but not stored, so a stale table
+    is never cached. The TTL bounds staleness if Redis is unavailable.
+    """
+
+    def __init__(self, ttl: float | None = None):
+        self.ttl = ttl if ttl is not None else float(os.getenv("REFDATA_CACHE_TTL", "300"))
+        self._tables: dict[str, tuple[float, dict[str, RefTable]]] = {}
+        self._versions: dict[str, int] = {group: 0 for group in _LOADERS}
+        invalidation_bus.subscribe("refdata", self._invalidate)
+
+    def _invalidate(self, group: str | None):
+        for g in ([group] if group else list(_LOADERS)):
+            if g in self._versions:
+                self._versions[g] += 1
+                self._tables.pop(g, None)
+
+    def version(self, group: str) -> int:
+        return self._versions[_GROUP_OF.get(group, group)]
+
+    def bump(self, db: AsyncSession, group: str):
+        """Stages an invalidation of `group` in the transaction that changes it."""
+        outbox_service.enqueue_invalidation(db, "refdata", group)
+
+    async def table(self, db: AsyncSession, kind: str, ids: Iterable = (), keys: Iterable = ()) -> RefTable:
+        """
+        The cached table for `kind`. If any of `ids` or `keys` is not in it, the
+        group is reloaded once: rows created outside the routers (scripts,
+        imports) or on another worker while Redis was down are found right away
+        instead of after the TTL.
+        """
+        group = _GROUP_OF.get(kind, kind)
+        entry = self._tables.get(group)
+        if entry and entry[0] > time.monotonic():
+            table = entry[1][kind]
+            if all(table.get(i) is not None for i in ids) and all(table.lookup(k) is not None for k in keys):
+                return table
+
+        version = self._versions[group]
+        tables = await _LOADERS[group](db)
+        if self._versions[group] == version:
+            self._tables[group] = (time.monotonic() + self.ttl, tables)
+        return tables[kind]
+
+    async def lookup(self, db: AsyncSession, kind: str, key: Hashable) -> Any | None:
+        """Row for `key`, reloading the group once on a miss."""
+        return (await self.table(db, kind, keys=[key])).lookup(key)
+
+    async def attribute_values(self, db: AsyncSession, ids: Iterable) -> list[AttributeValue]:
+        """
+        Session-bound AttributeValue instances for relationship assignment,
+        built from the cache instead of a SELECT. Raises LookupError for ids
+        that do not exist, so a variant is never built from a partial set.
+        """
+        ids = list(ids)
+        values = await self.table(db, "attribute_values", ids=ids)
+        missing = [str(id) for id in ids if values.get(id) is None]
+        if missing:
+            raise LookupError(f"Attribute value(s) not found: {', '.join(missing)}")
+
+        instances = []
+        for id in ids:
+            row = values.get(id)
+            instance = AttributeValue(id=row.id, attribute_id=row.attribute_id, value=row.value, updated_at=row.updated_at)
+            make_transient_to_detached(instance)
+            instances.append(await db.merge(instance, load=False))
+        return instances
+
+    async def load_all(self, db: AsyncSession):
+        for group in _LOADERS:
+            await self.table(db, group)
+
+    async def warm(self, session_factory):
+        """Startup load; a database that is not reachable yet just leaves the cache cold."""
+        try:
+            async for db in session_factory():
+                await self.load_all(db)
+        except Exception as e:
+            logger.warning(f"Reference data cache not warmed: {e}")
+
+reference_cache = ReferenceCache()
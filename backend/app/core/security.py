@@ -1,7 +1,8 @@
 from datetime import datetime, timedelta
 from typing import Any, Union
-from jose import jwt
+from jose import jwt, JWTError
 from passlib.context import CryptContext
+from passlib.hash import pbkdf2_sha256
 import os
 
 # Configuration
@@ -9,7 +10,14 @@ SECRET_KEY = os.getenv("SECRET_KEY", "change_this_to_secure_random_string")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 # 24 hours
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# KDF cost. Changing it rehashes stored passwords transparently on next login.
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "29000"))
+
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=PASSWORD_HASH_ROUNDS
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -17,6 +25,31 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def needs_rehash(hashed_password: str) -> bool:
+    """True if the hash uses a deprecated scheme or a cost other than the configured one."""
+    if pwd_context.needs_update(hashed_password):
+        return True
+    try:
+        return pbkdf2_sha256.from_string(hashed_password).rounds != PASSWORD_HASH_ROUNDS
+    except ValueError:
+        return False
+
+def verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Verifies a password and returns a replacement hash when the stored one is outdated."""
+    valid = pwd_context.verify(plain_password, hashed_password)
+    if valid and needs_rehash(hashed_password):
+        return True, pwd_context.hash(plain_password)
+    return valid, None
+
+def token_subject(authorization: str | None) -> str | None:
+    """Subject of the bearer token in an Authorization header, or None if absent or invalid."""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        return jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+
 def create_access_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -0,0 +1,328 @@
+import asyncio
+import gzip
+import logging
+import os
+import shutil
+import socket
+import sqlite3
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+import orjson
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from app.core.db_manager import db_manager, DatabaseManager
+from app.core.db_switch import db_switch
+
+try:
+    import fcntl
+except ImportError: # Windows: single-process deployments only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_SUFFIXES = (".dump", ".sql", ".sqlite.gz", ".sqlite")
+MAX_JOBS = 50
+
+class SnapshotIndex:
+    """
+    Snapshot and job metadata kept in `index.json` next to the files, so listing
+    never stats the directory. Shared by all workers: updates hold an exclusive
+    lock and replace the file atomically. The lock blocks, so async callers go
+    through `asyncio.to_thread`.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.path = directory / "index.json"
+        self._lock_path = directory / ".index.lock"
+
+    @contextmanager
+    def _locked(self):
+        self.directory.mkdir(exist_ok=True)
+        with open(self._lock_path, "a") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _load(self) -> dict:
+        try:
+            return orjson.loads(self.path.read_bytes())
+        except (FileNotFoundError, orjson.JSONDecodeError):
+            return self._rebuild()
+
+    def _rebuild(self) -> dict:
+        """One-off scan for a directory without an index (older or copied-in snapshots)."""
+        snapshots = {}
+        for f in self.directory.iterdir():
+            if f.name.endswith(SNAPSHOT_SUFFIXES):
+                stats = f.stat()
+                snapshots[f.name] = {
+                    "name": f.name,
+                    "size": stats.st_size,
+                    "created_at": datetime.fromtimestamp(stats.st_mtime).isoformat(),
+                    "status": "ready",
+                }
+        return {"snapshots": snapshots, "jobs": {}}
+
+    def _write(self, data: dict):
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_bytes(orjson.dumps(data))
+        os.replace(tmp, self.path)
+
+    def read(self) -> dict:
+        with self._locked():
+            return self._load()
+
+    @contextmanager
+    def update(self):
+        with self._locked():
+            data = self._load()
+            yield data
+            self._write(data)
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class SnapshotService:
+    """
+    Creates and restores snapshots as background jobs.
+
+    PostgreSQL snapshots are compressed custom-format archives (`pg_dump -Fc`),
+    which `pg_restore --jobs` can load in parallel; SQLite snapshots are online
+    backups streamed through gzip. Job progress lives in the index, so any
+    worker can report it.
+    """
+
+    def __init__(self, manager: DatabaseManager = db_manager):
+        self.manager = manager
+        self.index = SnapshotIndex(manager.snapshots_dir)
+        self.compress_level = int(os.getenv("SNAPSHOT_COMPRESS_LEVEL", "6"))
+        self._host = socket.gethostname()
+        self._tasks: set[asyncio.Task] = set()
+
+    # --- Index ---
+
+    async def list_snapshots(self) -> list[dict]:
+        data = await asyncio.to_thread(self.index.read)
+        snapshots = []
+        for entry in data["snapshots"].values():
+            job = data["jobs"].get(entry.get("job_id"))
+            if entry["status"] == "running" and job:
+                entry = {**entry, "progress": job["progress"]}
+            snapshots.append(entry)
+        return sorted(snapshots, key=lambda x: x["created_at"], reverse=True)
+
+    async def get_snapshot(self, filename: str) -> dict | None:
+        data = await asyncio.to_thread(self.index.read)
+        return data["snapshots"].get(Path(filename).name)
+
+    async def register_upload(self, filename: str):
+        path = self.manager.get_snapshot_path(filename)
+
+        def register():
+            with self.index.update() as data:
+                data["snapshots"][path.name] = {
+                    "name": path.name,
+                    "size": path.stat().st_size,
+                    "created_at": datetime.now().isoformat(),
+                    "status": "ready",
+                }
+
+        await asyncio.to_thread(register)
+
+    async def get_job(self, job_id: str) -> dict | None:
+        data = await asyncio.to_thread(self.index.read)
+        job = data["jobs"].get(job_id)
+        if job and job["status"] == "running" and job["host"] == self._host and not _pid_alive(job["pid"]):
+            # The worker running it died; nothing will finish it
+            return {**job, "status": "failed", "error": "Worker exited before the job finished"}
+        return job
+
+    # --- Jobs ---
+
+    def _update_job(self, job_id: str, **fields):
+        """Blocking; call from a worker thread or through `asyncio.to_thread`."""
+        with self.index.update() as data:
+            data["jobs"][job_id].update(fields)
+
+    async def _start(self, kind: str, target: str, runner) -> dict:
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "target": target,
+            "status": "running",
+            "progress": 0.0,
+            "error": None,
+            "result": None,
+            "started_at": datetime.now().isoformat(),
+            "finished_at": None,
+            "host": self._host,
+            "pid": os.getpid(),
+        }
+
+        def register():
+            with self.index.update() as data:
+                data["jobs"][job["id"]] = job
+                for old in sorted(data["jobs"].values(), key=lambda j: j["started_at"])[:-MAX_JOBS]:
+                    del data["jobs"][old["id"]]
+                if kind == "snapshot":
+                    data["snapshots"][target] = {
+                        "name": target,
+                        "size": 0,
+                        "created_at": job["started_at"],
+                        "status": "running",
+                        "job_id": job["id"],
+                    }
+
+        await asyncio.to_thread(register)
+        task = asyncio.create_task(self._run(job["id"], runner))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job_id: str, runner):
+        try:
+            result = await runner(job_id)
+            await asyncio.to_thread(
+                self._update_job, job_id, status="done", progress=1.0, result=result, finished_at=datetime.now().isoformat()
+            )
+        except Exception as e:
+            logger.error(f"Snapshot job {job_id} failed: {e}")
+            await asyncio.to_thread(self._fail_job, job_id, str(e))
+
+    def _fail_job(self, job_id: str, error: str):
+        with self.index.update() as data:
+            job = data["jobs"][job_id]
+            job.update(status="failed", error=error, finished_at=datetime.now().isoformat())
+            if job["kind"] == "snapshot":
+                data["snapshots"].pop(job["target"], None)
+
+    def _finish_snapshot(self, filename: str):
+        size = self.manager.get_snapshot_path(filename).stat().st_size
+        with self.index.update() as data:
+            data["snapshots"][filename].update(status="ready", size=size)
+
+    async def start_snapshot(self, label: str = "manual") -> dict:
+        url = self.manager.current_url
+        if not url:
+            raise ValueError("No database connection")
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if "postgresql" in url:
+            filename = f"snapshot_{label}_{timestamp}.dump"
+            dump = self._dump_postgres
+        elif "sqlite" in url:
+            filename = f"snapshot_{label}_{timestamp}.sqlite.gz"
+            dump = self._dump_sqlite
+        else:
+            raise ValueError("Unsupported database provider for snapshots")
+
+        async def runner(job_id: str):
+            await dump(job_id, url, filename)
+            await asyncio.to_thread(self._finish_snapshot, filename)
+            return {"filename": filename}
+
+        return await self._start("snapshot", filename, runner)
+
+    async def start_restore(self, filename: str) -> dict:
+        snapshot = await self.get_snapshot(filename)
+        if not snapshot or snapshot["status"] != "ready":
+            raise FileNotFoundError("Snapshot file not found")
+
+        async def runner(job_id: str):
+            res = await db_switch.restore(snapshot["name"])
+            if not res.status:
+                raise RuntimeError(res.message)
+            return res.data
+
+        return await self._start("restore", snapshot["name"], runner)
+
+    # --- Dumps ---
+
+    async def _count_tables(self) -> int:
+        count = 0
+        async for db in self.manager.get_async_session():
+            result = await db.execute(text(
+                "SELECT count(*) FROM pg_tables WHERE schemaname NOT IN ('pg_catalog', 'information_schema')"
+            ))
+            count = result.scalar()
+        return count
+
+    async def _dump_postgres(self, job_id: str, url: str, filename: str):
+        url = make_url(url)
+        env = os.environ.copy()
+        if url.password:
+            env["PGPASSWORD"] = url.password
+
+        total = await self._count_tables()
+        final = self.manager.get_snapshot_path(filename)
+        part = final.with_name(final.name + ".part")
+        proc = await asyncio.create_subprocess_exec(
+            "pg_dump", "-Fc", "-Z", str(self.compress_level), "--verbose",
+            "-h", url.host or "localhost",
+            "-p", str(url.port or 5432),
+            "-U", url.username or "postgres",
+            "-f", str(part),
+            url.database,
+            env=env,
+            stderr=asyncio.subprocess.PIPE
+        )
+
+        # --verbose logs one line per table as its data is dumped
+        dumped = 0
+        tail = deque(maxlen=5)
+        async for raw in proc.stderr:
+            line = raw.decode(errors="replace").strip()
+            tail.append(line)
+            if "dumping contents of table" in line:
+                dumped += 1
+                progress = min(dumped / total, 0.99) if total else 0.0
+                size = part.stat().st_size if part.exists() else 0
+                await asyncio.to_thread(self._update_job, job_id, progress=round(progress, 3), bytes=size)
+
+        if await proc.wait() != 0:
+            part.unlink(missing_ok=True)
+            raise RuntimeError(f"pg_dump failed: {' | '.join(tail)}")
+        os.replace(part, final)
+
+    async def _dump_sqlite(self, job_id: str, url: str, filename: str):
+        final = self.manager.get_snapshot_path(filename)
+        part = final.with_name(final.name + ".part")
+        copy = final.with_name(final.name + ".db.part")
+
+        def progress(status, remaining, total):
+            if total:
+                self._update_job(job_id, progress=round(0.8 * (total - remaining) / total, 3))
+
+        def work():
+            # Online backup: a consistent copy while the database stays writable
+            src = sqlite3.connect(url.replace("sqlite:///", ""))
+            dst = sqlite3.connect(copy)
+            try:
+                src.backup(dst, pages=1024, progress=progress)
+            finally:
+                dst.close()
+                src.close()
+            try:
+                with open(copy, "rb") as fin, gzip.open(part, "wb", compresslevel=self.compress_level) as fout:
+                    shutil.copyfileobj(fin, fout, 1024 * 1024)
+            finally:
+                copy.unlink(missing_ok=True)
+            os.replace(part, final)
+
+        await asyncio.to_thread(work)
+
+snapshot_service = SnapshotService()
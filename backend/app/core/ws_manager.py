@@ -1,10 +1,11 @@
 from typing import List
 from fastapi import WebSocket
 import asyncio
-import json
+import orjson
 import os
 import logging
 from redis import asyncio as aioredis
+from app.core.event_stream import RedisEventStream, LocalEventStream, parse_event_id
 
 logger = logging.getLogger(__name__)
 
@@ -13,77 +14,177 @@ class ConnectionManager:
         self.active_connections: List[WebSocket] = []
         self.redis_url = os.getenv("REDIS_URL", "redis://redis:6379/0")
         self.redis: aioredis.Redis | None = None
-        self.pubsub: aioredis.client.PubSub | None = None
         self._listener_task: asyncio.Task | None = None
-        self.channel_name = "terras_events"
+        self.stream_key = "terras_events"
+        self.stream_maxlen = int(os.getenv("WS_STREAM_MAXLEN", "10000"))
 
-    async def connect(self, websocket: WebSocket):
+        # Durable, replayable event log. Falls back to an in-process stream
+        # until (or unless) Redis is available.
+        self.stream: RedisEventStream | LocalEventStream = LocalEventStream(self.stream_maxlen)
+        # Id of the newest frame delivered to local sockets; listener restarts resume from here
+        self.last_delivered_id: str | None = None
+
+        # Coalescing window (seconds). Events broadcast within the window are
+        # merged per topic into a single array frame. 0 disables coalescing.
+        self.coalesce_window = float(os.getenv("WS_COALESCE_MS", "50")) / 1000
+        self._pending: dict[str, list[dict]] = {}
+        self._flush_task: asyncio.Task | None = None
+
+    async def connect(self, websocket: WebSocket, last_event_id: str | None = None):
+        """
+        Accepts a socket and, if the client supplies the last event id it saw,
+        replays everything it missed before it joins the live fan-out.
+        """
         await websocket.accept()
+        if last_event_id:
+            await self._replay(websocket, last_event_id)
         self.active_connections.append(websocket)
 
     def disconnect(self, websocket: WebSocket):
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
 
+    async def _replay(self, websocket: WebSocket, last_event_id: str):
+        client_id = parse_event_id(last_event_id)
+        trimmed = parse_event_id(await self.stream.trimmed_upto())
+        newest = parse_event_id(await self.stream.last_id())
+        if trimmed > client_id or client_id > newest:
+            # Something after the client's position was trimmed, or the position is
+            # from a stream this one does not continue: ask it to refetch rather
+            # than replaying a partial history on top of the RESYNC
+            await websocket.send_text(self.encode_envelope(None, orjson.dumps({"type": "RESYNC"}).decode()))
+            return
+
+        # Catch up until no newer frame was delivered while we were replaying.
+        # The final check and the append in connect() happen without yielding.
+        cursor = last_event_id
+        while self.last_delivered_id and parse_event_id(self.last_delivered_id) > parse_event_id(cursor):
+            target = self.last_delivered_id
+            for event_id, frame in await self.stream.read_range(cursor, target):
+                await websocket.send_text(self.encode_envelope(event_id, frame))
+            cursor = target
+
     async def initialize(self):
-        """Initializes Redis connection and PubSub listener."""
+        """Initializes the Redis Stream and its listener."""
+        await self._close_redis()
         try:
             self.redis = aioredis.from_url(self.redis_url, decode_responses=True)
-            self.pubsub = self.redis.pubsub()
-            await self.pubsub.subscribe(self.channel_name)
+            await self.redis.ping()
+            self.stream = RedisEventStream(self.redis, self.stream_key, self.stream_maxlen)
+            if self.last_delivered_id is None:
+                self.last_delivered_id = await self.stream.last_id()
             self._listener_task = asyncio.create_task(self._listen_to_redis())
             logger.info(f"WebSocket manager initialized with Redis: {self.redis_url}")
         except Exception as e:
             logger.error(f"Failed to initialize Redis for WebSockets: {e}")
+            await self._close_redis()
+            if not isinstance(self.stream, LocalEventStream):
+                self.stream = LocalEventStream(self.stream_maxlen)
 
     async def stop(self):
-        """Stops the listener and closes Redis."""
+        """Flushes pending events, stops the listener and closes Redis."""
+        await self.flush()
         if self._listener_task:
             self._listener_task.cancel()
-        if self.pubsub:
-            await self.pubsub.unsubscribe(self.channel_name)
-            await self.pubsub.close()
-        if self.redis:
-            await self.redis.close()
+        await self._close_redis()
+
+    async def _close_redis(self):
+        redis, self.redis = self.redis, None
+        if redis:
+            try:
+                await redis.close()
+            except Exception as e:
+                logger.warning(f"Failed to close Redis client: {e}")
 
     async def _listen_to_redis(self):
-        """Internal task to listen for Redis messages and broadcast to local clients."""
+        """Internal task that tails the Redis Stream and broadcasts to local clients."""
         try:
             while True:
-                message = await self.pubsub.get_message(ignore_subscribe_messages=True)
-                if message and message["type"] == "message":
-                    data = json.loads(message["data"])
-                    await self._local_broadcast(data)
-                await asyncio.sleep(0.01) # Low latency check
+                for event_id, frame in await self.stream.read_new(self.last_delivered_id or "$"):
+                    await self._deliver(event_id, frame)
         except asyncio.CancelledError:
             pass
         except Exception as e:
             logger.error(f"Redis listener encountered error: {e}")
             await asyncio.sleep(5)
-            # Re-initialize on failure
+            # Re-initialize on failure; resumes from last_delivered_id so nothing is lost
             asyncio.create_task(self.initialize())
 
-    async def _local_broadcast(self, message: dict):
-        """Broadcasts to connections on THIS server instance."""
-        for connection in self.active_connections:
+    async def _deliver(self, event_id: str, frame: str):
+        self.last_delivered_id = event_id
+        await self._local_broadcast(self.encode_envelope(event_id, frame))
+
+    async def _local_broadcast(self, frame: str):
+        """Sends an encoded frame to connections on THIS server instance."""
+        connections = list(self.active_connections)
+        if not connections:
+            return
+        results = await asyncio.gather(
+            *(connection.send_text(frame) for connection in connections),
+            return_exceptions=True
+        )
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception):
+                self.disconnect(connection)
+
+    @staticmethod
+    def encode_frame(events: list[dict]) -> str:
+        """Serializes a topic batch once. A single event keeps the plain object shape."""
+        payload = events[0] if len(events) == 1 else events
+        return orjson.dumps(payload).decode()
+
+    @staticmethod
+    def encode_envelope(event_id: str | None, frame: str) -> str:
+        """Wraps an already-encoded frame with its stream id without re-serializing it."""
+        id_part = f'"{event_id}"' if event_id else "null"
+        return f'{{"id":{id_part},"data":{frame}}}'
+
+    async def _publish(self, frame: str):
+        if isinstance(self.stream, RedisEventStream):
             try:
-                await connection.send_json(message)
-            except Exception:
-                pass
+                await self.stream.append(frame)
+                return
+            except Exception as e:
+                logger.error(f"Failed to publish to Redis: {e}")
+                # Fallback to local delivery if Redis is down (not replayable)
+                await self._local_broadcast(self.encode_envelope(None, frame))
+                return
+        # Single-node mode: the local stream both records and delivers
+        event_id = await self.stream.append(frame)
+        await self._deliver(event_id, frame)
+
+    async def _flush_later(self):
+        try:
+            await asyncio.sleep(self.coalesce_window)
+        except asyncio.CancelledError:
+            return
+        self._flush_task = None
+        await self.flush()
 
-    async def broadcast(self, message: dict):
+    async def flush(self):
+        """Publishes every pending topic batch as one frame per topic."""
+        if self._flush_task and self._flush_task is not asyncio.current_task():
+            self._flush_task.cancel()
+        self._flush_task = None
+
+        pending, self._pending = self._pending, {}
+        for events in pending.values():
+            await self._publish(self.encode_frame(events))
+
+    async def broadcast(self, message: dict, topic: str | None = None):
         """
-        Global broadcast: Publishes to Redis.
+        Global broadcast: Appends to the event stream.
         The listener on each instance will pick it up and broadcast locally.
+        Events sharing a topic (defaults to the message type) within the
+        coalescing window are delivered together as one array frame.
         """
-        if self.redis:
-            try:
-                await self.redis.publish(self.channel_name, json.dumps(message))
-            except Exception as e:
-                logger.error(f"Failed to publish to Redis: {e}")
-                # Fallback to local broadcast if Redis is down
-                await self._local_broadcast(message)
-        else:
-            await self._local_broadcast(message)
+        if self.coalesce_window <= 0:
+            await self._publish(self.encode_frame([message]))
+            return
+
+        topic = topic or message.get("type", "default")
+        self._pending.setdefault(topic, []).append(message)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
 
 manager = ConnectionManager()
@@ -20,6 +20,7 @@ from app.models.bom import BOM, BOMLine, bom_values, bom_line_values, BOMOperati
 from app.models.manufacturing import WorkOrder, work_order_values
 from app.models.stock_ledger import StockLedger, stock_ledger_values
 from app.models.variant import Variant
+from app.models.variant_values import VariantCombination
 from app.models.routing import WorkCenter, Operation
 from app.models.auth import Permission, Role, User, role_permissions, user_permissions
 from app.models.uom import UOM
@@ -31,3 +32,5 @@ from app.models.partner import Partner
 from app.models.purchase import PurchaseOrder, PurchaseOrderLine, purchase_order_line_values
 from app.models.stock_balance import StockBalance, stock_balance_values
 from app.models.settings import CompanyProfile
+from app.models.outbox import OutboxEvent
+from app.models.import_job import ImportJob
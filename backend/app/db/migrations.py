@@ -0,0 +1,281 @@
+"""
+Versioned schema migrations.
+
+Each step runs once per database and is recorded in `schema_migrations`. The
+runner holds a PostgreSQL advisory lock, so when several replicas start
+together one migrates and the others wait and then find nothing pending. A
+start with nothing pending costs a lock, `create_all` and one SELECT.
+
+Steps are append-only: never renumber or edit a step that has shipped, add a
+new one. Steps that build indexes are non-transactional and use
+CREATE INDEX CONCURRENTLY, so writes continue during the build.
+"""
+import logging
+from dataclasses import dataclass
+from typing import Callable
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from app.db.base import Base
+
+logger = logging.getLogger(__name__)
+
+# Any fixed 64-bit key; every replica must use the same one
+MIGRATION_LOCK_KEY = 0x65727073636d6967
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    run: Callable[[Connection], None]
+    # False for CREATE INDEX CONCURRENTLY and anything else that cannot run in a transaction
+    transactional: bool = True
+
+MIGRATIONS: list[Migration] = []
+
+def migration(version: int, transactional: bool = True):
+    def register(fn: Callable[[Connection], None]):
+        MIGRATIONS.append(Migration(version, fn.__name__, fn, transactional))
+        return fn
+    return register
+
+def _has_column(conn: Connection, table: str, column: str) -> bool:
+    res = conn.execute(
+        text("SELECT 1 FROM information_schema.columns WHERE table_name = :table AND column_name = :column"),
+        {"table": table, "column": column}
+    )
+    return res.first() is not None
+
+def _create_index(conn: Connection, name: str, definition: str):
+    """CREATE INDEX CONCURRENTLY, first dropping an invalid index left behind by an interrupted build."""
+    invalid = conn.execute(
+        text("SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name AND NOT i.indisvalid"),
+        {"name": name}
+    )
+    if invalid.first():
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}"))
+
+# Tables that carry a variant: (table, association table, its foreign key to the table)
+VARIANT_TABLES = [
+    ("boms", "bom_values", "bom_id"),
+    ("bom_lines", "bom_line_values", "bom_line_id"),
+    ("work_orders", "work_order_values", "work_order_id"),
+    ("stock_ledger", "stock_ledger_values", "stock_ledger_id"),
+    ("stock_balances", "stock_balance_values", "balance_id"),
+    ("sales_order_lines", "sales_order_line_values", "sales_order_line_id"),
+    ("purchase_order_lines", "purchase_order_line_values", "purchase_order_line_id"),
+]
+
+@migration(1)
+def baseline_columns(conn: Connection):
+    # Columns added to models after their tables first shipped
+    columns = [
+        ("items", "category", "VARCHAR(64)"),
+        ("items", "source_sample_id", "UUID REFERENCES items(id)"),
+        ("items", "attribute_id", "UUID REFERENCES attributes(id)"),
+        ("work_orders", "location_id", "UUID REFERENCES locations(id)"),
+        ("work_orders", "source_location_id", "UUID REFERENCES locations(id)"),
+        ("work_orders", "target_start_date", "TIMESTAMP WITHOUT TIME ZONE"),
+        ("work_orders", "target_end_date", "TIMESTAMP WITHOUT TIME ZONE"),
+        ("work_orders", "actual_start_date", "TIMESTAMP WITHOUT TIME ZONE"),
+        ("work_orders", "actual_end_date", "TIMESTAMP WITHOUT TIME ZONE"),
+        ("work_orders", "completed_at", "TIMESTAMP WITHOUT TIME ZONE"),
+        ("work_orders", "sales_order_id", "UUID REFERENCES sales_orders(id)"),
+        ("work_orders", "parent_wo_id", "UUID REFERENCES work_orders(id)"),
+        ("bom_lines", "source_location_id", "UUID REFERENCES locations(id)"),
+        ("bom_lines", "is_percentage", "BOOLEAN DEFAULT FALSE"),
+        ("boms", "tolerance_percentage", "NUMERIC(5,2) DEFAULT 0.0"),
+        ("purchase_orders", "target_location_id", "UUID REFERENCES locations(id)"),
+        ("users", "hashed_password", "VARCHAR(255)"),
+        ("users", "allowed_categories", "JSON"),
+        ("sales_orders", "delivered_at", "TIMESTAMP WITHOUT TIME ZONE"),
+    ]
+    for table in ("items", "boms", "attributes", "attribute_values", "locations", "uoms", "categories", "partners"):
+        columns.append((table, "updated_at", "TIMESTAMP WITHOUT TIME ZONE DEFAULT (now() AT TIME ZONE 'utc')"))
+
+    for table, column, column_type in columns:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {column_type}"))
+
+@migration(2)
+def attribute_value_associations(conn: Connection):
+    # Single attribute_id / attribute_value_id columns moved to many-to-many tables
+    moves = [
+        ("items", "attribute_id", "item_attributes", "item_id", "attribute_id"),
+        ("stock_ledger", "attribute_value_id", "stock_ledger_values", "stock_ledger_id", "attribute_value_id"),
+        ("boms", "attribute_value_id", "bom_values", "bom_id", "attribute_value_id"),
+        ("bom_lines", "attribute_value_id", "bom_line_values", "bom_line_id", "attribute_value_id"),
+        ("work_orders", "attribute_value_id", "work_order_values", "work_order_id", "attribute_value_id"),
+    ]
+    for src_table, src_col, target_table, target_id_col, target_val_col in moves:
+        if _has_column(conn, src_table, src_col):
+            conn.execute(text(f"""
+                INSERT INTO {target_table} ({target_id_col}, {target_val_col})
+                SELECT id, {src_col} FROM {src_table}
+                WHERE {src_col} IS NOT NULL
+                ON CONFLICT DO NOTHING
+            """))
+
+@migration(3)
+def trigram_extension(conn: Connection):
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+@migration(4, transactional=False)
+def baseline_indexes(conn: Connection):
+    indexes = [
+        ("idx_items_category", "items (category)"),
+        ("idx_bom_lines_item_id", "bom_lines (item_id)"),
+        ("idx_work_orders_item_id", "work_orders (item_id)"),
+        ("idx_audit_logs_entity_type", "audit_logs (entity_type)"),
+        ("idx_audit_logs_entity_id", "audit_logs (entity_id)"),
+        ("idx_audit_logs_timestamp", "audit_logs (timestamp)"),
+        ("idx_sample_requests_so_id", "sample_requests (sales_order_id)"),
+        ("idx_sample_requests_base_id", "sample_requests (base_item_id)"),
+        # Item search: trigram GIN for substring matches, pattern ops for code prefixes
+        ("idx_items_code_trgm", "items USING gin (code gin_trgm_ops)"),
+        ("idx_items_name_trgm", "items USING gin (name gin_trgm_ops)"),
+        ("idx_items_code_lower_prefix", "items (lower(code) text_pattern_ops)"),
+    ]
+    for table in ("items", "boms", "attributes", "attribute_values", "locations", "uoms", "categories", "partners"):
+        indexes.append((f"ix_{table}_updated_at", f"{table} (updated_at)"))
+
+    for name, definition in indexes:
+        _create_index(conn, name, definition)
+
+@migration(5)
+def variant_value_arrays(conn: Connection):
+    # Denormalized attribute_value_ids, backfilled from the association tables
+    for table, assoc_table, fk_col in VARIANT_TABLES:
+        if _has_column(conn, table, "attribute_value_ids"):
+            continue
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN attribute_value_ids UUID[] NOT NULL DEFAULT '{{}}'"))
+        # Same order as canonical_value_ids: sorted as text
+        conn.execute(text(f"""
+            UPDATE {table} t SET attribute_value_ids = v.ids
+            FROM (
+                SELECT {fk_col}, array_agg(attribute_value_id ORDER BY attribute_value_id::text COLLATE "C") AS ids
+                FROM {assoc_table} GROUP BY {fk_col}
+            ) v
+            WHERE t.id = v.{fk_col}
+        """))
+
+@migration(6, transactional=False)
+def variant_value_array_indexes(conn: Connection):
+    for table in ("stock_balances", "stock_ledger"):
+        _create_index(conn, f"ix_{table}_attribute_value_ids", f"{table} USING gin (attribute_value_ids)")
+
+@migration(7)
+def interned_variants(conn: Connection):
+    # variant_id on every variant table, interned from attribute_value_ids (0 is the empty set)
+    conn.execute(text("INSERT INTO variant_combinations (id, attribute_value_ids) VALUES (0, '{}') ON CONFLICT DO NOTHING"))
+    for table, _, _ in VARIANT_TABLES:
+        if _has_column(conn, table, "variant_id"):
+            continue
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN variant_id INTEGER NOT NULL DEFAULT 0 REFERENCES variant_combinations(id)"))
+        conn.execute(text(f"""
+            INSERT INTO variant_combinations (attribute_value_ids)
+            SELECT DISTINCT attribute_value_ids FROM {table} WHERE attribute_value_ids <> '{{}}'
+            ON CONFLICT DO NOTHING
+        """))
+        conn.execute(text(f"""
+            UPDATE {table} t SET variant_id = v.id
+            FROM variant_combinations v
+            WHERE v.attribute_value_ids = t.attribute_value_ids AND t.attribute_value_ids <> '{{}}'
+        """))
+
+    # Balances were keyed by a comma-joined variant_key string
+    if _has_column(conn, "stock_balances", "variant_key"):
+        conn.execute(text("ALTER TABLE stock_balances DROP CONSTRAINT IF EXISTS _item_loc_variant_uc"))
+        conn.execute(text("ALTER TABLE stock_balances ADD CONSTRAINT _item_loc_variant_uc UNIQUE (item_id, location_id, variant_id)"))
+        conn.execute(text("ALTER TABLE stock_balances DROP COLUMN variant_key"))
+
+@migration(8, transactional=False)
+def interned_variant_indexes(conn: Connection):
+    for table, _, _ in VARIANT_TABLES:
+        _create_index(conn, f"ix_{table}_variant_id", f"{table} (variant_id)")
+    _create_index(conn, "ix_stock_ledger_item_location_variant", "stock_ledger (item_id, location_id, variant_id)")
+
+@migration(9, transactional=False)
+def hot_query_indexes(conn: Connection):
+    # See tests/test_query_plans.py
+    _create_index(conn, "ix_work_orders_status", "work_orders (status)")
+    _create_index(conn, "ix_work_orders_parent_wo_id", "work_orders (parent_wo_id)")
+    _create_index(conn, "ix_work_orders_root_created_at", "work_orders (created_at) WHERE parent_wo_id IS NULL")
+    _create_index(conn, "ix_audit_logs_entity_timestamp", "audit_logs (entity_type, entity_id, timestamp)")
+
+@migration(10)
+def rebuild_stock_balances(conn: Connection):
+    # Balances were re-derived from the ledger on every start; they are kept
+    # current by the stock services now, so rebuild them once here. DELETE
+    # rather than TRUNCATE: readers keep the old rows until this commits.
+    conn.execute(text("DELETE FROM stock_balance_values"))
+    conn.execute(text("DELETE FROM stock_balances"))
+    conn.execute(text("""
+        INSERT INTO stock_balances (id, item_id, location_id, variant_id, attribute_value_ids, qty)
+        SELECT gen_random_uuid(), l.item_id, l.location_id, l.variant_id, v.attribute_value_ids, sum(l.qty_change)
+        FROM stock_ledger l
+        JOIN variant_combinations v ON v.id = l.variant_id
+        GROUP BY l.item_id, l.location_id, l.variant_id, v.attribute_value_ids
+    """))
+    conn.execute(text("""
+        INSERT INTO stock_balance_values (balance_id, attribute_value_id)
+        SELECT b.id, unnest(b.attribute_value_ids) FROM stock_balances b
+    """))
+
+@migration(11)
+def bom_child_updated_at(conn: Connection):
+    # The BOM list ETag covers lines and operations as well
+    for table in ("bom_lines", "bom_operations"):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (now() AT TIME ZONE 'utc')"))
+
+@migration(12, transactional=False)
+def bom_child_updated_at_indexes(conn: Connection):
+    for table in ("bom_lines", "bom_operations"):
+        _create_index(conn, f"ix_{table}_updated_at", f"{table} (updated_at)")
+
+def run_migrations(engine: Engine) -> list[int]:
+    """
+    Creates missing tables and applies pending migrations in version order.
+    Returns the versions applied. A failing step raises; it is not recorded, so
+    it runs again on the next start. The steps are PostgreSQL DDL: other
+    databases (SQLite in tests) only get their tables created.
+    """
+    if engine.dialect.name != "postgresql":
+        Base.metadata.create_all(bind=engine)
+        return []
+
+    with engine.connect() as conn:
+        # Session-level lock: held across the per-step commits below
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        conn.commit()
+        try:
+            with conn.begin():
+                conn.execute(text("""
+                    CREATE TABLE IF NOT EXISTS schema_migrations (
+                        version INTEGER PRIMARY KEY,
+                        name VARCHAR(128) NOT NULL,
+                        applied_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+                    )
+                """))
+                Base.metadata.create_all(bind=conn)
+                applied = set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+            pending = sorted((m for m in MIGRATIONS if m.version not in applied), key=lambda m: m.version)
+            for step in pending:
+                logger.info(f"Migration {step.version}: {step.name}")
+                if not step.transactional:
+                    # Own autocommit connection; this one is idle, so concurrent builds do not wait on it
+                    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as autocommit:
+                        step.run(autocommit)
+                with conn.begin():
+                    if step.transactional:
+                        step.run(conn)
+                    conn.execute(
+                        text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                        {"version": step.version, "name": step.name}
+                    )
+            return [step.version for step in pending]
+        finally:
+            if conn.in_transaction():
+                conn.rollback()
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            conn.commit()
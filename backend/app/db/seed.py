@@ -0,0 +1,114 @@
+"""
+Default categories, UOMs, permissions, roles and demo users.
+
+The fixtures are plain data. `apply_fixtures` inserts whatever is missing with
+bulk INSERT ... ON CONFLICT DO NOTHING in one transaction and records a hash of
+the data, so a boot against a database that already has this exact set does
+one SELECT and nothing else. Existing rows are never changed: edits made in the
+app (a renamed role, a changed password) survive, and removing an entry here
+does not delete it.
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from app.models.category import Category
+from app.models.uom import UOM
+from app.models.auth import Permission, Role, User, role_permissions
+from app.core.security import get_password_hash
+
+logger = logging.getLogger(__name__)
+
+FIXTURE_NAME = "defaults"
+
+# Demo accounts are created with this password; change it after first login
+DEFAULT_PASSWORD = "password"
+
+FIXTURES = {
+    "categories": ["Raw Material", "WIP", "Finished Goods", "Sample", "Consumable"],
+    "uoms": ["pcs", "kg", "m", "l", "box", "roll"],
+    "permissions": {
+        "inventory.manage": "Manage Items, Attributes, Categories",
+        "inventory.delete": "Delete Inventory Data",
+        "locations.manage": "Manage Locations",
+        "manufacturing.manage": "Manage BOMs and Routing",
+        "work_order.manage": "Create and Update Work Orders",
+        "stock.entry": "Record Stock Movements",
+        "reports.view": "View Reports",
+        "admin.access": "Full System Access",
+    },
+    "roles": {
+        "Administrator": ["admin.access", "inventory.manage", "inventory.delete", "locations.manage", "manufacturing.manage", "work_order.manage", "stock.entry", "reports.view"],
+        "Store Manager": ["inventory.manage", "stock.entry", "reports.view"],
+        "Production Manager": ["manufacturing.manage", "work_order.manage", "reports.view"],
+        "Operator": ["work_order.manage"],
+    },
+    # username: (full name, role)
+    "users": {
+        "admin": ("System Admin", "Administrator"),
+        "store_mgr": ("Budi Store", "Store Manager"),
+        "prod_mgr": ("Siti Production", "Production Manager"),
+        "operator": ("Joko Worker", "Operator"),
+    },
+}
+
+def fixture_hash(fixtures: dict = FIXTURES) -> str:
+    return hashlib.sha256(json.dumps(fixtures, sort_keys=True).encode()).hexdigest()
+
+def apply_fixtures(engine: Engine, fixtures: dict = FIXTURES) -> bool:
+    """Inserts missing fixture rows. Returns False when this fixture set was already applied."""
+    digest = fixture_hash(fixtures)
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS seed_fixtures (
+                name VARCHAR(64) PRIMARY KEY,
+                content_hash VARCHAR(64) NOT NULL,
+                applied_at TIMESTAMP NOT NULL
+            )
+        """))
+        applied = conn.execute(text("SELECT content_hash FROM seed_fixtures WHERE name = :name"), {"name": FIXTURE_NAME}).scalar()
+        if applied == digest:
+            return False
+
+        insert = pg_insert if conn.dialect.name == "postgresql" else sqlite_insert
+
+        def insert_missing(table, rows: list[dict], *keys: str):
+            if rows:
+                conn.execute(insert(table).on_conflict_do_nothing(index_elements=list(keys)), rows)
+
+        insert_missing(Category.__table__, [{"name": name} for name in fixtures["categories"]], "name")
+        insert_missing(UOM.__table__, [{"name": name} for name in fixtures["uoms"]], "name")
+        insert_missing(Permission.__table__, [{"code": code, "description": desc} for code, desc in fixtures["permissions"].items()], "code")
+        insert_missing(Role.__table__, [{"name": name} for name in fixtures["roles"]], "name")
+
+        perm_ids = dict(conn.execute(select(Permission.code, Permission.id).where(Permission.code.in_(list(fixtures["permissions"])))).all())
+        role_ids = dict(conn.execute(select(Role.name, Role.id).where(Role.name.in_(list(fixtures["roles"])))).all())
+        insert_missing(role_permissions, [
+            {"role_id": role_ids[role], "permission_id": perm_ids[code]}
+            for role, codes in fixtures["roles"].items() for code in codes
+        ], "role_id", "permission_id")
+
+        # Only new accounts pay for the (deliberately slow) password hash
+        existing = set(conn.execute(select(User.username).where(User.username.in_(list(fixtures["users"])))).scalars())
+        new_users = [(username, full_name, role) for username, (full_name, role) in fixtures["users"].items() if username not in existing]
+        if new_users:
+            hashed_password = get_password_hash(DEFAULT_PASSWORD)
+            insert_missing(User.__table__, [
+                {"username": username, "full_name": full_name, "role_id": role_ids[role], "hashed_password": hashed_password}
+                for username, full_name, role in new_users
+            ], "username")
+
+        # Upsert: a concurrent seeder may have recorded the same fixture set already
+        conn.execute(
+            text("""
+                INSERT INTO seed_fixtures (name, content_hash, applied_at) VALUES (:name, :hash, :at)
+                ON CONFLICT (name) DO UPDATE SET content_hash = excluded.content_hash, applied_at = excluded.applied_at
+            """),
+            {"name": FIXTURE_NAME, "hash": digest, "at": datetime.utcnow()}
+        )
+    logger.info(f"Applied seed fixtures {digest[:12]}")
+    return True
@@ -1,15 +1,21 @@
 import os
+from fastapi import Request
 from app.core.db_manager import db_manager
+from app.core.read_routing import read_your_writes
+from app.core.security import token_subject
 
 # Default configuration from Environment
 DATABASE_URL = os.getenv(
     "DATABASE_URL",
     "postgresql+psycopg2://erp:erp@db:5432/erp"
 )
+# Optional streaming replica for read-heavy endpoints (see get_async_read_db)
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
 
-# Initialize the manager with the default URL on first load
+# Record the default URL on first load; engines are built on first use
+# (the API lifespan, or the first session a script opens)
 if not db_manager.current_url:
-    db_manager.initialize(DATABASE_URL)
+    db_manager.configure(DATABASE_URL, replica_url=DATABASE_REPLICA_URL)
 
 # For direct engine access
 def get_engine():
@@ -21,17 +27,28 @@ def get_engine():
 def SessionLocal():
     return db_manager.session_factory()
 
-# Backward compatibility for direct engine import
+# Backward compatibility for direct engine import, resolved when first imported
+# so that importing this module does not build engines.
 # WARNING: If database is hot-swapped, this specific reference might become stale
 # if it was imported as 'from app.db.session import engine'.
 # Modules should prefer using get_engine() or db_manager.engine.
-engine = db_manager.engine
+def __getattr__(name):
+    if name == "engine":
+        return db_manager.engine
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Dependency for FastAPI (Sync)
+# Sync session generator (scripts and migrations only; API routes use get_async_db)
 def get_db():
     yield from db_manager.get_session()
 
 # Dependency for FastAPI (Async)
 async def get_async_db():
     async for session in db_manager.get_async_session():
-        yield session
\ No newline at end of file
+        yield session
+
+# Read-only dependency for list/report endpoints. Uses the replica when configured,
+# but stays on the primary for a user who has just written (read-your-writes).
+async def get_async_read_db(request: Request):
+    user_id = token_subject(request.headers.get("authorization"))
+    async for session in db_manager.get_read_session(use_primary=read_your_writes.pinned(user_id)):
+        yield session
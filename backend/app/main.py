@@ -1,5 +1,5 @@
 from pathlib import Path
-from fastapi import FastAPI, Request, APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Request, APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException
 from fastapi.responses import HTMLResponse, ORJSONResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
@@ -9,19 +9,39 @@ import os
 from contextlib import asynccontextmanager
 
 from fastapi.staticfiles import StaticFiles
-from app.db.session import engine
 from app.core.db_manager import db_manager
-from app.db.base import Base
-from app.api import items, locations, stock, attributes, boms, manufacturing, categories, routing, auth, uoms, sales, samples, audit, admin, dashboard, partners, purchase, settings
+from app.api import items, locations, stock, attributes, boms, manufacturing, categories, routing, auth, uoms, sales, samples, audit, admin, dashboard, partners, purchase, settings, imports
 from app.core.ws_manager import manager
+from app.core.outbox_relay import outbox_relay
+from app.core.import_worker import import_worker
+from app.core.invalidation import invalidation_bus
+from app.core.db_switch import db_switch
+from app.core.reference_cache import reference_cache
+from app.core.kdf_pool import kdf_pool
+from app.core.read_routing import ReadYourWritesMiddleware
+from app.api.auth import get_current_user
+from app.models.auth import User
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Initialize Redis for WebSockets
+    # Startup: Initialize Redis for WebSockets, cache invalidation and the outbox relay
     await manager.initialize()
+    await invalidation_bus.initialize()
+    # Follow a database switch made while this worker was down
+    await db_switch.start()
+    # Engines are created here, not at import; tables and seeds belong to app.db.init_db
+    db_manager.ensure_engines()
+    await reference_cache.warm(db_manager.get_async_session)
+    await outbox_relay.start()
+    await import_worker.start()
     yield
-    # Shutdown: Close Redis connections
+    # Shutdown: Stop background workers, then close Redis connections
+    await import_worker.stop()
+    await outbox_relay.stop()
+    await db_switch.stop()
+    await invalidation_bus.stop()
     await manager.stop()
+    kdf_pool.shutdown()
 
 app = FastAPI(
     title="Terras ERP", 
@@ -37,28 +57,15 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 # --- Router Configuration ---
 api_router = APIRouter()
 
-api_router.include_router(items.router)
-api_router.include_router(locations.router)
-api_router.include_router(stock.router)
-api_router.include_router(attributes.router)
-api_router.include_router(boms.router)
-api_router.include_router(manufacturing.router)
-api_router.include_router(categories.router)
-api_router.include_router(routing.router)
-api_router.include_router(auth.router)
-api_router.include_router(uoms.router)
-api_router.include_router(sales.router)
-api_router.include_router(samples.router)
-api_router.include_router(audit.router)
-api_router.include_router(admin.router)
-api_router.include_router(dashboard.router)
-api_router.include_router(partners.router)
-api_router.include_router(purchase.router)
-api_router.include_router(settings.router)
+# Included straight into the app: each include rebuilds every route, so routing
+# them through api_router as well would double that work at worker boot
+for module in (items, locations, stock, attributes, boms, manufacturing, categories, routing, auth, uoms, sales, samples, audit, admin, dashboard, partners, purchase, settings, imports):
+    app.include_router(module.router, prefix="/api")
 
 @api_router.websocket("/ws/events")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, last_event_id: str | None = None):
+    # Reconnecting clients pass the id of the last frame they saw to replay missed events
+    await manager.connect(websocket, last_event_id=last_event_id)
     try:
         while True:
             await websocket.receive_text()
@@ -71,6 +78,13 @@ async def websocket_endpoint(websocket: WebSocket):
 async def health():
     return {"status": "ok"}
 
+@api_router.get("/health/metrics")
+async def health_metrics(current_user: User = Depends(get_current_user)):
+    # Pool sizes and queue depths are for operators, not for any caller
+    if not current_user.role or current_user.role.name != "Administrator":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return {"kdf": kdf_pool.stats(), "db": db_manager.pool_metrics()}
+
 @api_router.get("/health/ready")
 async def health_readiness():
     checks = {"db": "fail", "redis": "fail"}
@@ -101,6 +115,8 @@ templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
 
 origins = os.getenv("BACKEND_CORS_ORIGINS", "http://localhost:3000,http://localhost:3030").split(",")
 
+app.add_middleware(ReadYourWritesMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
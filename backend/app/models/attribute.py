@@ -1,8 +1,9 @@
 import uuid
-from sqlalchemy import String, ForeignKey
+from sqlalchemy import String, ForeignKey, DateTime
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
+from datetime import datetime
 
 class Attribute(Base):
     __tablename__ = "attributes"
@@ -11,6 +12,7 @@ class Attribute(Base):
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
     )
     name: Mapped[str] = mapped_column(String(255), unique=True, index=True) # e.g. "Color"
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     values = relationship("AttributeValue", backref="attribute", cascade="all, delete-orphan")
 
@@ -24,3 +26,4 @@ class AttributeValue(Base):
         UUID(as_uuid=True), ForeignKey("attributes.id"), index=True
     )
     value: Mapped[str] = mapped_column(String(255)) # e.g. "Red"
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
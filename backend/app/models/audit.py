@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import String, ForeignKey, Text, DateTime
+from sqlalchemy import String, ForeignKey, Text, DateTime, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
@@ -24,3 +24,8 @@ class AuditLog(Base):
 
     # Relationships
     user = relationship("User")
+
+    # History of one entity, newest first
+    __table_args__ = (
+        Index("ix_audit_logs_entity_timestamp", "entity_type", "entity_id", "timestamp"),
+    )
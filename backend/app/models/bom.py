@@ -1,7 +1,9 @@
-from sqlalchemy import String, ForeignKey, Numeric, Boolean, Table, Column
+from sqlalchemy import String, ForeignKey, Numeric, Boolean, Table, Column, DateTime
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
+from app.models.variant_values import VariantValuesMixin
+from datetime import datetime
 import uuid
 
 # Association tables
@@ -19,7 +21,7 @@ bom_line_values = Table(
     Column("attribute_value_id", UUID(as_uuid=True), ForeignKey("attribute_values.id"), primary_key=True),
 )
 
-class BOM(Base):
+class BOM(VariantValuesMixin, Base):
     __tablename__ = "boms"
 
     id: Mapped[uuid.UUID] = mapped_column(
@@ -36,6 +38,7 @@ class BOM(Base):
     tolerance_percentage: Mapped[float] = mapped_column(Numeric(5, 2), default=0.0) # e.g. 10.0 for 10%
     
     active: Mapped[bool] = mapped_column(Boolean, default=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     # Relationships
     item = relationship("Item")
@@ -53,7 +56,7 @@ class BOM(Base):
         return self.item.name if self.item else None
 
 
-class BOMLine(Base):
+class BOMLine(VariantValuesMixin, Base):
     __tablename__ = "bom_lines"
 
     id: Mapped[uuid.UUID] = mapped_column(
@@ -75,6 +78,7 @@ class BOMLine(Base):
 
     qty: Mapped[float] = mapped_column(Numeric(14, 4))
     is_percentage: Mapped[bool] = mapped_column(Boolean, default=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     # Relationships
     bom = relationship("BOM", back_populates="lines")
@@ -112,3 +116,4 @@ class BOMOperation(Base):
     
     sequence: Mapped[int] = mapped_column(Numeric(4, 0), default=10) # e.g. 10, 20, 30
     time_minutes: Mapped[float] = mapped_column(Numeric(10, 2), default=0.0) # Estimated time
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
@@ -1,8 +1,9 @@
 import uuid
-from sqlalchemy import String
+from sqlalchemy import String, DateTime
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db.base import Base
+from datetime import datetime
 
 class Category(Base):
     __tablename__ = "categories"
@@ -11,3 +12,4 @@ class Category(Base):
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
     )
     name: Mapped[str] = mapped_column(String(64), unique=True, index=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
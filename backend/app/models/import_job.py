@@ -0,0 +1,42 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import String, Integer, DateTime, Text, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class ImportJob(Base):
+    """CSV upload spooled to disk and processed in batches by the import worker."""
+    __tablename__ = "import_jobs"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    kind: Mapped[str] = mapped_column(String(32), index=True) # items, partners, stock, boms
+    filename: Mapped[str] = mapped_column(String(255))
+    spool_path: Mapped[str] = mapped_column(String(512))
+    status: Mapped[str] = mapped_column(String(16), default="QUEUED", index=True) # QUEUED, RUNNING, DONE, FAILED
+
+    # Estimated from the line count when the upload is spooled
+    total_rows: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    rows_processed: Mapped[int] = mapped_column(Integer, default=0)
+    success_count: Mapped[int] = mapped_column(Integer, default=0)
+    error_count: Mapped[int] = mapped_column(Integer, default=0)
+    errors: Mapped[list] = mapped_column(JSONB, default=list) # Row-level messages (capped)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True) # Why the job failed
+
+    created_by: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL"), nullable=True
+    )
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # Touched on every batch; a RUNNING job with a stale heartbeat is picked up again
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    @property
+    def rows_per_second(self) -> float:
+        if not self.started_at or not self.rows_processed:
+            return 0.0
+        elapsed = ((self.finished_at or self.heartbeat_at or self.started_at) - self.started_at).total_seconds()
+        return round(self.rows_processed / elapsed, 1) if elapsed > 0 else 0.0
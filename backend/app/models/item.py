@@ -1,7 +1,8 @@
-from sqlalchemy import String, Boolean, ForeignKey, Table, Column
+from sqlalchemy import String, Boolean, ForeignKey, Table, Column, Index, DDL, event, text, DateTime
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
+from datetime import datetime
 import uuid
 
 # Association table for Item <-> Attribute
@@ -29,9 +30,22 @@ class Item(Base):
     )
 
     active: Mapped[bool] = mapped_column(Boolean, default=True)
+    # Set on every write; list endpoints derive their ETag from it
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     # Relationships
     attributes = relationship("Attribute", secondary=item_attributes, backref="items")
     
     # Relationship for the self-referential key
     source_sample = relationship("Item", remote_side=[id], backref="derived_items")
+
+    # Search indexes (PostgreSQL only): trigram GIN for substring/fuzzy matches
+    # and a pattern-ops index for case-insensitive code prefixes
+    __table_args__ = (
+        Index("idx_items_code_trgm", "code", postgresql_using="gin", postgresql_ops={"code": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        Index("idx_items_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        Index("idx_items_code_lower_prefix", text("lower(code) text_pattern_ops")).ddl_if(dialect="postgresql"),
+    )
+
+# The trigram operator classes must exist before create_all builds the indexes above
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
@@ -1,7 +1,8 @@
-from sqlalchemy import String, ForeignKey, Numeric, DateTime, Table, Column
+from sqlalchemy import String, ForeignKey, Numeric, DateTime, Table, Column, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
+from app.models.variant_values import VariantValuesMixin
 import uuid
 from datetime import datetime
 
@@ -13,7 +14,7 @@ work_order_values = Table(
     Column("attribute_value_id", UUID(as_uuid=True), ForeignKey("attribute_values.id"), primary_key=True),
 )
 
-class WorkOrder(Base):
+class WorkOrder(VariantValuesMixin, Base):
     __tablename__ = "work_orders"
 
     id: Mapped[uuid.UUID] = mapped_column(
@@ -47,11 +48,11 @@ class WorkOrder(Base):
     )
     
     parent_wo_id: Mapped[uuid.UUID | None] = mapped_column(
-        UUID(as_uuid=True), ForeignKey("work_orders.id"), nullable=True
+        UUID(as_uuid=True), ForeignKey("work_orders.id"), nullable=True, index=True
     )
 
     qty: Mapped[float] = mapped_column(Numeric(14, 4))
-    status: Mapped[str] = mapped_column(String(32), default="PENDING")
+    status: Mapped[str] = mapped_column(String(32), default="PENDING", index=True)
     
     # Lifecycle Timestamps
     target_start_date: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
@@ -67,6 +68,11 @@ class WorkOrder(Base):
     attribute_values = relationship("AttributeValue", secondary=work_order_values)
     parent_wo = relationship("WorkOrder", remote_side=[id], backref="child_wos")
 
+    # The work order list shows root orders newest first
+    __table_args__ = (
+        Index("ix_work_orders_root_created_at", "created_at", postgresql_where=text("parent_wo_id IS NULL")),
+    )
+
     @property
     def item_code(self) -> str | None:
         return self.item.code if self.item else None
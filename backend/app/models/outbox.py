@@ -0,0 +1,22 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import String, Integer, DateTime, Text
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class OutboxEvent(Base):
+    """Domain event written in the same transaction as the state change it describes."""
+    __tablename__ = "outbox_events"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    topic: Mapped[str] = mapped_column(String(64), index=True) # e.g. WORK_ORDER_UPDATE
+    payload: Mapped[dict] = mapped_column(JSONB)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    # NULL until the relay has fanned the event out
+    processed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, index=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
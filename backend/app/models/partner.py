@@ -1,8 +1,9 @@
 import uuid
-from sqlalchemy import String, Text, Boolean, Enum
+from sqlalchemy import String, Text, Boolean, Enum, DateTime
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db.base import Base
+from datetime import datetime
 import enum
 
 class PartnerType(enum.Enum):
@@ -19,3 +20,4 @@ class Partner(Base):
     address: Mapped[str | None] = mapped_column(Text, nullable=True)
     type: Mapped[PartnerType] = mapped_column(String(32), index=True)
     active: Mapped[bool] = mapped_column(Boolean, default=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
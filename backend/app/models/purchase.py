@@ -3,6 +3,7 @@ from sqlalchemy import String, ForeignKey, Numeric, DateTime, Text, Table, Colum
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
+from app.models.variant_values import VariantValuesMixin
 from datetime import datetime
 
 # Association table for PurchaseOrderLine <-> AttributeValue
@@ -36,7 +37,7 @@ class PurchaseOrder(Base):
     supplier = relationship("Partner")
     lines = relationship("PurchaseOrderLine", backref="order", cascade="all, delete-orphan")
 
-class PurchaseOrderLine(Base):
+class PurchaseOrderLine(VariantValuesMixin, Base):
     __tablename__ = "purchase_order_lines"
 
     id: Mapped[uuid.UUID] = mapped_column(
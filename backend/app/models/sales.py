@@ -3,6 +3,7 @@ from sqlalchemy import String, ForeignKey, Numeric, DateTime, Text, Table, Colum
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
+from app.models.variant_values import VariantValuesMixin
 from datetime import datetime
 
 # Association table for SalesOrderLine <-> AttributeValue
@@ -31,7 +32,7 @@ class SalesOrder(Base):
     # Relationships
     lines = relationship("SalesOrderLine", backref="order", cascade="all, delete-orphan")
 
-class SalesOrderLine(Base):
+class SalesOrderLine(VariantValuesMixin, Base):
     __tablename__ = "sales_order_lines"
 
     id: Mapped[uuid.UUID] = mapped_column(
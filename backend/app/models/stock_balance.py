@@ -1,8 +1,9 @@
 import uuid
-from sqlalchemy import ForeignKey, Numeric, Table, Column, String, UniqueConstraint
+from sqlalchemy import ForeignKey, Numeric, Table, Column, UniqueConstraint, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
+from app.models.variant_values import VariantValuesMixin
 
 # Association for many-to-many variants in the balance
 stock_balance_values = Table(
@@ -12,7 +13,7 @@ stock_balance_values = Table(
     Column("attribute_value_id", UUID(as_uuid=True), ForeignKey("attribute_values.id"), primary_key=True),
 )
 
-class StockBalance(Base):
+class StockBalance(VariantValuesMixin, Base):
     __tablename__ = "stock_balances"
 
     id: Mapped[uuid.UUID] = mapped_column(
@@ -32,10 +33,6 @@ class StockBalance(Base):
         Numeric(14, 4), default=0.0
     )
 
-    # For unique indexing of variants
-    # Store sorted attribute value IDs as a string for easy matching
-    variant_key: Mapped[str] = mapped_column(String(255), default="", index=True)
-
     # Relationships
     item = relationship("Item")
     location = relationship("Location")
@@ -43,5 +40,8 @@ class StockBalance(Base):
 
     # Ensure we only have one row per unique combination
     __table_args__ = (
-        UniqueConstraint('item_id', 'location_id', 'variant_key', name='_item_loc_variant_uc'),
+        # Also the (item_id, location_id, variant_id) lookup index
+        UniqueConstraint('item_id', 'location_id', 'variant_id', name='_item_loc_variant_uc'),
+        # "Which balances hold value X" (attribute_value_ids @> ARRAY[...])
+        Index("ix_stock_balances_attribute_value_ids", "attribute_value_ids", postgresql_using="gin"),
     )
@@ -1,7 +1,8 @@
-from sqlalchemy import ForeignKey, Numeric, String, DateTime, Table, Column
+from sqlalchemy import ForeignKey, Numeric, String, DateTime, Table, Column, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
+from app.models.variant_values import VariantValuesMixin
 import uuid
 from datetime import datetime
 
@@ -13,7 +14,7 @@ stock_ledger_values = Table(
     Column("attribute_value_id", UUID(as_uuid=True), ForeignKey("attribute_values.id"), primary_key=True),
 )
 
-class StockLedger(Base):
+class StockLedger(VariantValuesMixin, Base):
     __tablename__ = "stock_ledger"
 
     id: Mapped[uuid.UUID] = mapped_column(
@@ -41,3 +42,8 @@ class StockLedger(Base):
 
     # Relationships
     attribute_values = relationship("AttributeValue", secondary=stock_ledger_values)
+
+    __table_args__ = (
+        Index("ix_stock_ledger_attribute_value_ids", "attribute_value_ids", postgresql_using="gin"),
+        Index("ix_stock_ledger_item_location_variant", "item_id", "location_id", "variant_id"),
+    )
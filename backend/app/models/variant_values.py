@@ -0,0 +1,149 @@
+import uuid
+from itertools import chain
+from typing import Iterable
+from sqlalchemy import JSON, DDL, ForeignKey, Integer, event, inspect, or_, select
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, Session, mapped_column
+from sqlalchemy.types import TypeDecorator
+from app.db.base import Base
+from app.core.invalidation import invalidation_bus
+
+def canonical_value_ids(ids: Iterable) -> list[uuid.UUID]:
+    """Distinct attribute value ids in canonical order (sorted as strings)."""
+    return sorted({i if isinstance(i, uuid.UUID) else uuid.UUID(str(i)) for i in ids}, key=str)
+
+class UUIDArray(TypeDecorator):
+    """uuid[] on PostgreSQL; a JSON list of strings on other databases (SQLite)."""
+    impl = JSON
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(ARRAY(UUID(as_uuid=True)))
+        return dialect.type_descriptor(JSON())
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name == "postgresql":
+            return value
+        return [str(v) for v in value]
+
+    def process_result_value(self, value, dialect):
+        if value is None or dialect.name == "postgresql":
+            return value
+        return [uuid.UUID(v) for v in value]
+
+class VariantCombination(Base):
+    """
+    One row per distinct set of attribute values. Rows are only ever added,
+    so an id means the same variant for the life of the database. Id 0 is
+    the empty set (an item without attributes).
+    """
+    __tablename__ = "variant_combinations"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    attribute_value_ids: Mapped[list[uuid.UUID]] = mapped_column(UUIDArray, unique=True)
+
+event.listen(
+    VariantCombination.__table__,
+    "after_create",
+    DDL("INSERT INTO variant_combinations (id, attribute_value_ids) VALUES (0, '{}')").execute_if(dialect="postgresql")
+)
+
+class VariantCache:
+    """
+    Process-wide intern table: canonical value id tuple -> variant id.
+
+    Combinations never change, so entries never go stale; the cache is only
+    cleared when the worker switches database. Ids created inside a
+    transaction are held on the session and cached once it commits, so a
+    rolled-back insert is never cached.
+    """
+
+    def __init__(self):
+        self._ids: dict[tuple[uuid.UUID, ...], int] = {(): 0}
+        invalidation_bus.subscribe("variants", lambda _: self.clear())
+
+    def clear(self):
+        self._ids = {(): 0}
+
+    def cached(self, ids: Iterable) -> int | None:
+        return self._ids.get(tuple(canonical_value_ids(ids)))
+
+    def intern_many(self, session: Session, id_lists: list, create: bool = True) -> list[int | None]:
+        """
+        Variant ids for each list of attribute value ids, in one INSERT and one
+        SELECT for all cache misses. With `create=False` unknown sets give None.
+        """
+        keys = [tuple(canonical_value_ids(ids)) for ids in id_lists]
+        pending = session.info.setdefault("variant_ids", {})
+        missing = {k for k in keys if k not in self._ids and k not in pending}
+        if missing:
+            table = VariantCombination.__table__
+            if create:
+                insert = pg_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+                session.execute(
+                    insert(table)
+                    .values([{"attribute_value_ids": list(k)} for k in missing])
+                    .on_conflict_do_nothing(index_elements=["attribute_value_ids"])
+                )
+            rows = session.execute(
+                select(table.c.id, table.c.attribute_value_ids)
+                .where(or_(*(table.c.attribute_value_ids == list(k) for k in missing)))
+            )
+            for id, value_ids in rows:
+                pending[tuple(value_ids)] = id
+        return [self._ids[k] if k in self._ids else pending.get(k) for k in keys]
+
+    def _promote(self, session: Session):
+        self._ids.update(session.info.pop("variant_ids", None) or {})
+
+variant_cache = VariantCache()
+
+async def variant_id(db: AsyncSession, ids: Iterable, create: bool = True) -> int | None:
+    """Variant id of a set of attribute value ids; a cache hit needs no query."""
+    ids = list(ids)
+    cached = variant_cache.cached(ids)
+    if cached is not None:
+        return cached
+    return (await db.run_sync(lambda session: variant_cache.intern_many(session, [ids], create)))[0]
+
+class VariantValuesMixin:
+    """
+    For rows that carry a variant. The sorted attribute value ids are stored
+    in an array column next to the `attribute_values` relationship, so reads
+    need no join through the association table; `variant_id` is the same set
+    interned as an integer for keys and comparisons. The association table
+    is still written and remains the normalized record.
+    """
+    attribute_value_ids: Mapped[list[uuid.UUID]] = mapped_column(UUIDArray, default=list)
+    variant_id: Mapped[int] = mapped_column(ForeignKey("variant_combinations.id"), default=0, index=True)
+
+@event.listens_for(Session, "before_flush")
+def _sync_variant_columns(session, flush_context, instances):
+    # Keeps both columns in step with the relationship for every ORM write path
+    targets = []
+    for obj in chain(session.new, session.dirty):
+        if not isinstance(obj, VariantValuesMixin):
+            continue
+        if inspect(obj).attrs.attribute_values.history.has_changes():
+            for value in obj.attribute_values:
+                if value.id is None:
+                    value.id = uuid.uuid4()
+            obj.attribute_value_ids = canonical_value_ids(v.id for v in obj.attribute_values)
+            targets.append(obj)
+        elif obj in session.new:
+            targets.append(obj)
+    if targets:
+        ids = variant_cache.intern_many(session, [obj.attribute_value_ids or [] for obj in targets])
+        for obj, id in zip(targets, ids):
+            obj.variant_id = id
+
+@event.listens_for(Session, "after_commit")
+def _cache_committed_variants(session):
+    variant_cache._promote(session)
+
+@event.listens_for(Session, "after_rollback")
+def _drop_uncommitted_variants(session):
+    session.info.pop("variant_ids", None)
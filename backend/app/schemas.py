@@ -181,6 +181,15 @@ class PaginatedItemResponse(BaseModel):
     total: int
     page: int
     size: int
+    total_capped: bool = False # Search totals stop counting at a cap
+
+class ItemSuggestion(BaseModel):
+    id: UUID
+    code: str
+    name: str
+
+    class Config:
+        from_attributes = True
 
 class StockEntryCreate(BaseModel):
     item_code: str
@@ -215,6 +224,21 @@ class StockBalanceResponse(BaseModel):
     location_id: UUID
     qty: float
 
+class StockBalanceSummaryResponse(BaseModel):
+    # Keys not part of the grouping are left out (None)
+    item_id: UUID | None = None
+    location_id: UUID | None = None
+    variant_id: int | None = None
+    attribute_value_ids: list[UUID] | None = None
+    qty: float
+
+class PaginatedStockBalanceResponse(BaseModel):
+    items: list[StockBalanceSummaryResponse]
+    total: int
+    page: int
+    size: int
+    group_by: str
+
 class LocationCreate(BaseModel):
     code: str
     name: str
@@ -420,6 +444,34 @@ class ConnectionProfile(BaseModel):
     name: str
     url: str
     is_active: bool = False
+    # Pool overrides; unset values fall back to the DB_POOL_* environment
+    pool_size: Optional[int] = None
+    max_overflow: Optional[int] = None
+    pool_timeout: Optional[float] = None
+    pgbouncer: Optional[bool] = None
+    replica_url: Optional[str] = None
+
+    def pool_overrides(self) -> dict:
+        return self.model_dump(include={"pool_size", "max_overflow", "pool_timeout", "pgbouncer"}, exclude_none=True)
+
+class ImportJobResponse(BaseModel):
+    id: UUID
+    kind: str
+    filename: str
+    status: str
+    total_rows: int | None = None
+    rows_processed: int
+    success_count: int
+    error_count: int
+    errors: list[str] = []
+    last_error: str | None = None
+    rows_per_second: float = 0.0
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
 
 class AuditLogResponse(BaseModel):
     id: UUID
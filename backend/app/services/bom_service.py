@@ -0,0 +1,117 @@
+import uuid
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.bom import BOM, BOMLine, BOMOperation
+from app.models.item import Item
+from app.core.reference_cache import reference_cache
+from app.models.attribute import AttributeValue
+from app.schemas import BOMCreate
+
+class BOMLookups:
+    """Everything a set of BOM payloads refers to, fetched up front."""
+
+    def __init__(self, items: dict[str, Item], locations: dict[str, uuid.UUID], attribute_values: dict[uuid.UUID, AttributeValue], existing_codes: set[str]):
+        self.items = items
+        self.locations = locations
+        self.attribute_values = attribute_values
+        self.existing_codes = existing_codes
+
+async def resolve_lookups(db: AsyncSession, payloads: list[BOMCreate]) -> BOMLookups:
+    """
+    Resolves everything any number of BOMs refer to: items with one IN-query,
+    locations and attribute values from the reference cache, plus one query
+    for BOM codes that are taken.
+    """
+    item_codes, location_codes, value_ids = set(), set(), set()
+    for payload in payloads:
+        item_codes.add(payload.item_code)
+        value_ids.update(payload.attribute_value_ids)
+        for line in payload.lines:
+            item_codes.add(line.item_code)
+            value_ids.update(line.attribute_value_ids)
+            if line.source_location_code:
+                location_codes.add(line.source_location_code)
+
+    items = {}
+    if item_codes:
+        result = await db.execute(select(Item).filter(Item.code.in_(item_codes)))
+        items = {item.code: item for item in result.scalars().all()}
+    # Locations and attribute values come from the reference cache
+    location_table = await reference_cache.table(db, "locations", keys=location_codes)
+    locations = {code: location_table.id_for(code) for code in location_codes if location_table.id_for(code)}
+    # Unknown ids are left out here and reported per BOM by _values
+    value_table = await reference_cache.table(db, "attribute_values", ids=value_ids)
+    values = {v.id: v for v in await reference_cache.attribute_values(db, [i for i in value_ids if value_table.get(i)])}
+
+    result = await db.execute(select(BOM.code).filter(BOM.code.in_({p.code for p in payloads})))
+    return BOMLookups(items, locations, values, set(result.scalars().all()))
+
+def _values(ids: list[uuid.UUID], lookups: BOMLookups) -> list[AttributeValue]:
+    missing = [str(i) for i in ids if i not in lookups.attribute_values]
+    if missing:
+        raise LookupError(f"Attribute value(s) not found: {', '.join(missing)}")
+    return [lookups.attribute_values[i] for i in ids]
+
+def build_bom(payload: BOMCreate, lookups: BOMLookups) -> BOM:
+    """
+    Builds a BOM with its lines and operations from resolved lookups, without
+    touching the database. Raises ValueError for a taken code and LookupError
+    for anything that does not resolve.
+    """
+    if payload.code in lookups.existing_codes:
+        raise ValueError("BOM Code already exists")
+    item = lookups.items.get(payload.item_code)
+    if not item:
+        raise LookupError(f"Produced item '{payload.item_code}' not found")
+
+    lines = []
+    for line in payload.lines:
+        material = lookups.items.get(line.item_code)
+        if not material:
+            raise LookupError(f"Material item '{line.item_code}' not found")
+        source_location_id = None
+        if line.source_location_code:
+            source_location_id = lookups.locations.get(line.source_location_code)
+            if not source_location_id:
+                raise LookupError(f"Source Location '{line.source_location_code}' not found")
+        lines.append(BOMLine(
+            id=uuid.uuid4(),
+            item=material,
+            qty=line.qty,
+            is_percentage=line.is_percentage,
+            source_location_id=source_location_id,
+            attribute_values=_values(line.attribute_value_ids, lookups)
+        ))
+
+    return BOM(
+        id=uuid.uuid4(),
+        code=payload.code,
+        description=payload.description,
+        item=item,
+        qty=payload.qty,
+        tolerance_percentage=payload.tolerance_percentage,
+        active=True,
+        attribute_values=_values(payload.attribute_value_ids, lookups),
+        lines=lines,
+        operations=[
+            BOMOperation(
+                id=uuid.uuid4(),
+                operation_id=op.operation_id,
+                work_center_id=op.work_center_id,
+                sequence=op.sequence,
+                time_minutes=op.time_minutes
+            )
+            for op in payload.operations
+        ]
+    )
+
+async def create_bom(db: AsyncSession, payload: BOMCreate) -> BOM:
+    """
+    Creates a BOM in a single commit. Every relationship and the
+    attribute_value_ids columns on the returned object are already populated,
+    so it serializes without a re-fetch.
+    """
+    bom = build_bom(payload, await resolve_lookups(db, [payload]))
+    db.add(bom)
+    await db.commit()
+    return bom
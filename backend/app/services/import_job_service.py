@@ -0,0 +1,120 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import BinaryIO
+from sqlalchemy import select, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.import_job import ImportJob
+from app.services import outbox_service
+from app.services.import_service import ImportResults
+
+SPOOL_DIR = Path(os.getenv("IMPORT_SPOOL_DIR", "imports"))
+# A RUNNING job whose worker stopped sending heartbeats for this long is resumed elsewhere
+STALE_AFTER = timedelta(seconds=int(os.getenv("IMPORT_STALE_SECONDS", "300")))
+
+def _spool(source: BinaryIO, dest: Path) -> int:
+    """Copies the upload to disk in chunks and returns its line count (a row estimate)."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    lines = 0
+    with dest.open("wb") as out:
+        while chunk := source.read(1024 * 1024):
+            out.write(chunk)
+            lines += chunk.count(b"\n")
+    return lines
+
+async def create_job(db: AsyncSession, kind: str, filename: str, source: BinaryIO, user_id=None) -> ImportJob:
+    job_id = uuid.uuid4()
+    path = SPOOL_DIR / f"{job_id}{Path(filename).suffix.lower()}"
+    lines = await asyncio.to_thread(_spool, source, path)
+
+    job = ImportJob(
+        id=job_id,
+        kind=kind,
+        filename=filename,
+        spool_path=str(path),
+        status="QUEUED",
+        total_rows=max(lines - 1, 0), # minus the header
+        rows_processed=0,
+        success_count=0,
+        error_count=0,
+        errors=[],
+        created_by=user_id
+    )
+    db.add(job)
+    await db.commit()
+    return job
+
+async def get_job(db: AsyncSession, job_id) -> ImportJob | None:
+    result = await db.execute(select(ImportJob).filter(ImportJob.id == job_id))
+    return result.scalars().first()
+
+async def list_jobs(db: AsyncSession, limit: int = 50) -> list[ImportJob]:
+    result = await db.execute(select(ImportJob).order_by(ImportJob.created_at.desc()).limit(limit))
+    return result.scalars().all()
+
+async def claim_next(db: AsyncSession) -> ImportJob | None:
+    """
+    Takes the oldest queued job (or one abandoned by a dead worker) and marks it
+    RUNNING. SKIP LOCKED lets every worker poll without claiming the same job.
+    """
+    now = datetime.utcnow()
+    result = await db.execute(
+        select(ImportJob)
+        .filter(or_(
+            ImportJob.status == "QUEUED",
+            and_(ImportJob.status == "RUNNING", ImportJob.heartbeat_at < now - STALE_AFTER)
+        ))
+        .order_by(ImportJob.created_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job = result.scalars().first()
+    if job:
+        # A resumed job starts over; importers skip rows that are already in
+        job.status = "RUNNING"
+        job.started_at = now
+        job.heartbeat_at = now
+        job.rows_processed = 0
+        job.success_count = 0
+        job.error_count = 0
+        job.errors = []
+        _enqueue_progress(db, job)
+        await db.commit()
+    return job
+
+def _enqueue_progress(db: AsyncSession, job: ImportJob):
+    # Committed with the job row it reports; the topic lets the stream coalesce per job
+    outbox_service.enqueue(db, f"IMPORT_PROGRESS:{job.id}", {
+        "type": "IMPORT_PROGRESS",
+        "job_id": str(job.id),
+        "kind": job.kind,
+        "status": job.status,
+        "total_rows": job.total_rows,
+        "rows_processed": job.rows_processed,
+        "success_count": job.success_count,
+        "error_count": job.error_count,
+        "rows_per_second": job.rows_per_second,
+    })
+
+async def record_progress(db: AsyncSession, job: ImportJob, rows_processed: int, results: ImportResults, publish: bool = True):
+    job.rows_processed = rows_processed
+    job.success_count = results.success
+    job.error_count = results.error_count
+    job.errors = results.reported_errors
+    job.heartbeat_at = datetime.utcnow()
+    if publish:
+        _enqueue_progress(db, job)
+    await db.commit()
+
+async def finish(db: AsyncSession, job: ImportJob, error: str | None = None):
+    job.status = "FAILED" if error else "DONE"
+    job.last_error = error
+    job.finished_at = datetime.utcnow()
+    _enqueue_progress(db, job)
+    await db.commit()
+    Path(job.spool_path).unlink(missing_ok=True)
+
+def spool_file(job: ImportJob) -> BinaryIO:
+    return open(job.spool_path, "rb")
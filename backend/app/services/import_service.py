@@ -1,79 +1,542 @@
 import csv
 import io
-from sqlalchemy.orm import Session
+import os
+import uuid
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Awaitable, BinaryIO, Callable, Iterator, Optional
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.item import Item
 from app.models.uom import UOM
 from app.models.category import Category
+from app.models.partner import Partner, PartnerType
+from app.models.stock_ledger import StockLedger, stock_ledger_values
+from app.models.stock_balance import StockBalance, stock_balance_values
+from app.models.variant_values import canonical_value_ids, variant_cache
+from app.schemas import BOMCreate
+from app.services import bom_service
+from app.core.reference_cache import reference_cache
 
-def import_items_csv(db: Session, file_content: bytes):
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+# Row errors returned to the client; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+def iter_csv_batches(file: BinaryIO, batch_size: int = IMPORT_BATCH_SIZE) -> Iterator[list[tuple[int, dict]]]:
+    """
+    Reads an uploaded CSV lazily and yields lists of (row_num, row) so the whole
+    file is never decoded or held in memory at once. A UTF-8 BOM is tolerated.
+    """
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+    batch = []
+    for row_num, row in enumerate(reader, start=1):
+        batch.append((row_num, row))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class ImportResults:
+    def __init__(self):
+        self.success = 0
+        self.error_count = 0
+        self.errors: list[str] = []
+
+    def error(self, row_num: int, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"Row {row_num}: {message}")
+
+    @property
+    def reported_errors(self) -> list[str]:
+        errors = list(self.errors)
+        if self.error_count > len(errors):
+            errors.append(f"... and {self.error_count - len(errors)} more errors")
+        return errors
+
+    def as_dict(self) -> dict:
+        return {"success": self.success, "errors": self.reported_errors}
+
+# Called after every committed batch with the number of rows read so far
+ProgressCallback = Callable[[int, ImportResults], Awaitable[None]]
+# (db, file, on_batch, reference) -> results; `reference` identifies the import (job id)
+Importer = Callable[[AsyncSession, BinaryIO, Optional[ProgressCallback], str], Awaitable[ImportResults]]
+
+_importers: dict[str, tuple[Importer, list[str], list[str]]] = {}
+
+def register_importer(kind: str, importer: Importer, columns: list[str], example: list[str]):
+    """Registers a CSV importer for the import job subsystem."""
+    _importers[kind] = (importer, columns, example)
+
+def get_importer(kind: str) -> Importer | None:
+    entry = _importers.get(kind)
+    return entry[0] if entry else None
+
+def importer_kinds() -> list[str]:
+    return sorted(_importers)
+
+def generate_template(kind: str) -> str:
+    _, columns, example = _importers[kind]
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(columns)
+    writer.writerow(example)
+    return output.getvalue()
+
+async def _insert_names(db: AsyncSession, model, names: set[str]):
+    if names:
+        await db.execute(
+            pg_insert(model)
+            .values([{"id": uuid.uuid4(), "name": name} for name in sorted(names)])
+            .on_conflict_do_nothing(index_elements=["name"])
+        )
+
+async def import_items_csv(
+    db: AsyncSession,
+    file: BinaryIO,
+    on_batch: ProgressCallback | None = None,
+    reference: str = "",
+    batch_size: int = IMPORT_BATCH_SIZE
+) -> ImportResults:
     """
     Parses a CSV file and bulk creates items.
     Expected Header: Code, Name, UOM, Category
+
+    Existing codes, UOMs and categories are loaded once; each batch then inserts
+    its missing UOMs and categories and its items with multi-row
+    INSERT ... ON CONFLICT DO NOTHING, and commits.
     """
-    stream = io.StringIO(file_content.decode("utf-8"))
-    reader = csv.DictReader(stream)
-    
-    results = {"success": 0, "errors": []}
-    
-    for row_num, row in enumerate(reader, start=1):
-        try:
-            code = row.get("Code", "").strip()
-            name = row.get("Name", "").strip()
-            uom_name = row.get("UOM", "").strip()
-            cat_name = row.get("Category", "").strip()
-            
-            if not code or not name or not uom_name:
-                results["errors"].append(f"Row {row_num}: Missing required fields (Code, Name, UOM)")
+    results = ImportResults()
+
+    existing_codes = set((await db.execute(select(Item.code))).scalars().all())
+    uoms = set((await reference_cache.table(db, "uoms")).by_key)
+    categories = set((await reference_cache.table(db, "categories")).by_key)
+
+    last_row = 0
+    try:
+        for batch in iter_csv_batches(file, batch_size):
+            rows = {}
+            new_uoms, new_categories = set(), set()
+
+            last_row = batch[-1][0]
+            for row_num, row in batch:
+                code = (row.get("Code") or "").strip()
+                name = (row.get("Name") or "").strip()
+                uom_name = (row.get("UOM") or "").strip()
+                cat_name = (row.get("Category") or "").strip()
+
+                if not code or not name or not uom_name:
+                    results.error(row_num, "Missing required fields (Code, Name, UOM)")
+                    continue
+                if len(code) > 255 or len(name) > 255 or len(uom_name) > 32 or len(cat_name) > 64:
+                    results.error(row_num, "Value too long (Code/Name max 255, UOM max 32, Category max 64)")
+                    continue
+                if code in existing_codes or code in rows:
+                    results.error(row_num, f"Item code '{code}' already exists")
+                    continue
+
+                # UOMs and categories are auto-created for UX convenience
+                if uom_name not in uoms:
+                    new_uoms.add(uom_name)
+                if cat_name and cat_name not in categories:
+                    new_categories.add(cat_name)
+
+                rows[code] = (row_num, {
+                    "id": uuid.uuid4(),
+                    "code": code,
+                    "name": name,
+                    "uom": uom_name,
+                    "category": cat_name,
+                    "active": True,
+                })
+
+            try:
+                await _insert_names(db, UOM, new_uoms)
+                await _insert_names(db, Category, new_categories)
+
+                inserted = set()
+                if rows:
+                    result = await db.execute(
+                        pg_insert(Item)
+                        .values([values for _, values in rows.values()])
+                        .on_conflict_do_nothing(index_elements=["code"])
+                        .returning(Item.code)
+                    )
+                    inserted = set(result.scalars().all())
+                if new_uoms:
+                    reference_cache.bump(db, "uoms")
+                if new_categories:
+                    reference_cache.bump(db, "categories")
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                for row_num, _ in rows.values():
+                    results.error(row_num, str(e))
+                if on_batch:
+                    await on_batch(last_row, results)
                 continue
-                
-            # Check duplicate Code
-            if db.query(Item).filter(Item.code == code).first():
-                results["errors"].append(f"Row {row_num}: Item code '{code}' already exists")
+
+            uoms |= new_uoms
+            categories |= new_categories
+            existing_codes |= rows.keys()
+            results.success += len(inserted)
+            for code in sorted(rows.keys() - inserted, key=lambda c: rows[c][0]):
+                # Created by someone else since the codes were loaded
+                results.error(rows[code][0], f"Item code '{code}' already exists")
+            if on_batch:
+                await on_batch(last_row, results)
+
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Rows before the unreadable one are already imported
+        results.error(last_row + 1, f"Could not parse file: {e}")
+
+    return results
+
+async def import_partners_csv(
+    db: AsyncSession,
+    file: BinaryIO,
+    on_batch: ProgressCallback | None = None,
+    reference: str = "",
+    batch_size: int = IMPORT_BATCH_SIZE
+) -> ImportResults:
+    """
+    Bulk creates partners.
+    Expected Header: Name, Type, Address (Type is CUSTOMER or SUPPLIER)
+    A partner with the same name and type as an existing one is reported, not duplicated.
+    """
+    results = ImportResults()
+    existing = set((await db.execute(select(Partner.name, Partner.type))).tuples().all())
+    types = {t.value for t in PartnerType}
+
+    last_row = 0
+    try:
+        for batch in iter_csv_batches(file, batch_size):
+            last_row = batch[-1][0]
+            rows = {}
+            for row_num, row in batch:
+                name = (row.get("Name") or "").strip()
+                partner_type = (row.get("Type") or "").strip().upper()
+                address = (row.get("Address") or "").strip() or None
+
+                if not name or not partner_type:
+                    results.error(row_num, "Missing required fields (Name, Type)")
+                    continue
+                if partner_type not in types:
+                    results.error(row_num, f"Type must be one of {', '.join(sorted(types))}")
+                    continue
+                if len(name) > 255:
+                    results.error(row_num, "Name too long (max 255)")
+                    continue
+                if (name, partner_type) in existing or (name, partner_type) in rows:
+                    results.error(row_num, f"{partner_type.title()} '{name}' already exists")
+                    continue
+                rows[(name, partner_type)] = (row_num, {
+                    "id": uuid.uuid4(), "name": name, "type": partner_type, "address": address, "active": True
+                })
+
+            try:
+                if rows:
+                    await db.execute(pg_insert(Partner).values([values for _, values in rows.values()]))
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                for row_num, _ in rows.values():
+                    results.error(row_num, str(e))
+            else:
+                existing |= rows.keys()
+                results.success += len(rows)
+            if on_batch:
+                await on_batch(last_row, results)
+    except (UnicodeDecodeError, csv.Error) as e:
+        results.error(last_row + 1, f"Could not parse file: {e}")
+
+    return results
+
+async def _load_attribute_values(db: AsyncSession) -> dict[tuple[str, str], uuid.UUID]:
+    """(attribute name, value) -> attribute value id, both lowercased."""
+    values = await reference_cache.table(db, "attribute_values")
+    return {key: row.id for key, row in values.by_key.items()}
+
+def _parse_attributes(spec: str, attribute_values: dict[tuple[str, str], uuid.UUID]) -> list[uuid.UUID]:
+    """Resolves "Color=Red; Size=L" to attribute value ids. Raises ValueError on unknown pairs."""
+    ids = []
+    for part in filter(None, (p.strip() for p in spec.split(";"))):
+        attr, _, value = part.partition("=")
+        key = (attr.strip().lower(), value.strip().lower())
+        if key not in attribute_values:
+            raise ValueError(f"Unknown attribute value '{part}'")
+        ids.append(attribute_values[key])
+    return ids
+
+async def import_stock_csv(
+    db: AsyncSession,
+    file: BinaryIO,
+    on_batch: ProgressCallback | None = None,
+    reference: str = "",
+    batch_size: int = IMPORT_BATCH_SIZE
+) -> ImportResults:
+    """
+    Loads opening stock balances.
+    Expected Header: Item Code, Location Code, Qty, Attributes
+    Qty is the absolute on-hand quantity: the difference to the current balance
+    is posted to the ledger as an OPENING_BALANCE entry, so re-running an import
+    is harmless. Attributes is optional, e.g. "Color=Red; Size=L".
+    """
+    results = ImportResults()
+    items = dict((await db.execute(select(Item.code, Item.id))).tuples().all())
+    locations = {code: row.id for code, row in (await reference_cache.table(db, "locations")).by_key.items()}
+    attribute_values = await _load_attribute_values(db)
+
+    last_row = 0
+    try:
+        for batch in iter_csv_batches(file, batch_size):
+            last_row = batch[-1][0]
+            rows = {}
+            for row_num, row in batch:
+                item_code = (row.get("Item Code") or "").strip()
+                location_code = (row.get("Location Code") or "").strip()
+                try:
+                    qty = Decimal((row.get("Qty") or "").strip())
+                    value_ids = _parse_attributes(row.get("Attributes") or "", attribute_values)
+                except InvalidOperation:
+                    results.error(row_num, "Qty must be a number")
+                    continue
+                except ValueError as e:
+                    results.error(row_num, str(e))
+                    continue
+
+                if item_code not in items:
+                    results.error(row_num, f"Item '{item_code}' not found")
+                    continue
+                if location_code not in locations:
+                    results.error(row_num, f"Location '{location_code}' not found")
+                    continue
+                if qty < 0:
+                    results.error(row_num, "Qty cannot be negative")
+                    continue
+
+                key = (items[item_code], locations[location_code], tuple(canonical_value_ids(value_ids)))
+                if key in rows:
+                    results.error(row_num, f"Duplicate of row {rows[key][0]}")
+                    continue
+                rows[key] = (row_num, qty, value_ids)
+
+            try:
+                posted = await _post_opening_balances(db, rows, reference)
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                for row_num, _, _ in rows.values():
+                    results.error(row_num, str(e))
+            else:
+                results.success += posted
+            if on_batch:
+                await on_batch(last_row, results)
+    except (UnicodeDecodeError, csv.Error) as e:
+        results.error(last_row + 1, f"Could not parse file: {e}")
+
+    return results
+
+async def _post_opening_balances(db: AsyncSession, rows: dict, reference: str) -> int:
+    if not rows:
+        return 0
+    # Re-key on interned variant ids: one round trip for all combinations the cache lacks
+    value_sets = list({key[2] for key in rows})
+    variant_ids = dict(zip(value_sets, await db.run_sync(lambda session: variant_cache.intern_many(session, value_sets))))
+    rows = {(i, l, variant_ids[values]): (row_num, qty, list(values)) for (i, l, values), (row_num, qty, _) in rows.items()}
+
+    # Lock the affected balances so concurrent movements cannot interleave
+    result = await db.execute(
+        select(StockBalance.item_id, StockBalance.location_id, StockBalance.variant_id, StockBalance.qty)
+        .filter(tuple_(StockBalance.item_id, StockBalance.location_id, StockBalance.variant_id).in_(list(rows)))
+        .with_for_update()
+    )
+    current = {(i, l, v): q for i, l, v, q in result.tuples().all()}
+
+    ledger, ledger_values, balances = [], [], []
+    now = datetime.utcnow()
+    for key, (row_num, qty, value_ids) in rows.items():
+        delta = qty - Decimal(current.get(key, 0))
+        if delta == 0:
+            continue
+        entry_id = uuid.uuid4()
+        ledger.append({
+            "id": entry_id, "item_id": key[0], "location_id": key[1], "qty_change": delta,
+            "reference_type": "OPENING_BALANCE", "reference_id": reference, "created_at": now,
+            "attribute_value_ids": value_ids, "variant_id": key[2]
+        })
+        ledger_values += [{"stock_ledger_id": entry_id, "attribute_value_id": v} for v in value_ids]
+        balances.append({
+            "id": uuid.uuid4(), "item_id": key[0], "location_id": key[1], "variant_id": key[2],
+            "attribute_value_ids": value_ids, "qty": qty
+        })
+
+    if ledger:
+        await db.execute(pg_insert(StockLedger).values(ledger))
+        if ledger_values:
+            await db.execute(pg_insert(stock_ledger_values).values(ledger_values))
+        upsert = pg_insert(StockBalance).values(balances)
+        result = await db.execute(
+            upsert.on_conflict_do_update(
+                index_elements=["item_id", "location_id", "variant_id"],
+                set_={"qty": upsert.excluded.qty}
+            ).returning(StockBalance.id, StockBalance.item_id, StockBalance.location_id, StockBalance.variant_id)
+        )
+        balance_values = [
+            {"balance_id": balance_id, "attribute_value_id": v}
+            for balance_id, i, l, v_id in result.tuples().all()
+            for v in rows[(i, l, v_id)][2]
+        ]
+        if balance_values:
+            await db.execute(pg_insert(stock_balance_values).values(balance_values).on_conflict_do_nothing())
+    return len(rows)
+
+# (first row, last row, payload, error) for one BOM of an import file
+BOMEntry = tuple[int, int, Optional[BOMCreate], Optional[str]]
+
+def _csv_bom(rows: list[tuple[int, dict]], attribute_values: dict) -> BOMEntry:
+    first_row, header = rows[0]
+    last_row = rows[-1][0]
+    try:
+        payload = BOMCreate(
+            code=(header.get("BOM Code") or "").strip(),
+            description=(header.get("Description") or "").strip() or None,
+            item_code=(header.get("Item Code") or "").strip(),
+            qty=(header.get("Qty") or "").strip() or 1,
+            tolerance_percentage=(header.get("Tolerance %") or "").strip() or 0,
+            attribute_value_ids=_parse_attributes(header.get("Attributes") or "", attribute_values),
+            lines=[
+                {
+                    "item_code": (row.get("Line Item Code") or "").strip(),
+                    "qty": (row.get("Line Qty") or "").strip(),
+                    "is_percentage": (row.get("Is Percentage") or "").strip().lower() in ("1", "true", "yes", "y"),
+                    "source_location_code": (row.get("Source Location Code") or "").strip() or None,
+                    "attribute_value_ids": _parse_attributes(row.get("Line Attributes") or "", attribute_values),
+                }
+                for _, row in rows
+            ]
+        )
+    except ValidationError as e:
+        error = e.errors()[0]
+        return first_row, last_row, None, f"Invalid {'.'.join(str(p) for p in error['loc'])}: {error['msg']}"
+    except ValueError as e:
+        return first_row, last_row, None, str(e)
+    if not payload.code or not payload.item_code:
+        return first_row, last_row, None, "Missing required fields (BOM Code, Item Code)"
+    return first_row, last_row, payload, None
+
+def _iter_csv_boms(file: BinaryIO, attribute_values: dict) -> Iterator[BOMEntry]:
+    """One BOM per run of consecutive rows sharing a BOM Code (one row per line)."""
+    group: list[tuple[int, dict]] = []
+    for batch in iter_csv_batches(file):
+        for row_num, row in batch:
+            if group and (row.get("BOM Code") or "").strip() != (group[0][1].get("BOM Code") or "").strip():
+                yield _csv_bom(group, attribute_values)
+                group = []
+            group.append((row_num, row))
+    if group:
+        yield _csv_bom(group, attribute_values)
+
+def _iter_json_boms(file: BinaryIO) -> Iterator[BOMEntry]:
+    """A JSON array of BOMCreate objects; their position stands in for the row number."""
+    data = orjson.loads(file.read())
+    if not isinstance(data, list):
+        raise ValueError("Expected a JSON array of BOMs")
+    for index, obj in enumerate(data, start=1):
+        try:
+            yield index, index, BOMCreate.model_validate(obj), None
+        except ValidationError as e:
+            error = e.errors()[0]
+            yield index, index, None, f"Invalid {'.'.join(str(p) for p in error['loc'])}: {error['msg']}"
+
+def _is_json(file: BinaryIO) -> bool:
+    head = file.read(64).lstrip(b"\xef\xbb\xbf \t\r\n")
+    file.seek(0)
+    return head[:1] in (b"[", b"{")
+
+async def _insert_boms(db: AsyncSession, chunk: list[tuple[int, BOMCreate]], results: ImportResults):
+    lookups = await bom_service.resolve_lookups(db, [payload for _, payload in chunk])
+    boms = {}
+    for row_num, payload in chunk:
+        if payload.code in boms:
+            results.error(row_num, f"Duplicate of BOM '{payload.code}' at row {boms[payload.code][0]}")
+            continue
+        try:
+            boms[payload.code] = (row_num, bom_service.build_bom(payload, lookups))
+        except (LookupError, ValueError) as e:
+            results.error(row_num, str(e))
+
+    try:
+        db.add_all([bom for _, bom in boms.values()])
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        for row_num, _ in boms.values():
+            results.error(row_num, str(e))
+    else:
+        results.success += len(boms)
+    # Nothing is reused across chunks; keep the identity map from growing
+    db.expunge_all()
+
+async def import_boms(
+    db: AsyncSession,
+    file: BinaryIO,
+    on_batch: ProgressCallback | None = None,
+    reference: str = "",
+    batch_size: int = IMPORT_BATCH_SIZE
+) -> ImportResults:
+    """
+    Bulk creates BOMs from CSV or from a JSON array of BOM payloads.
+    CSV Header: BOM Code, Description, Item Code, Qty, Tolerance %, Attributes,
+    Line Item Code, Line Qty, Is Percentage, Source Location Code, Line Attributes
+    Each row is one line; consecutive rows with the same BOM Code form one BOM
+    and the header columns are read from its first row. BOMs are created about
+    `batch_size` rows at a time, with all references in a chunk resolved at once.
+    """
+    results = ImportResults()
+    last_row = 0
+    try:
+        if _is_json(file):
+            entries = _iter_json_boms(file)
+        else:
+            entries = _iter_csv_boms(file, await _load_attribute_values(db))
+
+        chunk, chunk_rows = [], 0
+        for first_row, last_row, payload, error in entries:
+            if error:
+                results.error(first_row, error)
                 continue
-                
-            # Check/Create UOM (Auto-create or Validate?)
-            # Strict mode: UOM must exist. Loose mode: Create it. We'll go with strict for now to avoid mess.
-            # Actually, standard practice is strict for attributes, but maybe loose for simple UOMs?
-            # Let's verify UOM exists
-            uom = db.query(UOM).filter(UOM.name == uom_name).first()
-            if not uom:
-                # results["errors"].append(f"Row {row_num}: UOM '{uom_name}' not found")
-                # continue
-                # Auto-create for UX convenience
-                uom = UOM(name=uom_name)
-                db.add(uom)
-                db.commit()
-                db.refresh(uom)
-
-            # Check/Create Category
-            if cat_name:
-                category = db.query(Category).filter(Category.name == cat_name).first()
-                if not category:
-                    category = Category(name=cat_name)
-                    db.add(category)
-                    db.commit()
-            
-            # Create Item
-            item = Item(
-                code=code,
-                name=name,
-                uom=uom_name,
-                category=cat_name
-            )
-            db.add(item)
-            db.commit()
-            results["success"] += 1
-            
-        except Exception as e:
-            db.rollback()
-            results["errors"].append(f"Row {row_num}: {str(e)}")
-            
+            chunk.append((first_row, payload))
+            chunk_rows += last_row - first_row + 1
+            if chunk_rows >= batch_size:
+                await _insert_boms(db, chunk, results)
+                chunk, chunk_rows = [], 0
+                if on_batch:
+                    await on_batch(last_row, results)
+        if chunk:
+            await _insert_boms(db, chunk, results)
+        if on_batch:
+            await on_batch(last_row, results)
+    except (UnicodeDecodeError, csv.Error, orjson.JSONDecodeError) as e:
+        results.error(last_row + 1, f"Could not parse file: {e}")
+    except ValueError as e:
+        results.error(last_row + 1, str(e))
+
     return results
 
 def generate_items_template():
     """Generates a CSV template for items."""
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["Code", "Name", "UOM", "Category"])
-    writer.writerow(["ITM-001", "Example Item", "pcs", "Raw Material"])
-    return output.getvalue()
+    return generate_template("items")
+
+register_importer("items", import_items_csv, ["Code", "Name", "UOM", "Category"], ["ITM-001", "Example Item", "pcs", "Raw Material"])
+register_importer("partners", import_partners_csv, ["Name", "Type", "Address"], ["Acme Textiles", "SUPPLIER", "12 Mill Road"])
+register_importer("stock", import_stock_csv, ["Item Code", "Location Code", "Qty", "Attributes"], ["ITM-001", "WH-MAIN", "100", "Color=Red; Size=L"])
+register_importer(
+    "boms", import_boms,
+    ["BOM Code", "Description", "Item Code", "Qty", "Tolerance %", "Attributes", "Line Item Code", "Line Qty", "Is Percentage", "Source Location Code", "Line Attributes"],
+    ["BOM-001", "Example BOM", "ITM-001", "1", "0", "Color=Red", "MAT-001", "2.5", "false", "WH-MAIN", ""]
+)
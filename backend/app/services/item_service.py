@@ -1,11 +1,18 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_
+import os
+from datetime import datetime
+from sqlalchemy import select, func, or_, case
 from sqlalchemy.orm import joinedload, selectinload
 from app.models.item import Item
 from app.models.variant import Variant
 from app.schemas import VariantCreate
 from app.models.attribute import Attribute
 
+# Search totals are counted up to this many matches and reported as capped beyond it
+SEARCH_COUNT_CAP = int(os.getenv("ITEM_SEARCH_COUNT_CAP", "1000"))
+# Shorter terms have no trigram to look up, so they only match code prefixes
+MIN_FUZZY_LENGTH = 3
+
 async def create_item(
     db: AsyncSession,
     code: str,
@@ -68,6 +75,8 @@ async def update_item(
         result = await db.execute(select(Attribute).filter(Attribute.id.in_(attribute_ids)))
         attrs = result.scalars().all()
         item.attributes = attrs
+        # Association changes alone do not fire onupdate, and the list ETag depends on it
+        item.updated_at = datetime.utcnow()
             
     await db.commit()
     
@@ -91,33 +100,84 @@ async def get_item_by_code(db: AsyncSession, code: str) -> Item | None:
     return result.scalars().first()
 
 
-async def get_items(db: AsyncSession, skip: int = 0, limit: int = 100, user=None, search: str = None, category: str = None) -> tuple[list[Item], int]:
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _code_prefix(term: str):
+    # Served by idx_items_code_lower_prefix
+    return func.lower(Item.code).like(f"{_escape_like(term.lower())}%", escape="\\")
+
+def _search(query, term: str, postgres: bool):
+    """
+    Filters and ranks items for a search term. On PostgreSQL, terms shorter
+    than a trigram only match code prefixes; longer ones use the trigram
+    indexes and rank exact code, then code prefix, then similarity.
+    """
+    if postgres and len(term) < MIN_FUZZY_LENGTH:
+        return query.filter(_code_prefix(term)).order_by(Item.code)
+
+    pattern = f"%{_escape_like(term)}%"
+    query = query.filter(or_(Item.code.ilike(pattern, escape="\\"), Item.name.ilike(pattern, escape="\\")))
+    if not postgres:
+        return query.order_by(Item.code)
+    return query.order_by(
+        case((func.lower(Item.code) == term.lower(), 0), (_code_prefix(term), 1), else_=2),
+        func.greatest(func.similarity(Item.code, term), func.similarity(Item.name, term)).desc(),
+        Item.code
+    )
+
+def _is_postgres(db: AsyncSession) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+async def get_items(db: AsyncSession, skip: int = 0, limit: int = 100, user=None, search: str = None, category: str = None) -> tuple[list[Item], int, bool]:
+    """Returns (items, total, total_capped); search totals stop counting at SEARCH_COUNT_CAP."""
     query = select(Item)
-    
-    if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            or_(
-                Item.code.ilike(search_filter),
-                Item.name.ilike(search_filter)
-            )
-        )
 
     if category:
         query = query.filter(Item.category == category)
 
     if user and user.allowed_categories:
         query = query.filter(Item.category.in_(user.allowed_categories))
-    
-    # Get total count
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-    
+
+    search = (search or "").strip()
+    if search:
+        query = _search(query, search, _is_postgres(db))
+        count_query = select(func.count()).select_from(
+            query.with_only_columns(Item.id).order_by(None).limit(SEARCH_COUNT_CAP + 1).subquery()
+        )
+    else:
+        count_query = select(func.count()).select_from(query.subquery())
+
+    total = (await db.execute(count_query)).scalar()
+    capped = total > SEARCH_COUNT_CAP if search else False
+
     # Get paginated results
     # Use selectinload for async compatibility with collections
     query = query.options(selectinload(Item.attributes)).offset(skip).limit(limit)
     result = await db.execute(query)
     items = result.unique().scalars().all()
-    
-    return items, total
+
+    return items, min(total, SEARCH_COUNT_CAP) if capped else total, capped
+
+async def suggest_items(db: AsyncSession, q: str, limit: int = 10, user=None) -> list:
+    """
+    Type-ahead: (id, code, name) rows only. Code prefix matches come first from
+    the prefix index; fuzzy matches only top up the list when there are too few.
+    """
+    q = q.strip()
+    if not q:
+        return []
+
+    base = select(Item.id, Item.code, Item.name)
+    if user and user.allowed_categories:
+        base = base.filter(Item.category.in_(user.allowed_categories))
+
+    postgres = _is_postgres(db)
+    rows = list((await db.execute(base.filter(_code_prefix(q)).order_by(Item.code).limit(limit))).all())
+    if len(rows) < limit and (len(q) >= MIN_FUZZY_LENGTH or not postgres):
+        seen = [row.id for row in rows]
+        query = _search(base, q, postgres)
+        if seen:
+            query = query.filter(Item.id.notin_(seen))
+        rows += (await db.execute(query.limit(limit - len(rows)))).all()
+    return rows
@@ -1,5 +1,5 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, update
 from app.models.kpi import KPICache
 from app.models.item import Item
 from app.models.manufacturing import WorkOrder
@@ -8,55 +8,63 @@ from app.models.sales import SalesOrder
 from app.models.sample import SampleRequest
 from datetime import datetime, timedelta
 
-def get_kpi(db: Session, key: str, ttl_minutes: int = 10):
+async def _count(db: AsyncSession, query) -> int:
+    result = await db.execute(select(func.count()).select_from(query.subquery()))
+    return result.scalar()
+
+async def get_kpi(db: AsyncSession, key: str, ttl_minutes: int = 10):
     """Retrieves a KPI from cache or returns None if expired."""
-    cached = db.query(KPICache).filter(KPICache.key == key).first()
+    result = await db.execute(select(KPICache).filter(KPICache.key == key))
+    cached = result.scalars().first()
     if cached and (datetime.utcnow() - cached.updated_at) < timedelta(minutes=ttl_minutes):
         return cached.value
     return None
 
-def update_kpi(db: Session, key: str, value: float):
-    cached = db.query(KPICache).filter(KPICache.key == key).first()
+async def update_kpi(db: AsyncSession, key: str, value: float):
+    result = await db.execute(select(KPICache).filter(KPICache.key == key))
+    cached = result.scalars().first()
     if cached:
         cached.value = value
         cached.updated_at = datetime.utcnow()
     else:
         db.add(KPICache(key=key, value=value))
-    db.commit()
+    await db.commit()
 
-def refresh_all_kpis(db: Session):
-    """Calculates all KPIs and updates the cache."""
+async def refresh_all_kpis(db: AsyncSession, read_db: AsyncSession | None = None):
+    """Calculates all KPIs (on `read_db` when given, e.g. a replica) and updates the cache."""
+    counts_db = read_db or db
     # 1. Total Items (Global)
-    total_items = db.query(Item).count()
-    update_kpi(db, "total_items", float(total_items))
+    total_items = await _count(counts_db, select(Item.id))
+    await update_kpi(db, "total_items", float(total_items))
 
     # 2. Active Work Orders
-    active_wo = db.query(WorkOrder).filter(WorkOrder.status == "IN_PROGRESS").count()
-    update_kpi(db, "active_wo", float(active_wo))
+    active_wo = await _count(counts_db, select(WorkOrder.id).filter(WorkOrder.status == "IN_PROGRESS"))
+    await update_kpi(db, "active_wo", float(active_wo))
 
     # 3. Pending Work Orders
-    pending_wo = db.query(WorkOrder).filter(WorkOrder.status == "PENDING").count()
-    update_kpi(db, "pending_wo", float(pending_wo))
+    pending_wo = await _count(counts_db, select(WorkOrder.id).filter(WorkOrder.status == "PENDING"))
+    await update_kpi(db, "pending_wo", float(pending_wo))
 
     # 4. Low Stock Items (Items where total qty across all locs < 10)
     # Optimized: Group by item_id in stock_balances and sum
-    low_stock_query = db.query(StockBalance.item_id).group_by(StockBalance.item_id).having(func.sum(StockBalance.qty) < 10)
-    low_stock_count = low_stock_query.count()
-    update_kpi(db, "low_stock", float(low_stock_count))
+    low_stock_query = select(StockBalance.item_id).group_by(StockBalance.item_id).having(func.sum(StockBalance.qty) < 10)
+    low_stock_count = await _count(counts_db, low_stock_query)
+    await update_kpi(db, "low_stock", float(low_stock_count))
 
     # 5. Active Samples
-    active_samples = db.query(SampleRequest).filter(SampleRequest.status.in_(['DRAFT', 'IN_PRODUCTION', 'SENT'])).count()
-    update_kpi(db, "active_samples", float(active_samples))
+    active_samples = await _count(counts_db, select(SampleRequest.id).filter(SampleRequest.status.in_(['DRAFT', 'IN_PRODUCTION', 'SENT'])))
+    await update_kpi(db, "active_samples", float(active_samples))
 
     # 6. Open Sales Orders (Incoming)
-    open_sos = db.query(SalesOrder).filter(SalesOrder.status == "PENDING").count()
-    update_kpi(db, "open_sos", float(open_sos))
+    open_sos = await _count(counts_db, select(SalesOrder.id).filter(SalesOrder.status == "PENDING"))
+    await update_kpi(db, "open_sos", float(open_sos))
 
     return True
 
-def get_all_cached_kpis(db: Session):
+async def get_all_cached_kpis(db: AsyncSession, read_db: AsyncSession | None = None):
     """Returns all cached KPIs, refreshing if cache is empty or older than 5 minutes."""
-    kpis = db.query(KPICache).all()
+    result = await (read_db or db).execute(select(KPICache))
+    kpis = result.scalars().all()
     
     # Check if we need to refresh (any record older than 5 mins)
     needs_refresh = not kpis
@@ -66,7 +74,22 @@ def get_all_cached_kpis(db: Session):
             needs_refresh = True
 
     if needs_refresh:
-        refresh_all_kpis(db)
-        kpis = db.query(KPICache).all()
+        await refresh_all_kpis(db, read_db=read_db)
+        # Re-read from the primary: the replica may not have the refresh yet
+        result = await db.execute(select(KPICache))
+        kpis = result.scalars().all()
     
     return {k.key: k.value for k in kpis}
+
+# Work Order statuses that have a dedicated counter
+WO_STATUS_KPIS = {"PENDING": "pending_wo", "IN_PROGRESS": "active_wo"}
+
+async def apply_work_order_transition(db: AsyncSession, previous_status: str | None, status: str):
+    """Adjusts cached WO counters in place so the dashboard does not wait for a full refresh."""
+    if previous_status == status:
+        return
+    for key, delta in ((WO_STATUS_KPIS.get(previous_status), -1), (WO_STATUS_KPIS.get(status), 1)):
+        if key:
+            await db.execute(
+                update(KPICache).where(KPICache.key == key).values(value=KPICache.value + delta)
+            )
@@ -0,0 +1,108 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy import select, delete, event as orm_event
+from app.core.invalidation import invalidation_bus
+from app.models.outbox import OutboxEvent
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Failed deliveries after which an event is parked: later drains skip it, so
+# one poison event cannot hold back everything queued behind it
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+
+# Topic of staged cache invalidations; relayed to the invalidation bus, not to clients
+INVALIDATE = "INVALIDATE"
+
+# Handlers run inside the relay's transaction: (db, topic, payload) -> None
+OutboxHandler = Callable[[AsyncSession, str, dict], Awaitable[None]]
+
+_handlers: list[tuple[str, OutboxHandler]] = []
+
+def register_handler(topic: str, handler: OutboxHandler):
+    """Registers a sink for a topic. Use "*" to receive every event."""
+    _handlers.append((topic, handler))
+
+def enqueue(db: AsyncSession, topic: str, payload: dict) -> OutboxEvent:
+    """
+    Stages a domain event in the caller's transaction.
+    It becomes visible to the relay only if the caller commits.
+    """
+    event = OutboxEvent(
+        topic=topic,
+        payload=json.loads(json.dumps({"type": topic, **payload}, default=str))
+    )
+    db.add(event)
+    return event
+
+def enqueue_invalidation(db: AsyncSession, kind: str, key: str | None = None) -> OutboxEvent:
+    """
+    Stages a cache invalidation in the caller's transaction. It is applied on
+    this worker as soon as the transaction commits, and the relay publishes it
+    to the other workers, so a committed change never loses its invalidation.
+    """
+    db.info.setdefault("invalidations", []).append((kind, key))
+    return enqueue(db, INVALIDATE, {"kind": kind, "key": key})
+
+@orm_event.listens_for(Session, "after_commit")
+def _apply_committed_invalidations(session):
+    for kind, key in session.info.pop("invalidations", None) or []:
+        invalidation_bus.apply_local(kind, key)
+
+@orm_event.listens_for(Session, "after_rollback")
+def _drop_rolled_back_invalidations(session):
+    session.info.pop("invalidations", None)
+
+async def drain_batch(db: AsyncSession, limit: int = 100) -> int:
+    """
+    Dispatches up to `limit` pending events in creation order and marks them processed.
+    Rows are locked with SKIP LOCKED so several workers can drain concurrently.
+    The caller commits, after flushing any external sinks, which makes delivery
+    at-least-once: a failing event stops the batch and is retried on the next drain,
+    until it has failed OUTBOX_MAX_ATTEMPTS times and is parked: it keeps its
+    last_error and is left for an operator (reset attempts to 0 to retry it).
+    """
+    result = await db.execute(
+        select(OutboxEvent)
+        .filter(OutboxEvent.processed_at == None, OutboxEvent.attempts < OUTBOX_MAX_ATTEMPTS)
+        .order_by(OutboxEvent.created_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    events = result.scalars().all()
+
+    processed = 0
+    for event in events:
+        try:
+            # Savepoint so a failing handler does not leave partial DB side effects
+            async with db.begin_nested():
+                for topic, handler in _handlers:
+                    if topic in ("*", event.topic):
+                        await handler(db, event.topic, event.payload)
+        except Exception as e:
+            logger.error(f"Outbox dispatch failed for {event.topic} {event.id}: {e}")
+            event.attempts = (event.attempts or 0) + 1
+            event.last_error = str(e)
+            if event.attempts >= OUTBOX_MAX_ATTEMPTS:
+                # Parked: skipped from now on, so the rest of the batch can go out
+                logger.error(f"Outbox event {event.topic} {event.id} parked after {event.attempts} attempts")
+                continue
+            break
+        event.processed_at = datetime.utcnow()
+        processed += 1
+
+    return processed
+
+async def purge_processed(db: AsyncSession, older_than: timedelta = timedelta(days=1)) -> None:
+    """Deletes delivered events past the retention window."""
+    await db.execute(
+        delete(OutboxEvent).filter(
+            OutboxEvent.processed_at != None,
+            OutboxEvent.processed_at < datetime.utcnow() - older_than
+        )
+    )
+    await db.commit()
@@ -0,0 +1,235 @@
+import csv
+import os
+from typing import BinaryIO
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.import_service import iter_csv_batches
+
+# Rows per COPY round trip while streaming the upload into the staging table
+COPY_BATCH_SIZE = int(os.getenv("STOCK_LOAD_COPY_BATCH", "10000"))
+# Errors and variances listed in the response; the rest are only counted
+MAX_REPORTED_ROWS = 1000
+
+REFERENCE_TYPES = {"opening": "OPENING_BALANCE", "count": "CYCLE_COUNT"}
+
+_STAGE = """
+CREATE TEMP TABLE stock_load (
+    row_num integer PRIMARY KEY,
+    item_code text,
+    location_code text,
+    qty_text text,
+    attributes text,
+    item_id uuid,
+    location_id uuid,
+    qty numeric(14, 4),
+    value_ids uuid[],
+    variant_id integer,
+    on_hand numeric(14, 4),
+    ledger_id uuid,
+    error text
+) ON COMMIT DROP
+"""
+
+# One row per "Attribute=Value" part, resolved case-insensitively
+_STAGE_VALUES = """
+CREATE TEMP TABLE stock_load_values ON COMMIT DROP AS
+SELECT s.row_num, trim(p.part) AS part, av.id AS attribute_value_id, av.attribute_id
+FROM stock_load s
+CROSS JOIN LATERAL regexp_split_to_table(coalesce(s.attributes, ''), ';') AS p(part)
+LEFT JOIN attributes a ON lower(a.name) = lower(trim(split_part(p.part, '=', 1)))
+LEFT JOIN attribute_values av ON av.attribute_id = a.id AND lower(av.value) = lower(trim(split_part(p.part, '=', 2)))
+WHERE trim(p.part) <> ''
+"""
+
+# Applied in order; a row keeps the first error it hits
+_VALIDATIONS = [
+    """UPDATE stock_load s SET item_id = i.id FROM items i WHERE i.code = s.item_code""",
+    """UPDATE stock_load s SET location_id = l.id FROM locations l WHERE l.code = s.location_code""",
+    """UPDATE stock_load SET error = 'Item ''' || coalesce(item_code, '') || ''' not found' WHERE item_id IS NULL""",
+    """UPDATE stock_load SET error = 'Location ''' || coalesce(location_code, '') || ''' not found' WHERE error IS NULL AND location_id IS NULL""",
+    """UPDATE stock_load SET error = 'Qty must be a number' WHERE error IS NULL AND coalesce(qty_text, '') !~ '^\\s*-?([0-9]+\\.?[0-9]*|\\.[0-9]+)\\s*$'""",
+    """UPDATE stock_load SET qty = trim(qty_text)::numeric WHERE error IS NULL""",
+    """UPDATE stock_load SET error = 'Qty cannot be negative' WHERE error IS NULL AND qty < 0""",
+    """
+    UPDATE stock_load s SET error = 'Unknown attribute value ''' || v.part || ''''
+    FROM (SELECT DISTINCT ON (row_num) row_num, part FROM stock_load_values WHERE attribute_value_id IS NULL ORDER BY row_num) v
+    WHERE s.row_num = v.row_num AND s.error IS NULL
+    """,
+    """
+    UPDATE stock_load s SET error = 'Attribute value ''' || v.part || ''' is not valid for this item'
+    FROM (
+        SELECT DISTINCT ON (v.row_num) v.row_num, v.part
+        FROM stock_load_values v JOIN stock_load s ON s.row_num = v.row_num
+        WHERE NOT EXISTS (SELECT 1 FROM item_attributes ia WHERE ia.item_id = s.item_id AND ia.attribute_id = v.attribute_id)
+        ORDER BY v.row_num
+    ) v
+    WHERE s.row_num = v.row_num AND s.error IS NULL
+    """,
+    # Same order as canonical_value_ids: distinct ids sorted as text
+    """
+    UPDATE stock_load s SET value_ids = (
+        SELECT coalesce(array_agg(d.id ORDER BY d.id::text COLLATE "C"), '{}')
+        FROM (SELECT DISTINCT attribute_value_id AS id FROM stock_load_values v WHERE v.row_num = s.row_num) d
+    )
+    WHERE s.error IS NULL
+    """,
+    # Interns new combinations, then resolves every row's variant_id (the empty set is id 0)
+    """
+    INSERT INTO variant_combinations (attribute_value_ids)
+    SELECT DISTINCT value_ids FROM stock_load WHERE error IS NULL AND value_ids <> '{}'
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    UPDATE stock_load s SET variant_id = v.id
+    FROM variant_combinations v
+    WHERE v.attribute_value_ids = s.value_ids AND s.error IS NULL
+    """,
+    """
+    UPDATE stock_load s SET error = 'Duplicate of row ' || d.first_row
+    FROM (
+        SELECT row_num, min(row_num) OVER (PARTITION BY item_id, location_id, variant_id) AS first_row
+        FROM stock_load WHERE error IS NULL
+    ) d
+    WHERE s.row_num = d.row_num AND d.row_num <> d.first_row
+    """,
+]
+
+# Balances are locked in a stable order so concurrent loads cannot deadlock
+_LOCK_BALANCES = """
+SELECT b.id FROM stock_balances b
+JOIN stock_load s ON s.item_id = b.item_id AND s.location_id = b.location_id AND s.variant_id = b.variant_id
+WHERE s.error IS NULL
+ORDER BY b.id
+FOR UPDATE OF b
+"""
+
+_VARIANCES = """
+UPDATE stock_load s SET on_hand = coalesce(b.qty, 0),
+    ledger_id = CASE WHEN s.qty <> coalesce(b.qty, 0) THEN gen_random_uuid() END
+FROM stock_load s2
+LEFT JOIN stock_balances b ON b.item_id = s2.item_id AND b.location_id = s2.location_id AND b.variant_id = s2.variant_id
+WHERE s.row_num = s2.row_num AND s.error IS NULL
+"""
+
+_POST = [
+    """
+    INSERT INTO stock_ledger (id, item_id, location_id, qty_change, reference_type, reference_id, created_at, attribute_value_ids, variant_id)
+    SELECT ledger_id, item_id, location_id, qty - on_hand, :reference_type, :reference_id, now() AT TIME ZONE 'utc', value_ids, variant_id
+    FROM stock_load WHERE ledger_id IS NOT NULL
+    """,
+    """
+    INSERT INTO stock_ledger_values (stock_ledger_id, attribute_value_id)
+    SELECT s.ledger_id, v.attribute_value_id
+    FROM stock_load s JOIN stock_load_values v ON v.row_num = s.row_num
+    WHERE s.ledger_id IS NOT NULL
+    """,
+    """
+    INSERT INTO stock_balances (id, item_id, location_id, variant_id, attribute_value_ids, qty)
+    SELECT gen_random_uuid(), item_id, location_id, variant_id, value_ids, qty
+    FROM stock_load WHERE ledger_id IS NOT NULL
+    ON CONFLICT (item_id, location_id, variant_id) DO UPDATE SET qty = EXCLUDED.qty
+    """,
+    """
+    INSERT INTO stock_balance_values (balance_id, attribute_value_id)
+    SELECT b.id, v.attribute_value_id
+    FROM stock_load s
+    JOIN stock_load_values v ON v.row_num = s.row_num
+    JOIN stock_balances b ON b.item_id = s.item_id AND b.location_id = s.location_id AND b.variant_id = s.variant_id
+    WHERE s.ledger_id IS NOT NULL
+    ON CONFLICT DO NOTHING
+    """,
+]
+
+async def _copy_csv(db: AsyncSession, file: BinaryIO) -> int:
+    """Streams the CSV into the staging table with COPY, one batch of rows at a time."""
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+    rows = 0
+    for batch in iter_csv_batches(file, COPY_BATCH_SIZE):
+        records = [
+            (row_num, (row.get("Item Code") or "").strip(), (row.get("Location Code") or "").strip(), row.get("Qty"), row.get("Attributes"))
+            for row_num, row in batch
+        ]
+        await raw.driver_connection.copy_records_to_table(
+            "stock_load",
+            records=records,
+            columns=["row_num", "item_code", "location_code", "qty_text", "attributes"]
+        )
+        rows += len(records)
+    return rows
+
+async def bulk_load(db: AsyncSession, file: BinaryIO, mode: str = "opening", reference: str = "", dry_run: bool = False) -> dict:
+    """
+    Sets on-hand quantities from a CSV (Item Code, Location Code, Qty, Attributes).
+
+    Qty is the counted quantity. The upload is staged with COPY, validated with
+    set-based joins, and every difference to `stock_balances` is posted as one
+    ledger entry plus a balance update, all in a single transaction. Invalid rows
+    are reported and skipped. With `dry_run` the variances are computed and
+    the transaction is rolled back.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        raise ValueError("Bulk stock load requires PostgreSQL")
+    reference_type = REFERENCE_TYPES[mode]
+
+    try:
+        await db.execute(text(_STAGE))
+        try:
+            rows = await _copy_csv(db, file)
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise ValueError(f"Could not parse file: {e}")
+        await db.execute(text(_STAGE_VALUES))
+        for statement in _VALIDATIONS:
+            await db.execute(text(statement))
+
+        await db.execute(text(_LOCK_BALANCES))
+        await db.execute(text(_VARIANCES))
+
+        summary = (await db.execute(text("""
+            SELECT count(*) FILTER (WHERE error IS NOT NULL),
+                   count(*) FILTER (WHERE ledger_id IS NOT NULL),
+                   count(*) FILTER (WHERE error IS NULL AND ledger_id IS NULL)
+            FROM stock_load
+        """))).one()
+        errors = (await db.execute(text(
+            "SELECT row_num, error FROM stock_load WHERE error IS NOT NULL ORDER BY row_num LIMIT :limit"
+        ), {"limit": MAX_REPORTED_ROWS})).all()
+        variances = (await db.execute(text("""
+            SELECT row_num, item_code, location_code, attributes, on_hand, qty, qty - on_hand AS variance
+            FROM stock_load WHERE ledger_id IS NOT NULL
+            ORDER BY abs(qty - on_hand) DESC, row_num
+            LIMIT :limit
+        """), {"limit": MAX_REPORTED_ROWS})).all()
+
+        if dry_run:
+            await db.rollback()
+        else:
+            for statement in _POST:
+                await db.execute(text(statement), {"reference_type": reference_type, "reference_id": reference})
+            await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    error_count, posted, unchanged = summary
+    return {
+        "status": "dry_run" if dry_run else ("partial_success" if error_count else "success"),
+        "rows": rows,
+        "posted": 0 if dry_run else posted,
+        "variance_count": posted,
+        "unchanged": unchanged,
+        "error_count": error_count,
+        "errors": [f"Row {row_num}: {error}" for row_num, error in errors],
+        "variances": [
+            {
+                "row": row_num,
+                "item_code": item_code,
+                "location_code": location_code,
+                "attributes": attributes or "",
+                "on_hand": float(on_hand),
+                "counted": float(qty),
+                "variance": float(variance),
+            }
+            for row_num, item_code, location_code, attributes, on_hand, qty, variance in variances
+        ],
+    }
@@ -1,29 +1,38 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_
-from sqlalchemy.orm import joinedload
+from typing import AsyncIterator, Literal
+from sqlalchemy import select, func, or_, tuple_, type_coerce
 from app.models.stock_ledger import StockLedger
 from app.models.stock_balance import StockBalance
-from app.models.attribute import AttributeValue
 from fastapi import HTTPException
+from app.core.reference_cache import reference_cache
+from app.models.variant_values import UUIDArray, canonical_value_ids, variant_id
 
-def _generate_variant_key(attribute_value_ids: list[str]) -> str:
-    """Standardizes variant identification string."""
-    return ",".join(sorted(str(uid) for uid in attribute_value_ids))
+BalanceGrouping = Literal["none", "item", "location", "variant"]
+# Output columns of each grouping, key columns first
+BALANCE_COLUMNS = {
+    "none": ["item_id", "location_id", "variant_id", "attribute_value_ids", "qty"],
+    "item": ["item_id", "qty"],
+    "location": ["location_id", "qty"],
+    "variant": ["item_id", "variant_id", "attribute_value_ids", "qty"],
+}
 
 async def get_stock_balance(db: AsyncSession, item_id, location_id, attribute_value_ids: list[str] = []):
     """
     PRE-CALCULATED O(1) LOOKUP: 
     Retrieves the exact balance from the summary table instead of summing the ledger.
     """
-    v_key = _generate_variant_key(attribute_value_ids)
-    result = await db.execute(select(StockBalance).filter(
+    v_id = await variant_id(db, attribute_value_ids, create=False)
+    if v_id is None:
+        # No row has ever carried this combination
+        return 0.0
+    result = await db.execute(select(StockBalance.qty).filter(
         StockBalance.item_id == item_id,
         StockBalance.location_id == location_id,
-        StockBalance.variant_key == v_key
+        StockBalance.variant_id == v_id
     ))
-    balance = result.scalars().first()
+    qty = result.scalar()
     
-    return float(balance.qty) if balance else 0.0
+    return float(qty) if qty is not None else 0.0
 
 async def add_stock_entry(
     db: AsyncSession,
@@ -44,27 +53,32 @@ async def add_stock_entry(
             )
 
     # 2. Create the Ledger Entry
+    value_ids = canonical_value_ids(attribute_value_ids)
+    v_id = await variant_id(db, value_ids)
     entry = StockLedger(
         item_id=item_id,
         location_id=location_id,
         qty_change=qty_change,
         reference_type=reference_type,
-        reference_id=reference_id
+        reference_id=reference_id,
+        attribute_value_ids=value_ids,
+        variant_id=v_id
     )
     
-    if attribute_value_ids:
-        result = await db.execute(select(AttributeValue).filter(AttributeValue.id.in_(attribute_value_ids)))
-        vals = result.scalars().all()
+    try:
+        vals = await reference_cache.attribute_values(db, attribute_value_ids) if attribute_value_ids else []
+    except LookupError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if vals:
         entry.attribute_values = vals
 
     db.add(entry)
 
     # 3. ATOMIC SUMMARY UPDATE
-    v_key = _generate_variant_key(attribute_value_ids)
     result = await db.execute(select(StockBalance).filter(
         StockBalance.item_id == item_id,
         StockBalance.location_id == location_id,
-        StockBalance.variant_key == v_key
+        StockBalance.variant_id == v_id
     ))
     balance = result.scalars().first()
 
@@ -72,12 +86,11 @@ async def add_stock_entry(
         balance = StockBalance(
             item_id=item_id,
             location_id=location_id,
-            variant_key=v_key,
+            variant_id=v_id,
+            attribute_value_ids=value_ids,
             qty=qty_change
         )
-        if attribute_value_ids:
-            result = await db.execute(select(AttributeValue).filter(AttributeValue.id.in_(attribute_value_ids)))
-            vals = result.scalars().all()
+        if vals:
             balance.attribute_values = vals
         db.add(balance)
     else:
@@ -101,36 +114,86 @@ async def get_stock_entries(db: AsyncSession, skip: int = 0, limit: int = 100) -
     return items, total
 
 async def get_all_stock_balances(db: AsyncSession, user=None):
-    from app.models.item import Item 
-    
-    query = select(StockBalance)
-    if user and user.allowed_categories:
-        query = query.join(Item, StockBalance.item_id == Item.id).filter(Item.category.in_(user.allowed_categories))
-        
-    result = await db.execute(query.options(joinedload(StockBalance.attribute_values)))
-    results = result.unique().scalars().all()
-    
-    return [
-        {
-            "item_id": r.item_id,
-            "location_id": r.location_id,
-            "attribute_value_ids": [v.id for v in r.attribute_values],
-            "qty": float(r.qty)
-        }
-        for r in results if r.qty != 0
-    ]
+    result = await db.execute(_balance_query(user=user))
+    return [_balance_row(row) for row in result]
 
 async def get_batch_stock_balances(db: AsyncSession, requirements: list[dict]):
-    results_map = {}
+    """
+    Balances for many (item_id, location_id, variant_id) requirements in one
+    query on the composite balance key, as {(item_id str, location_id str, variant_id): qty}.
+    """
     if not requirements:
         return {}
 
-    item_ids = set(req['item_id'] for req in requirements)
-    result = await db.execute(select(StockBalance).filter(StockBalance.item_id.in_(item_ids)))
-    balances = result.scalars().all()
+    keys = {(req["item_id"], req["location_id"], req["variant_id"]) for req in requirements}
+    result = await db.execute(
+        select(StockBalance.item_id, StockBalance.location_id, StockBalance.variant_id, StockBalance.qty)
+        .filter(tuple_(StockBalance.item_id, StockBalance.location_id, StockBalance.variant_id).in_(list(keys)))
+    )
+    return {
+        (str(item_id), str(location_id), v_id): float(qty)
+        for item_id, location_id, v_id, qty in result.tuples().all()
+    }
+
+def _balance_query(
+    group_by: BalanceGrouping = "none",
+    item_id=None,
+    category: str | None = None,
+    location_id=None,
+    attribute_value_ids: list = [],
+    user=None
+):
+    """
+    Non-zero balances, filtered and optionally summed per item, per location or
+    per item variant. Everything is done in SQL; rows come back in key order.
+    """
+    from app.models.item import Item
+
+    filters = [StockBalance.qty != 0]
+    if item_id:
+        filters.append(StockBalance.item_id == item_id)
+    if location_id:
+        filters.append(StockBalance.location_id == location_id)
+    if attribute_value_ids:
+        # Array containment, served by the GIN index on attribute_value_ids
+        filters.append(StockBalance.attribute_value_ids.op("@>")(
+            type_coerce(canonical_value_ids(attribute_value_ids), UUIDArray)
+        ))
+
+    categories = []
+    if category:
+        categories.append([category])
+    if user and user.allowed_categories:
+        categories.append(user.allowed_categories)
+
+    keys = [getattr(StockBalance, name) for name in BALANCE_COLUMNS[group_by][:-1]]
+    if group_by == "none":
+        query = select(*keys, StockBalance.qty.label("qty"))
+    else:
+        qty = func.sum(StockBalance.qty)
+        query = select(*keys, qty.label("qty")).group_by(*keys).having(qty != 0)
+
+    query = query.filter(*filters)
+    if categories:
+        query = query.join(Item, StockBalance.item_id == Item.id)
+        for allowed in categories:
+            query = query.filter(Item.category.in_(allowed))
+    return query.order_by(*(key for key in keys if key is not StockBalance.attribute_value_ids))
+
+def _balance_row(row) -> dict:
+    data = dict(row._mapping)
+    data["qty"] = float(data["qty"])
+    return data
+
+async def query_stock_balances(db: AsyncSession, skip: int = 0, limit: int = 100, **filters) -> tuple[list[dict], int]:
+    """One page of `_balance_query` and the total number of rows (or groups)."""
+    query = _balance_query(**filters)
+    total = (await db.execute(select(func.count()).select_from(query.order_by(None).subquery()))).scalar()
+    result = await db.execute(query.offset(skip).limit(limit))
+    return [_balance_row(row) for row in result], total
 
-    for b in balances:
-        key = (str(b.item_id), str(b.location_id), b.variant_key)
-        results_map[key] = float(b.qty)
-            
-    return results_map
+async def stream_stock_balances(db: AsyncSession, **filters) -> AsyncIterator[dict]:
+    """Every row of `_balance_query`, fetched from a server-side cursor in batches."""
+    result = await db.stream(_balance_query(**filters).execution_options(yield_per=1000))
+    async for row in result:
+        yield _balance_row(row)
@@ -0,0 +1,135 @@
+"""
+Throughput benchmark for API read endpoints.
+
+Run it against a running API before and after a change and compare:
+
+    python -m scripts.bench_endpoints --url http://localhost:8000 --save before.json
+    # ... deploy the change ...
+    python -m scripts.bench_endpoints --url http://localhost:8000 --compare before.json
+
+Without --url the app runs in this process (httpx ASGI transport, real
+lifespan), which needs only the database. The default endpoint set covers the
+routers moved from the sync (threadpool) session to the async session stack;
+bench_endpoints_async_port.txt holds the numbers recorded for that change.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+DEFAULT_ENDPOINTS = [
+    "/api/users/me",
+    "/api/users",
+    "/api/roles",
+    "/api/attributes",
+    "/api/work-centers",
+    "/api/operations",
+    "/api/partners",
+    "/api/locations",
+    "/api/samples",
+    "/api/audit-logs",
+    "/api/dashboard/kpis",
+    "/api/categories",
+    "/api/uoms",
+]
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+async def bench_endpoint(client: httpx.AsyncClient, path: str, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            res = await client.get(path)
+            latencies.append(time.perf_counter() - started)
+            if res.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "errors": errors,
+    }
+
+
+async def drive(client: httpx.AsyncClient, args) -> dict:
+    token = (await client.post("/api/token", data={"username": args.username, "password": args.password})).json()["access_token"]
+    client.headers["Authorization"] = f"Bearer {token}"
+
+    results = {}
+    for path in args.endpoints:
+        await bench_endpoint(client, path, min(20, args.requests), args.concurrency)  # warm-up
+        results[path] = await bench_endpoint(client, path, args.requests, args.concurrency)
+    return results
+
+
+async def run(args) -> dict:
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+            return await drive(client, args)
+
+    from app.main import app
+
+    results = {}
+    try:
+        async with app.router.lifespan_context(app):
+            # Unhandled errors come back as 500s and are counted, as over a real socket
+            transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+                results = await drive(client, args)
+    except Exception as e:
+        if not results:
+            raise
+        # Older builds cannot shut down without Redis; the measurements are complete
+        print(f"App shutdown failed: {e}", file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Drive a running server instead of the in-process app")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--endpoints", nargs="+", default=DEFAULT_ENDPOINTS)
+    parser.add_argument("--save", help="Write results to a JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    baseline = json.load(open(args.compare)) if args.compare else {}
+
+    print(f"{'endpoint':<28}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'err':>6}{'vs base':>10}")
+    for path, r in results.items():
+        delta = ""
+        if path in baseline and baseline[path]["rps"]:
+            delta = f"{(r['rps'] / baseline[path]['rps'] - 1) * 100:+.0f}%"
+        print(f"{path:<28}{r['rps']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['errors']:>6}{delta:>10}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Login / KDF benchmark.
+
+Local mode (no server needed) compares password verification run inline on the
+event loop against the dedicated KDF pool, and measures how much each stalls
+unrelated work on the loop:
+
+    python -m scripts.bench_login --requests 200 --concurrency 32
+
+HTTP mode drives POST /api/token on a running API:
+
+    python -m scripts.bench_login --url http://localhost:8000 --username admin --password password
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import security
+from app.core.kdf_pool import KDFPool
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(label: str, latencies: list[float], elapsed: float, loop_lag: float | None = None):
+    line = (
+        f"{label:<18} n={len(latencies):<5} "
+        f"p50={percentile(latencies, 50) * 1000:8.1f}ms "
+        f"p95={percentile(latencies, 95) * 1000:8.1f}ms "
+        f"p99={percentile(latencies, 99) * 1000:8.1f}ms "
+        f"throughput={len(latencies) / elapsed:8.1f}/s"
+    )
+    if loop_lag is not None:
+        line += f" max_loop_lag={loop_lag * 1000:8.1f}ms"
+    print(line)
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """Worst delay observed by a ticker that stands in for unrelated requests."""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+
+async def run_local(verify, requests: int, concurrency: int) -> tuple[list[float], float, float]:
+    hashed = security.get_password_hash("password")
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await verify("password", hashed)
+            latencies.append(time.perf_counter() - started)
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    return latencies, elapsed, await lag_task
+
+
+async def bench_local(args):
+    print(f"PBKDF2 rounds={security.PASSWORD_HASH_ROUNDS} requests={args.requests} concurrency={args.concurrency}")
+
+    async def inline(plain, hashed):
+        return security.verify_and_update(plain, hashed)
+
+    latencies, elapsed, lag = await run_local(inline, args.requests, args.concurrency)
+    report("inline", latencies, elapsed, lag)
+
+    for mode in ("thread", "process"):
+        pool = KDFPool()
+        pool.mode = mode
+        pool.max_queue = max(pool.max_queue, args.concurrency)
+        # Warm the workers so process start-up is not counted
+        await pool.hash("warmup")
+        latencies, elapsed, lag = await run_local(pool.verify_and_update, args.requests, args.concurrency)
+        report(f"pool[{mode}x{pool.workers}]", latencies, elapsed, lag)
+        pool.shutdown()
+
+
+async def bench_http(args):
+    import httpx
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+    failures = 0
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=30) as client:
+        async def one():
+            nonlocal failures
+            async with semaphore:
+                started = time.perf_counter()
+                res = await client.post("/api/token", data={"username": args.username, "password": args.password})
+                latencies.append(time.perf_counter() - started)
+                if res.status_code != 200:
+                    failures += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+        report("POST /api/token", latencies, elapsed)
+        print(f"failures={failures}")
+        metrics = await client.get("/api/health/metrics")
+        if metrics.status_code == 200:
+            print(f"kdf={metrics.json().get('kdf')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--url", help="Benchmark a running API instead of the local KDF paths")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="password")
+    args = parser.parse_args()
+
+    asyncio.run(bench_http(args) if args.url else bench_local(args))
+
+
+if __name__ == "__main__":
+    main()
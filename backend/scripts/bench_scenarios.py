@@ -0,0 +1,294 @@
+"""
+Mixed ERP workload benchmark.
+
+Virtual users run weighted scenarios against data from scripts/seed_volume.py
+for a fixed time: browsing the work order list, bursts of work order
+completions, purchase order receipts, dashboard polling and item search, while
+a WebSocket probe measures event fan-out latency. Reports p50/p95/p99,
+throughput, errors and database queries per request for every endpoint:
+
+    python -m scripts.seed_volume --prefix LT1
+    python -m scripts.bench_scenarios --prefix LT1 --duration 60 --users 20 --save baseline.json
+    # ... change something, seed a fresh prefix ...
+    python -m scripts.bench_scenarios --prefix LT2 --duration 60 --users 20 --compare baseline.json
+
+By default the app runs in this process (httpx ASGI transport, real
+lifespan), which is what makes query counting and the WebSocket probe
+possible; `--url` drives a running server instead and reports latency only.
+Completions and receipts use up seeded orders, so compare runs on fresh
+prefixes of the same --scale and --seed. `--compare` exits non-zero when an
+endpoint's p95 or queries per request grew by more than --max-regression.
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import event, select
+from sqlalchemy.engine import Engine
+
+# Requests per scenario step, weighted like a shop floor day: mostly reads
+SCENARIO_WEIGHTS = {
+    "browse_work_orders": 30,
+    "poll_dashboard": 25,
+    "search_items": 25,
+    "start_work_orders": 5,
+    "complete_work_orders": 10,
+    "receive_purchase_order": 5,
+}
+
+_queries: contextvars.ContextVar[list | None] = contextvars.ContextVar("bench_queries", default=None)
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+class Workload:
+    def __init__(self, client: httpx.AsyncClient, args, targets: dict):
+        self.client = client
+        self.args = args
+        self.targets = targets
+        self.rng = random.Random(args.seed)
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.queries: dict[str, list[int]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def request(self, label: str, method: str, url: str, **kwargs):
+        counter = [0]
+        token = _queries.set(counter)
+        started = time.perf_counter()
+        try:
+            res = await self.client.request(method, url, **kwargs)
+            failed = res.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        finally:
+            _queries.reset(token)
+        self.latencies[label].append(time.perf_counter() - started)
+        self.queries[label].append(counter[0])
+        if failed:
+            self.errors[label] += 1
+
+    async def browse_work_orders(self):
+        page = self.rng.randint(0, 20)
+        await self.request("GET /work-orders", "GET", "/api/work-orders", params={"skip": page * 50, "limit": 50})
+
+    async def poll_dashboard(self):
+        await self.request("GET /dashboard/kpis", "GET", "/api/dashboard/kpis")
+
+    async def search_items(self):
+        kind = self.rng.choice(["RM", "SA", "FG"])
+        term = f"{self.args.prefix}-{kind}-{self.rng.randint(0, 9):02d}"
+        await self.request("GET /items/suggest", "GET", "/api/items/suggest", params={"q": term[:-1]})
+        await self.request("GET /items?search", "GET", "/api/items", params={"search": term, "limit": 50})
+
+    async def _set_status(self, pool: str, status: str, burst: int):
+        ids = [self.targets[pool].pop() for _ in range(min(burst, len(self.targets[pool])))]
+        await asyncio.gather(*(
+            self.request(f"PUT /work-orders/status={status}", "PUT", f"/api/work-orders/{wo_id}/status", params={"status": status})
+            for wo_id in ids
+        ))
+
+    async def start_work_orders(self):
+        await self._set_status("pending", "IN_PROGRESS", 1)
+
+    async def complete_work_orders(self):
+        await self._set_status("in_progress", "COMPLETED", self.args.burst)
+
+    async def receive_purchase_order(self):
+        if self.targets["sent_pos"]:
+            po_id = self.targets["sent_pos"].pop()
+            await self.request("PUT /purchase-orders/receive", "PUT", f"/api/purchase-orders/{po_id}/receive")
+
+    async def user(self, deadline: float):
+        names, weights = list(SCENARIO_WEIGHTS), list(SCENARIO_WEIGHTS.values())
+        while time.perf_counter() < deadline:
+            await getattr(self, self.rng.choices(names, weights)[0])()
+            if self.args.think_ms:
+                await asyncio.sleep(self.rng.uniform(0, self.args.think_ms / 1000))
+
+
+class ProbeSocket:
+    """Stands in for a browser tab on the in-process ConnectionManager."""
+
+    def __init__(self, sent: dict[int, float], latencies: list[float]):
+        self.sent = sent
+        self.latencies = latencies
+
+    async def send_text(self, frame: str):
+        received = time.perf_counter()
+        data = json.loads(frame)["data"]
+        for message in data if isinstance(data, list) else [data]:
+            if message.get("type") == "BENCH_PING":
+                self.latencies.append(received - self.sent[message["seq"]])
+
+
+async def websocket_fanout(args, deadline: float, latencies: list[float]):
+    """Broadcasts a ping every --ws-interval and times delivery to --ws-clients sockets."""
+    from app.core.ws_manager import manager
+
+    sent: dict[int, float] = {}
+    probes = [ProbeSocket(sent, latencies) for _ in range(args.ws_clients)]
+    manager.active_connections.extend(probes)
+    try:
+        seq = 0
+        while time.perf_counter() < deadline:
+            sent[seq] = time.perf_counter()
+            await manager.broadcast({"type": "BENCH_PING", "seq": seq})
+            seq += 1
+            await asyncio.sleep(args.ws_interval)
+        await manager.flush()
+    finally:
+        for probe in probes:
+            manager.disconnect(probe)
+
+
+def load_targets(prefix: str) -> dict:
+    """Seeded orders that the write scenarios move forward, shuffled."""
+    from app.db.session import SessionLocal
+    from app.models.manufacturing import WorkOrder
+    from app.models.purchase import PurchaseOrder
+
+    with SessionLocal() as session:
+        def root_wos(status: str) -> list[str]:
+            return [str(i) for i in session.execute(select(WorkOrder.id).filter(
+                WorkOrder.code.like(f"{prefix}-WO-%"), WorkOrder.parent_wo_id == None, WorkOrder.status == status
+            ).order_by(WorkOrder.code)).scalars()]
+
+        targets = {
+            "pending": root_wos("PENDING"),
+            "in_progress": root_wos("IN_PROGRESS"),
+            "sent_pos": [str(i) for i in session.execute(select(PurchaseOrder.id).filter(
+                PurchaseOrder.po_number.like(f"{prefix}-PO-%"), PurchaseOrder.status == "SENT"
+            ).order_by(PurchaseOrder.po_number)).scalars()],
+        }
+    if not any(targets.values()):
+        sys.exit(f"No open seeded orders with prefix {prefix}; run scripts.seed_volume --prefix {prefix} first")
+    rng = random.Random(prefix)
+    for ids in targets.values():
+        rng.shuffle(ids)
+    return targets
+
+
+async def drive(client: httpx.AsyncClient, args, in_process: bool) -> dict:
+    token = (await client.post("/api/token", data={"username": args.username, "password": args.password})).json()["access_token"]
+    client.headers["Authorization"] = f"Bearer {token}"
+
+    workload = Workload(client, args, load_targets(args.prefix))
+    ws_latencies: list[float] = []
+    deadline = time.perf_counter() + args.duration
+    tasks = [workload.user(deadline) for _ in range(args.users)]
+    if in_process and args.ws_clients:
+        tasks.append(websocket_fanout(args, deadline, ws_latencies))
+
+    started = time.perf_counter()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for label, samples in sorted(workload.latencies.items()):
+        results[label] = {
+            "requests": len(samples),
+            "rps": round(len(samples) / elapsed, 1),
+            "p50_ms": round(percentile(samples, 50) * 1000, 2),
+            "p95_ms": round(percentile(samples, 95) * 1000, 2),
+            "p99_ms": round(percentile(samples, 99) * 1000, 2),
+            "errors": workload.errors[label],
+            "queries": round(sum(workload.queries[label]) / len(samples), 1) if in_process else None,
+        }
+    if ws_latencies:
+        results["WS fan-out"] = {
+            "requests": len(ws_latencies),
+            "rps": round(len(ws_latencies) / elapsed, 1),
+            "p50_ms": round(percentile(ws_latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(ws_latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(ws_latencies, 99) * 1000, 2),
+            "errors": 0,
+            "queries": None,
+        }
+    return results
+
+
+async def run(args) -> dict:
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+            return await drive(client, args, in_process=False)
+
+    from app.main import app
+
+    event.listen(Engine, "before_cursor_execute", _count_query)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            return await drive(client, args, in_process=True)
+
+
+def regressions(results: dict, baseline: dict, max_regression: float) -> list[str]:
+    found = []
+    for label, r in results.items():
+        base = baseline.get(label)
+        if not base:
+            continue
+        if base["p95_ms"] and r["p95_ms"] > base["p95_ms"] * (1 + max_regression):
+            found.append(f"{label}: p95 {base['p95_ms']}ms -> {r['p95_ms']}ms")
+        if base.get("queries") is not None and r["queries"] is not None and r["queries"] > base["queries"] * (1 + max_regression):
+            found.append(f"{label}: queries/request {base['queries']} -> {r['queries']}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prefix", default="LT", help="Prefix the data was seeded with")
+    parser.add_argument("--url", help="Drive a running server instead of the in-process app")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to run")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--think-ms", type=float, default=0, help="Max random pause between steps")
+    parser.add_argument("--burst", type=int, default=5, help="Work orders completed together per burst")
+    parser.add_argument("--ws-clients", type=int, default=200, help="Probe sockets (in-process only)")
+    parser.add_argument("--ws-interval", type=float, default=0.1, help="Seconds between probe broadcasts")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", help="Write results to a JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed p95/query growth over the baseline")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    baseline = json.load(open(args.compare)) if args.compare else {}
+
+    print(f"{'endpoint':<36}{'n':>7}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'err':>6}{'q/req':>7}{'p95 vs base':>13}")
+    for label, r in results.items():
+        delta = ""
+        if label in baseline and baseline[label]["p95_ms"]:
+            delta = f"{(r['p95_ms'] / baseline[label]['p95_ms'] - 1) * 100:+.0f}%"
+        queries = "" if r["queries"] is None else r["queries"]
+        print(f"{label:<36}{r['requests']:>7}{r['rps']:>8}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{r['errors']:>6}{queries:>7}{delta:>13}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    found = regressions(results, baseline, args.max_regression)
+    if found:
+        sys.exit("Regressions over the baseline:\n  " + "\n  ".join(found))
+
+
+if __name__ == "__main__":
+    main()
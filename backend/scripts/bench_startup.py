@@ -0,0 +1,84 @@
+"""
+Worker cold start benchmark.
+
+Imports app.main in fresh interpreters under `-X importtime` and reports the
+wall time of the import plus the slowest modules (cumulative time):
+
+    python -m scripts.bench_startup --runs 5 --top 25
+
+`--report FILE` writes the table for checking in next to earlier runs
+(scripts/startup_importtime.txt is the current baseline); `--budget SECONDS`
+exits non-zero when the median import is slower, for use in CI.
+Importing app.main builds no engines and opens no connections, so no database
+is needed.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_once(module: str) -> tuple[float, dict[str, tuple[int, int]]]:
+    """Wall time of one cold import and {module: (self_us, cumulative_us)}."""
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - started
+    if proc.returncode != 0:
+        sys.exit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    timings = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return elapsed, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--report", help="Write the report to this file as well")
+    parser.add_argument("--budget", type=float, help="Fail if the median import takes longer (seconds)")
+    args = parser.parse_args()
+
+    # The first run warms the bytecode cache and is not counted
+    import_once(args.module)
+    runs = [import_once(args.module) for _ in range(args.runs)]
+    walls = [wall for wall, _ in runs]
+    median_run = sorted(runs, key=lambda run: run[0])[len(runs) // 2][1]
+
+    lines = [
+        f"python {sys.version.split()[0]}, import {args.module}, {args.runs} runs",
+        f"wall: median={statistics.median(walls) * 1000:.0f}ms min={min(walls) * 1000:.0f}ms max={max(walls) * 1000:.0f}ms",
+        f"{args.module} cumulative (median run): {median_run[args.module][1] / 1000:.0f}ms",
+        "",
+        f"{'cumulative ms':>14} {'self ms':>8}  module",
+    ]
+    slowest = sorted(median_run.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+    for name, (self_us, cumulative_us) in slowest:
+        lines.append(f"{cumulative_us / 1000:14.1f} {self_us / 1000:8.1f}  {name}")
+
+    report = "\n".join(lines)
+    print(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(report + "\n")
+
+    if args.budget is not None and statistics.median(walls) > args.budget:
+        sys.exit(f"Median import {statistics.median(walls):.3f}s is over the {args.budget:.3f}s budget")
+
+
+if __name__ == "__main__":
+    main()
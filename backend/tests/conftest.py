@@ -38,43 +38,28 @@ def client(db_session):
 
 @pytest.fixture(scope="function")
 def test_user(db_session):
-    # Create a test admin user in the rollback session (for sync routes / get_current_user)
+    # Create a test admin user in the REAL DB: every router runs on the async
+    # session, which cannot see the rollback session. A copy in the rollback
+    # session as well would block this insert on its own primary key.
+    from app.db.session import engine as _eng
+    from sqlalchemy.orm import Session as _SASession
+    _real_conn = _eng.connect()
+    _real_sess = _SASession(_real_conn, expire_on_commit=False)
     user = User(
-        username="testadmin",
+        id=uuid.uuid4(),
+        username=f"testadmin-{uuid.uuid4().hex[:8]}",
         full_name="Test Admin",
         hashed_password="hashed_secret", # We won't login via API, just mock token
     )
-    db_session.add(user)
-    db_session.commit()
-    db_session.refresh(user)
-
-    # Also mirror the user into the REAL DB so async routes (audit service) can
-    # satisfy FK constraints on audit_logs.user_id. Use the same UUID.
-    from app.db.session import engine as _eng
-    from sqlalchemy.orm import Session as _SASession
-    _real_conn = _eng.connect()
-    _real_sess = _SASession(_real_conn)
-    _real_user_inserted = False
-    try:
-        _real_user = User(
-            id=user.id,
-            username=f"testadmin-{str(user.id)[:8]}",
-            full_name="Test Admin",
-            hashed_password="hashed_secret",
-        )
-        _real_sess.add(_real_user)
-        _real_sess.commit()
-        _real_user_inserted = True
-    except Exception:
-        _real_sess.rollback()
+    _real_sess.add(user)
+    _real_sess.commit()
 
     yield user
 
     # Cleanup real DB user after test
     try:
-        if _real_user_inserted:
-            _real_sess.query(User).filter(User.id == user.id).delete(synchronize_session=False)
-            _real_sess.commit()
+        _real_sess.query(User).filter(User.id == user.id).delete(synchronize_session=False)
+        _real_sess.commit()
     except Exception:
         _real_sess.rollback()
     finally:
@@ -99,3 +84,5 @@ def dispose_async_engine_pool():
     if db_manager.async_engine is not None:
         # dispose() on AsyncEngine is async; access the underlying sync pool directly
         db_manager.async_engine.sync_engine.pool.dispose()
+    if db_manager.replica_engine is not None:
+        db_manager.replica_engine.sync_engine.pool.dispose()
@@ -0,0 +1,58 @@
+import time
+from app.api import auth
+from app.core.cache import TTLCache
+
+
+def test_ttl_cache_expires_and_evicts_lru():
+    cache = TTLCache(maxsize=2, ttl=0.05)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" is now most recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+    time.sleep(0.06)
+    assert cache.get("a") is None
+
+
+def test_invalidate_user_evicts_cached_principal():
+    auth.user_cache.set("u1", object())
+    auth.user_cache.set("u2", object())
+
+    auth.invalidate_user("u1")
+    assert auth.user_cache.get("u1") is None
+    assert auth.user_cache.get("u2") is not None
+
+    auth.invalidate_user()
+    assert len(auth.user_cache) == 0
+
+
+def test_current_user_served_from_cache(client, auth_headers, test_user):
+    res = client.get("/api/users/me", headers=auth_headers)
+    assert res.status_code == 200
+    assert auth.user_cache.get(str(test_user.id)) is not None
+
+
+def test_revoked_access_applies_on_next_request(client, auth_headers, test_user):
+    from sqlalchemy.orm import Session
+    from app.db.session import engine
+    from app.models.auth import Role, User
+
+    with Session(engine) as session:
+        role = session.query(Role).filter(Role.name == "Administrator").first() or Role(name="Administrator")
+        session.get(User, test_user.id).role = role
+        session.commit()
+    assert client.get("/api/admin/database/current", headers=auth_headers).status_code == 200
+    assert auth.user_cache.get(str(test_user.id)) is not None
+
+    # Revoked outside update_user: the cached principal must not outlive the commit
+    with Session(engine) as session:
+        session.get(User, test_user.id).role = Role(name=f"Viewer-{test_user.id}")
+        session.commit()
+    assert client.get("/api/admin/database/current", headers=auth_headers).status_code == 403
+
+    with Session(engine) as session:
+        session.delete(session.get(User, test_user.id))
+        session.commit()
+    assert client.get("/api/admin/database/current", headers=auth_headers).status_code == 401
@@ -70,3 +70,121 @@ def test_nested_bom_structure(client, auth_headers):
     fin_bom = next(b for b in boms if b["code"] == "BOM-FIN")
     assert fin_bom["lines"][0]["item_id"] == sub["id"]
 
+
+def test_create_bom_is_atomic(client, auth_headers):
+    import uuid
+    suffix = uuid.uuid4().hex[:8]
+    client.post("/api/uoms", json={"name": "pcs"}, headers=auth_headers)
+    client.post("/api/items", json={"code": f"FG-{suffix}", "name": "FG", "uom": "pcs"}, headers=auth_headers)
+    client.post("/api/items", json={"code": f"RM-{suffix}", "name": "RM", "uom": "pcs"}, headers=auth_headers)
+
+    # The second line fails to resolve, so neither the header nor the first line is kept
+    res = client.post("/api/boms", json={
+        "code": f"BOM-{suffix}", "item_code": f"FG-{suffix}", "qty": 1,
+        "lines": [{"item_code": f"RM-{suffix}", "qty": 1}, {"item_code": f"MISSING-{suffix}", "qty": 1}]
+    }, headers=auth_headers)
+    assert res.status_code == 404
+    boms = client.get("/api/boms?limit=10000", headers=auth_headers).json()
+    assert not any(b["code"] == f"BOM-{suffix}" for b in boms)
+
+    res = client.post("/api/boms", json={
+        "code": f"BOM-{suffix}", "item_code": f"FG-{suffix}", "qty": 1,
+        "lines": [{"item_code": f"RM-{suffix}", "qty": 1.5, "is_percentage": True}]
+    }, headers=auth_headers)
+    assert res.status_code == 200
+    data = res.json()
+    assert data["item_code"] == f"FG-{suffix}"
+    assert data["lines"][0]["item_code"] == f"RM-{suffix}"
+    assert data["lines"][0]["is_percentage"] is True
+
+def test_import_boms(client, auth_headers):
+    import json, time, uuid
+    suffix = uuid.uuid4().hex[:8]
+    client.post("/api/uoms", json={"name": "pcs"}, headers=auth_headers)
+    for code in ("FG", "RM1", "RM2"):
+        client.post("/api/items", json={"code": f"{code}-{suffix}", "name": code, "uom": "pcs"}, headers=auth_headers)
+
+    def wait(job_id):
+        for _ in range(50):
+            job = client.get(f"/api/imports/{job_id}", headers=auth_headers).json()
+            if job["status"] in ("DONE", "FAILED"):
+                return job
+            time.sleep(0.1)
+        return job
+
+    csv_content = (
+        "BOM Code,Description,Item Code,Qty,Tolerance %,Attributes,Line Item Code,Line Qty,Is Percentage,Source Location Code,Line Attributes\n"
+        f"CSV-{suffix},Two lines,FG-{suffix},1,5,,RM1-{suffix},2,,,\n"
+        f"CSV-{suffix},,,,,,RM2-{suffix},3,,,\n"
+        f"BAD-{suffix},,FG-{suffix},1,,,NOPE-{suffix},1,,,\n"
+    )
+    res = client.post("/api/boms/import", files={"file": ("boms.csv", csv_content.encode(), "text/csv")}, headers=auth_headers)
+    assert res.status_code == 202
+    job = wait(res.json()["id"])
+    assert job["status"] == "DONE"
+    assert job["success_count"] == 1
+    assert job["errors"] == [f"Row 3: Material item 'NOPE-{suffix}' not found"]
+
+    json_content = json.dumps([
+        {"code": f"JSON-{suffix}", "item_code": f"FG-{suffix}", "lines": [{"item_code": f"RM1-{suffix}", "qty": 1}]},
+        {"code": f"CSV-{suffix}", "item_code": f"FG-{suffix}", "lines": []},
+    ])
+    res = client.post("/api/boms/import", files={"file": ("boms.json", json_content.encode(), "application/json")}, headers=auth_headers)
+    job = wait(res.json()["id"])
+    assert job["success_count"] == 1
+    assert job["errors"] == ["Row 2: BOM Code already exists"]
+
+    boms = {b["code"]: b for b in client.get("/api/boms?limit=10000", headers=auth_headers).json()}
+    assert len(boms[f"CSV-{suffix}"]["lines"]) == 2
+    assert boms[f"CSV-{suffix}"]["tolerance_percentage"] == 5.0
+    assert f"JSON-{suffix}" in boms
+
+def test_bom_variant_ids_are_stored_on_rows(client, auth_headers):
+    import uuid
+    suffix = uuid.uuid4().hex[:8]
+    client.post("/api/uoms", json={"name": "pcs"}, headers=auth_headers)
+    attribute = client.post("/api/attributes", json={
+        "name": f"Color-{suffix}", "values": [{"value": "Red"}, {"value": "Blue"}]
+    }, headers=auth_headers).json()
+    value_ids = [v["id"] for v in attribute["values"]]
+    client.post("/api/items", json={"code": f"FG-{suffix}", "name": "FG", "uom": "pcs"}, headers=auth_headers)
+    client.post("/api/items", json={"code": f"RM-{suffix}", "name": "RM", "uom": "pcs"}, headers=auth_headers)
+
+    res = client.post("/api/boms", json={
+        "code": f"BOM-{suffix}", "item_code": f"FG-{suffix}", "qty": 1,
+        "attribute_value_ids": value_ids[:1],
+        "lines": [{"item_code": f"RM-{suffix}", "qty": 1, "attribute_value_ids": list(reversed(value_ids))}]
+    }, headers=auth_headers)
+    assert res.status_code == 200, res.text
+
+    # Read back from the row's own column, in canonical (sorted) order
+    bom = client.get(f"/api/boms/{res.json()['id']}", headers=auth_headers).json()
+    assert bom["attribute_value_ids"] == value_ids[:1]
+    assert bom["lines"][0]["attribute_value_ids"] == sorted(value_ids)
+
+
+def test_bom_list_etag_covers_lines(client, auth_headers):
+    import uuid
+    from sqlalchemy import update
+    from sqlalchemy.orm import Session
+    from app.db.session import engine
+    from app.models.bom import BOMLine
+
+    suffix = uuid.uuid4().hex[:8]
+    client.post("/api/uoms", json={"name": "pcs"}, headers=auth_headers)
+    client.post("/api/items", json={"code": f"FG-{suffix}", "name": "FG", "uom": "pcs"}, headers=auth_headers)
+    client.post("/api/items", json={"code": f"RM-{suffix}", "name": "RM", "uom": "pcs"}, headers=auth_headers)
+    bom = client.post("/api/boms", json={
+        "code": f"BOM-{suffix}", "item_code": f"FG-{suffix}", "qty": 1,
+        "lines": [{"item_code": f"RM-{suffix}", "qty": 1}]
+    }, headers=auth_headers).json()
+    etag = client.get("/api/boms?limit=10000", headers=auth_headers).headers["ETag"]
+
+    # Only a line changes: the BOM and item rows are untouched
+    with Session(engine) as session:
+        session.execute(update(BOMLine).filter(BOMLine.id == bom["lines"][0]["id"]).values(qty=3))
+        session.commit()
+    res = client.get("/api/boms?limit=10000", headers={**auth_headers, "If-None-Match": etag})
+    assert res.status_code == 200
+    line = next(b for b in res.json() if b["id"] == bom["id"])["lines"][0]
+    assert line["qty"] == 3
@@ -0,0 +1,47 @@
+from sqlalchemy import create_engine, text
+from app.core.db_manager import pool_settings, asyncpg_connect_args
+from app.core.db_pool import TimedQueuePool, pool_status
+
+def test_pool_status_tracks_checkouts(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool, pool_size=2, max_overflow=1)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        status = pool_status(engine)
+        assert status["checked_out"] == 1
+        assert status["checkouts"] == 1
+
+    status = pool_status(engine)
+    assert status["checked_out"] == 0
+    assert status["size"] == 2
+    engine.dispose()
+
+def test_pool_settings_profile_overrides_env(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "7")
+    monkeypatch.setenv("DB_PGBOUNCER", "true")
+    settings = pool_settings({"max_overflow": 0, "pool_timeout": None})
+    assert settings["pool_size"] == 7
+    assert settings["max_overflow"] == 0
+    assert settings["pool_timeout"] == 30.0
+    assert settings["pgbouncer"] is True
+
+def test_pgbouncer_disables_statement_cache():
+    assert asyncpg_connect_args(False) == {}
+    args = asyncpg_connect_args(True)
+    assert args["statement_cache_size"] == 0
+    assert args["prepared_statement_name_func"]() != args["prepared_statement_name_func"]()
+
+def test_health_metrics_require_an_administrator(client, auth_headers, test_user):
+    from sqlalchemy.orm import Session
+    from app.db.session import engine
+    from app.models.auth import Role, User
+
+    assert client.get("/api/health/metrics").status_code == 401
+    assert client.get("/api/health/metrics", headers=auth_headers).status_code == 403
+
+    with Session(engine) as session:
+        role = session.query(Role).filter(Role.name == "Administrator").first() or Role(name="Administrator")
+        session.get(User, test_user.id).role = role
+        session.commit()
+    res = client.get("/api/health/metrics", headers=auth_headers)
+    assert res.status_code == 200
+    assert set(res.json()) == {"kdf", "db"}
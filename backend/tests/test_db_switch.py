@@ -0,0 +1,89 @@
+import asyncio
+from sqlalchemy import text
+from app.core.db_manager import DatabaseManager
+
+
+def test_hot_swap_keeps_old_engines_until_drained(tmp_path):
+    async def run():
+        mgr = DatabaseManager()
+        mgr.initialize(f"sqlite:///{tmp_path / 'a.db'}")
+        old_engine = mgr.engine
+
+        # A session opened before the swap finishes on the old database
+        session = mgr.session_factory()
+        session.execute(text("SELECT 1"))
+
+        res = await mgr.hot_swap(f"sqlite:///{tmp_path / 'b.db'}")
+        assert res.status
+        assert mgr.current_url.endswith("b.db")
+        assert mgr.engine is not old_engine
+        assert (tmp_path / "b.db").exists()
+        assert mgr.pool_metrics()["draining"] == 1
+
+        session.close()
+        await asyncio.sleep(0.3)
+        assert mgr.pool_metrics()["draining"] == 0
+
+    asyncio.run(run())
+
+
+def test_failed_hot_swap_leaves_current_database(tmp_path):
+    async def run():
+        mgr = DatabaseManager()
+        mgr.initialize(f"sqlite:///{tmp_path / 'a.db'}")
+        engine = mgr.engine
+
+        res = await mgr.hot_swap(f"sqlite:///{tmp_path / 'missing' / 'b.db'}")
+        assert not res.status
+        assert mgr.engine is engine
+        assert mgr.current_url.endswith("a.db")
+
+    asyncio.run(run())
+
+
+
+def test_configure_defers_engines_until_first_use(tmp_path):
+    mgr = DatabaseManager()
+    mgr.configure(f"sqlite:///{tmp_path / 'a.db'}")
+    assert mgr.current_url.endswith("a.db")
+    assert mgr._active.engine is None
+    assert not (tmp_path / "a.db").exists()
+
+    with mgr.session_factory() as session:
+        session.execute(text("SELECT 1"))
+    assert mgr._active.engine is mgr.engine
+
+
+def test_importing_the_app_builds_no_engines():
+    import subprocess
+    import sys
+
+    code = "import app.main; from app.core.db_manager import db_manager; assert db_manager._active.engine is None"
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
+
+
+def test_switch_is_recorded_in_the_boot_database(tmp_path):
+    from app.core.db_switch import DatabaseSwitchCoordinator
+
+    async def run():
+        first = DatabaseManager()
+        first.initialize(f"sqlite:///{tmp_path / 'a.db'}")
+        res = await DatabaseSwitchCoordinator(first).switch(f"sqlite:///{tmp_path / 'b.db'}")
+        assert res.status
+
+        # A worker starting later (no Redis involved) follows the recorded switch
+        restarted = DatabaseManager()
+        restarted.configure(f"sqlite:///{tmp_path / 'a.db'}")
+        coordinator = DatabaseSwitchCoordinator(restarted)
+        await coordinator.start()
+        await coordinator.stop()
+        return restarted, coordinator
+
+    restarted, coordinator = asyncio.run(run())
+    assert restarted.current_url.endswith("b.db")
+    assert coordinator.generation == 1
+
+    # Clients are told to resync through the new database's outbox
+    with restarted.session_factory() as session:
+        topics = session.execute(text("SELECT topic FROM outbox_events")).scalars().all()
+    assert topics == ["RESYNC"]
@@ -39,3 +39,96 @@ def test_duplicate_item_code(client, auth_headers):
     # Try again
     res = client.post("/api/items", json=payload, headers=auth_headers)
     assert res.status_code == 400
+
+def test_import_items_csv(client, auth_headers):
+    import uuid
+    suffix = uuid.uuid4().hex[:8]
+    csv_content = (
+        "\ufeffCode,Name,UOM,Category\n"
+        f"IMP-{suffix}-1,Imported One,box-{suffix},Cat-{suffix}\n"
+        f"IMP-{suffix}-2,Imported Two,box-{suffix},\n"
+        f"IMP-{suffix}-1,Duplicate In File,pcs,\n"
+        ",Missing Code,pcs,\n"
+    )
+    res = client.post(
+        "/api/items/import",
+        files={"file": ("items.csv", csv_content.encode("utf-8"), "text/csv")},
+        headers=auth_headers
+    )
+    assert res.status_code == 202
+    job_id = res.json()["id"]
+
+    # Processed by the import worker started in the app lifespan
+    import time
+    for _ in range(50):
+        job = client.get(f"/api/imports/{job_id}", headers=auth_headers).json()
+        if job["status"] in ("DONE", "FAILED"):
+            break
+        time.sleep(0.1)
+    assert job["status"] == "DONE"
+    assert job["success_count"] == 2
+    assert job["rows_processed"] == 4
+    assert job["errors"] == [
+        f"Row 3: Item code 'IMP-{suffix}-1' already exists",
+        "Row 4: Missing required fields (Code, Name, UOM)",
+    ]
+
+    uoms = client.get("/api/uoms", headers=auth_headers).json()
+    assert any(u["name"] == f"box-{suffix}" for u in uoms)
+
+def test_item_search_and_suggest(client, auth_headers):
+    import uuid
+    suffix = uuid.uuid4().hex[:8].upper()
+    client.post("/api/uoms", json={"name": "pcs"}, headers=auth_headers)
+    for code, name in [
+        (f"X{suffix}-2", f"Bracket {suffix}"),
+        (f"X{suffix}", "Plain"),
+        (f"Y-{suffix}", "Other"),
+        (f"Z-{suffix}_A", "Underscore"),
+    ]:
+        client.post("/api/items", json={"code": code, "name": name, "uom": "pcs"}, headers=auth_headers)
+
+    # Exact code first, then code prefix, then other matches
+    data = client.get(f"/api/items?search=x{suffix.lower()}", headers=auth_headers).json()
+    assert [i["code"] for i in data["items"]][:2] == [f"X{suffix}", f"X{suffix}-2"]
+    assert data["total_capped"] is False
+
+    data = client.get(f"/api/items?search={suffix}", headers=auth_headers).json()
+    assert data["total"] == 4
+
+    # LIKE wildcards in the term are matched literally
+    data = client.get(f"/api/items?search={suffix}_", headers=auth_headers).json()
+    assert [i["code"] for i in data["items"]] == [f"Z-{suffix}_A"]
+
+    res = client.get(f"/api/items/suggest?q=x{suffix.lower()}", headers=auth_headers)
+    assert res.status_code == 200
+    suggestions = res.json()
+    assert [s["code"] for s in suggestions] == [f"X{suffix}", f"X{suffix}-2"]
+    assert set(suggestions[0]) == {"id", "code", "name"}
+
+    # Fuzzy matches top up the list after the prefix hits
+    suggestions = client.get(f"/api/items/suggest?q={suffix}", headers=auth_headers).json()
+    assert len(suggestions) == 4
+
+def test_conditional_get(client, auth_headers):
+    import uuid
+    res = client.get("/api/uoms", headers=auth_headers)
+    etag = res.headers["ETag"]
+    assert res.status_code == 200
+    assert res.headers["Cache-Control"] == "private, no-cache"
+
+    res = client.get("/api/uoms", headers={**auth_headers, "If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.content == b""
+
+    # A write changes the collection version
+    client.post("/api/uoms", json={"name": f"U-{uuid.uuid4().hex[:8]}"}, headers=auth_headers)
+    res = client.get("/api/uoms", headers={**auth_headers, "If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+
+    # Each page has its own tag
+    first = client.get("/api/items?limit=1", headers=auth_headers).headers["ETag"]
+    second = client.get("/api/items?limit=1&skip=1", headers=auth_headers).headers["ETag"]
+    assert first != second
+    assert client.get("/api/items?limit=1", headers={**auth_headers, "If-None-Match": first}).status_code == 304
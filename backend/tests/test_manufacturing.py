@@ -34,6 +34,15 @@ def test_work_order_lifecycle(client, auth_headers):
 
     # Start
     client.put(f"/api/work-orders/{wo_id}/status?status=IN_PROGRESS", headers=auth_headers)
+
+    # Status change is recorded in the outbox in the same transaction
+    from app.db.session import engine as _engine
+    from sqlalchemy import text as _text
+    with _engine.connect() as conn:
+        topics = conn.execute(
+            _text("SELECT topic FROM outbox_events WHERE payload->>'wo_id' = :wo_id"), {"wo_id": wo_id}
+        ).scalars().all()
+    assert topics == ["WORK_ORDER_UPDATE"]
     
     # Complete (Should deduct stock)
     client.put(f"/api/work-orders/{wo_id}/status?status=COMPLETED", headers=auth_headers)
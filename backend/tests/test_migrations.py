@@ -0,0 +1,18 @@
+from app.db.migrations import MIGRATIONS, run_migrations
+
+
+def test_migration_versions_are_unique_and_ordered():
+    versions = [m.version for m in MIGRATIONS]
+    assert versions == sorted(set(versions))
+    assert len({m.name for m in MIGRATIONS}) == len(MIGRATIONS)
+
+
+def test_run_migrations_applies_nothing_the_second_time():
+    from app.db.session import engine
+    from sqlalchemy import text
+
+    run_migrations(engine)
+    assert run_migrations(engine) == []
+    with engine.connect() as conn:
+        applied = set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+    assert {m.version for m in MIGRATIONS} <= applied
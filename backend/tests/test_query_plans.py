@@ -0,0 +1,149 @@
+"""
+Plan regression checks for the hot queries. Volume data is seeded once per
+module inside a transaction that is rolled back at the end, the tables are
+analyzed, and each query must read its table through an index (no Seq Scan,
+and ordered pages must not sort much more than the page) and touch a number of
+buffers proportional to the rows it returns.
+"""
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import insert, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+from app.db.session import engine
+from app.models.item import Item
+from app.models.location import Location
+from app.models.bom import BOM
+from app.models.manufacturing import WorkOrder
+from app.models.stock_ledger import StockLedger
+from app.models.stock_balance import StockBalance
+from app.models.audit import AuditLog
+
+ITEMS = 200
+LOCATIONS = 25
+BOMS_PER_ITEM = 10
+ROWS = 20000
+
+# Heap and index pages per returned row, plus the index descent
+BUFFERS_PER_ROW = 4
+BUFFER_OVERHEAD = 20
+
+
+@pytest.fixture(scope="module")
+def plan_session():
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection)
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture(scope="module")
+def volume(plan_session):
+    db_session = plan_session
+    now = datetime.utcnow()
+    items = [{"id": uuid.uuid4(), "code": f"PLAN-{n}-{uuid.uuid4().hex[:6]}", "name": f"Plan item {n}", "uom": "pcs"} for n in range(ITEMS)]
+    locations = [{"id": uuid.uuid4(), "code": f"PLAN-WH{n}-{uuid.uuid4().hex[:6]}", "name": f"Plan WH {n}"} for n in range(LOCATIONS)]
+    # Several BOMs (variants) per item, so the table is too big to seq-scan cheaply
+    boms = [{"id": uuid.uuid4(), "code": f"PLAN-BOM-{i['code']}-{v}", "item_id": i["id"]} for v in range(BOMS_PER_ITEM) for i in items]
+    db_session.execute(insert(Item.__table__), items)
+    db_session.execute(insert(Location.__table__), locations)
+    db_session.execute(insert(BOM.__table__), boms)
+
+    db_session.execute(insert(StockBalance.__table__), [
+        {"item_id": i["id"], "location_id": loc["id"], "qty": 1}
+        for i in items for loc in locations
+    ])
+    db_session.execute(insert(StockLedger.__table__), [
+        {
+            "item_id": items[n % ITEMS]["id"],
+            "location_id": locations[n % LOCATIONS]["id"],
+            "qty_change": 1,
+            "reference_type": "PLAN",
+            "reference_id": str(n),
+            "created_at": now - timedelta(minutes=n),
+        }
+        for n in range(ROWS)
+    ])
+
+    # One root in ten, followed by its nine children; almost everything is completed
+    roots = [uuid.uuid4() for _ in range(ROWS // 10)]
+    db_session.execute(insert(WorkOrder.__table__), [
+        {
+            "id": roots[n // 10] if n % 10 == 0 else uuid.uuid4(),
+            "parent_wo_id": None if n % 10 == 0 else roots[n // 10],
+            "code": f"PLAN-WO-{n}-{uuid.uuid4().hex[:6]}",
+            "bom_id": boms[n % ITEMS]["id"],
+            "item_id": items[n % ITEMS]["id"],
+            "location_id": locations[n % LOCATIONS]["id"],
+            "qty": 1,
+            "status": "IN_PROGRESS" if n % 100 == 1 else "COMPLETED",
+            "created_at": now - timedelta(minutes=n),
+        }
+        for n in range(ROWS)
+    ])
+    db_session.execute(insert(AuditLog.__table__), [
+        {
+            "action": "UPDATE",
+            "entity_type": ("Item", "BOM", "WorkOrder", "StockEntry")[n % 4],
+            "entity_id": str(items[n % ITEMS]["id"]),
+            "timestamp": now - timedelta(minutes=n),
+        }
+        for n in range(ROWS)
+    ])
+
+    for table in ("items", "locations", "boms", "stock_balances", "stock_ledger", "work_orders", "audit_logs"):
+        db_session.execute(text(f"ANALYZE {table}"))
+    # items[8] has "Item" audit rows (entity type cycles every four rows)
+    return {"item": items[8]["id"], "location": locations[3]["id"], "root": roots[5]}
+
+
+def explain(db_session, query) -> dict:
+    sql = query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    return db_session.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")).scalar()[0]["Plan"]
+
+
+def nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from nodes(child)
+
+
+# (name, table it reads, query builder, whether the result is an ordered page)
+HOT_QUERIES = [
+    ("balance lookup", "stock_balances", lambda v: select(StockBalance.qty).filter(
+        StockBalance.item_id == v["item"], StockBalance.location_id == v["location"], StockBalance.variant_id == 0
+    ), False),
+    ("ledger page", "stock_ledger", lambda v: select(StockLedger).order_by(StockLedger.created_at.desc()).limit(100), True),
+    ("root work orders", "work_orders", lambda v: select(WorkOrder).filter(WorkOrder.parent_wo_id == None).order_by(WorkOrder.created_at.desc()).limit(100), True),
+    ("child work orders", "work_orders", lambda v: select(WorkOrder.id).filter(WorkOrder.parent_wo_id == v["root"]).limit(100), False),
+    ("work orders by status", "work_orders", lambda v: select(WorkOrder.id).filter(WorkOrder.status == "IN_PROGRESS"), False),
+    ("entity audit history", "audit_logs", lambda v: select(AuditLog).filter(
+        AuditLog.entity_type == "Item", AuditLog.entity_id == str(v["item"])
+    ).order_by(AuditLog.timestamp.desc()).limit(100), True),
+    ("bom by item", "boms", lambda v: select(BOM.id).filter(BOM.item_id == v["item"]).limit(1), False),
+]
+
+INDEX_NODES = ("Index Scan", "Index Only Scan", "Bitmap Heap Scan")
+
+
+@pytest.mark.parametrize("name,table,build,ordered", HOT_QUERIES, ids=[q[0] for q in HOT_QUERIES])
+def test_hot_query_plan(plan_session, volume, name, table, build, ordered):
+    plan = explain(plan_session, build(volume))
+    plan_nodes = list(nodes(plan))
+
+    assert not [n for n in plan_nodes if n["Node Type"] == "Seq Scan" and n.get("Relation Name") == table], \
+        f"{name}: sequential scan on {table}"
+    assert [n for n in plan_nodes if n["Node Type"] in INDEX_NODES and n.get("Relation Name") == table], \
+        f"{name}: {table} is not read through an index"
+    if ordered:
+        # Sorting about one page of matches is fine; sorting the table to cut a page from it is not
+        sorted_rows = max((n["Plans"][0]["Actual Rows"] for n in plan_nodes if n["Node Type"] == "Sort"), default=0)
+        assert sorted_rows <= 2 * plan["Actual Rows"], f"{name}: sorts {sorted_rows} rows for a {plan['Actual Rows']} row page"
+
+    budget = BUFFER_OVERHEAD + BUFFERS_PER_ROW * plan["Actual Rows"]
+    buffers = plan["Shared Hit Blocks"] + plan["Shared Read Blocks"]
+    assert buffers <= budget, f"{name}: {buffers} shared buffers for {plan['Actual Rows']} rows (budget {budget})"
@@ -0,0 +1,32 @@
+from app.core.read_routing import ReadYourWrites
+from app.core.security import create_access_token, token_subject
+
+def test_write_pins_user_to_primary(monkeypatch):
+    monkeypatch.setenv("DB_REPLICA_STICKY_SECONDS", "30")
+    tracker = ReadYourWrites()
+    assert not tracker.pinned("user-1")
+
+    tracker.mark_write("user-1")
+    assert tracker.pinned("user-1")
+    assert not tracker.pinned("user-2")
+    assert not tracker.pinned(None)
+
+def test_pin_expires(monkeypatch):
+    monkeypatch.setenv("DB_REPLICA_STICKY_SECONDS", "0")
+    tracker = ReadYourWrites()
+    tracker.mark_write("user-1")
+    assert not tracker.pinned("user-1")
+
+def test_token_subject_from_header():
+    token = create_access_token(subject="abc")
+    assert token_subject(f"Bearer {token}") == "abc"
+    assert token_subject("Bearer not-a-token") is None
+    assert token_subject(None) is None
+
+def test_trackers_do_not_pile_up_bus_handlers():
+    from app.core.invalidation import invalidation_bus
+
+    before = len(invalidation_bus._handlers["primary_sticky"])
+    ReadYourWrites()
+    ReadYourWrites()
+    assert len(invalidation_bus._handlers["primary_sticky"]) == before
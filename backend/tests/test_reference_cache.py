@@ -0,0 +1,97 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from app.core import reference_cache as refmod
+from app.core.reference_cache import ReferenceCache, RefTable
+
+
+def _uom_loader(calls, during_load=None):
+    async def load(db):
+        calls.append(1)
+        if during_load:
+            during_load()
+        rows = [SimpleNamespace(id=f"id-{len(calls)}", name=f"pcs-{len(calls)}")]
+        return {"uoms": RefTable(rows, key=lambda r: r.name)}
+    return load
+
+
+def test_reference_cache_serves_from_memory_until_bumped(monkeypatch):
+    calls = []
+    monkeypatch.setitem(refmod._LOADERS, "uoms", _uom_loader(calls))
+    cache = ReferenceCache(ttl=60)
+
+    table = asyncio.run(cache.table(None, "uoms"))
+    assert table.id_for("pcs-1") == "id-1"
+    asyncio.run(cache.table(None, "uoms"))
+    assert len(calls) == 1
+
+    cache._invalidate("uoms")
+    assert cache.version("uoms") == 1
+    assert asyncio.run(cache.table(None, "uoms")).lookup("pcs-2") is not None
+    assert len(calls) == 2
+
+
+def test_reference_cache_drops_load_raced_by_bump(monkeypatch):
+    calls = []
+    cache = ReferenceCache(ttl=60)
+    # A change lands while the table is being read: that result is not cached
+    monkeypatch.setitem(refmod._LOADERS, "uoms", _uom_loader(calls, during_load=lambda: cache._invalidate("uoms") if len(calls) == 1 else None))
+
+    asyncio.run(cache.table(None, "uoms"))
+    asyncio.run(cache.table(None, "uoms"))
+    assert len(calls) == 2
+    asyncio.run(cache.table(None, "uoms"))
+    assert len(calls) == 2
+
+
+def test_reference_cache_reloads_on_miss(monkeypatch):
+    calls = []
+    monkeypatch.setitem(refmod._LOADERS, "uoms", _uom_loader(calls))
+    cache = ReferenceCache(ttl=60)
+
+    asyncio.run(cache.table(None, "uoms"))
+    # Created outside the routers: the cached table does not have it yet
+    assert asyncio.run(cache.lookup(None, "uoms", "pcs-2")) is not None
+    assert len(calls) == 2
+    assert asyncio.run(cache.lookup(None, "uoms", "pcs-2")) is not None
+    assert len(calls) == 2
+
+
+def test_unknown_attribute_values_raise(monkeypatch):
+    async def load(db):
+        return {"attributes": RefTable([], key=lambda r: r.name), "attribute_values": RefTable([], key=lambda r: r.value)}
+    monkeypatch.setitem(refmod._LOADERS, "attributes", load)
+    cache = ReferenceCache(ttl=60)
+
+    with pytest.raises(LookupError, match="00000000-0000-0000-0000-000000000001"):
+        asyncio.run(cache.attribute_values(None, ["00000000-0000-0000-0000-000000000001"]))
+
+
+def test_bump_applies_on_commit_and_is_relayed(monkeypatch):
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.orm import Session
+    from app.core import outbox_relay
+    from app.models.outbox import OutboxEvent
+
+    engine = create_engine("sqlite://")
+    OutboxEvent.__table__.create(engine)
+    cache = ReferenceCache(ttl=60)
+
+    with Session(engine) as session:
+        cache.bump(session, "uoms")
+        session.rollback()
+        assert cache.version("uoms") == 0
+
+        cache.bump(session, "uoms")
+        assert cache.version("uoms") == 0
+        session.commit()
+        assert cache.version("uoms") == 1
+
+        event = session.scalars(select(OutboxEvent)).one()
+        assert (event.topic, event.payload) == ("INVALIDATE", {"type": "INVALIDATE", "kind": "refdata", "key": "uoms"})
+
+    # The relay publishes it to the other workers
+    published = []
+    monkeypatch.setattr(outbox_relay.invalidation_bus, "publish", lambda kind, key=None: published.append((kind, key)))
+    asyncio.run(outbox_relay._invalidation_handler(None, event.topic, event.payload))
+    assert published == [("refdata", "uoms")]
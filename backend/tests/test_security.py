@@ -0,0 +1,34 @@
+import asyncio
+from passlib.context import CryptContext
+from app.core import security
+from app.core.kdf_pool import KDFPool
+
+
+def test_verify_and_update_rehashes_when_cost_changes():
+    old_context = CryptContext(schemes=["pbkdf2_sha256"], pbkdf2_sha256__default_rounds=1000)
+    legacy_hash = old_context.hash("secret")
+
+    valid, new_hash = security.verify_and_update("secret", legacy_hash)
+    assert valid
+    assert new_hash and f"${security.PASSWORD_HASH_ROUNDS}$" in new_hash
+    assert security.verify_and_update("secret", new_hash) == (True, None)
+
+    assert security.verify_and_update("wrong", legacy_hash) == (False, None)
+
+
+def test_kdf_pool_verifies_off_loop_and_reports_stats():
+    pool = KDFPool()
+    pool.mode = "thread"
+    hashed = security.get_password_hash("secret")
+
+    async def run():
+        return await asyncio.gather(*(pool.verify_and_update("secret", hashed) for _ in range(4)))
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        pool.shutdown()
+
+    assert results == [(True, None)] * 4
+    stats = pool.stats()
+    assert stats["completed"] == 4 and stats["in_flight"] == 0
@@ -0,0 +1,40 @@
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+from app.db.base import Base
+from app.db.seed import FIXTURES, apply_fixtures
+from app.models.auth import Role, User
+from app.models.category import Category
+
+
+def test_fixtures_apply_once_and_keep_existing_rows():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    assert apply_fixtures(engine)
+    assert not apply_fixtures(engine)
+
+    with Session(engine) as session:
+        assert session.scalar(select(func.count()).select_from(User)) == len(FIXTURES["users"])
+        admin = session.scalars(select(User).filter(User.username == "admin")).one()
+        assert {p.code for p in admin.role.permissions} == set(FIXTURES["roles"]["Administrator"])
+        admin.hashed_password = "changed"
+        session.commit()
+
+    # A changed fixture set adds what is new and leaves existing rows alone
+    fixtures = {**FIXTURES, "categories": FIXTURES["categories"] + ["Packaging"]}
+    assert apply_fixtures(engine, fixtures)
+    with Session(engine) as session:
+        assert session.scalar(select(func.count()).select_from(Category)) == len(fixtures["categories"])
+        assert session.scalar(select(func.count()).select_from(Role)) == len(FIXTURES["roles"])
+        assert session.scalars(select(User.hashed_password).filter(User.username == "admin")).one() == "changed"
+
+
+def test_default_password_is_hashed_once(monkeypatch):
+    import app.db.seed as seed
+    calls = []
+    monkeypatch.setattr(seed, "get_password_hash", lambda password: calls.append(password) or "hashed")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    apply_fixtures(engine)
+    assert calls == [seed.DEFAULT_PASSWORD]
@@ -0,0 +1,81 @@
+import asyncio
+import sqlite3
+from app.core.db_manager import DatabaseManager
+from app.core.snapshots import SnapshotService
+
+
+def make_service(tmp_path):
+    mgr = DatabaseManager()
+    mgr._snapshots_dir = tmp_path / "snapshots"
+    mgr._snapshots_dir.mkdir()
+    mgr.initialize(f"sqlite:///{tmp_path / 'live.db'}")
+    with sqlite3.connect(tmp_path / "live.db") as conn:
+        conn.execute("CREATE TABLE marker (value TEXT)")
+        conn.execute("INSERT INTO marker VALUES ('before')")
+    return mgr, SnapshotService(mgr)
+
+
+async def wait_for(service, job_id):
+    while (job := await service.get_job(job_id))["status"] == "running":
+        await asyncio.sleep(0.01)
+    return job
+
+
+def test_snapshot_job_compresses_and_indexes(tmp_path):
+    mgr, service = make_service(tmp_path)
+
+    async def run():
+        job = await service.start_snapshot("test")
+        assert (await service.list_snapshots())[0]["status"] == "running"
+        return await wait_for(service, job["id"])
+
+    job = asyncio.run(run())
+    assert job["status"] == "done"
+    filename = job["result"]["filename"]
+    assert filename.endswith(".sqlite.gz")
+
+    [entry] = asyncio.run(service.list_snapshots())
+    assert entry["status"] == "ready"
+    assert entry["size"] == mgr.get_snapshot_path(filename).stat().st_size
+
+
+def test_restore_goes_into_a_new_database(tmp_path):
+    mgr, service = make_service(tmp_path)
+
+    async def run():
+        job = await service.start_snapshot("test")
+        return await wait_for(service, job["id"])
+
+    filename = asyncio.run(run())["result"]["filename"]
+    with sqlite3.connect(tmp_path / "live.db") as conn:
+        conn.execute("UPDATE marker SET value = 'after'")
+
+    res = mgr.prepare_restore(filename)
+    assert res.status
+    restored = res.data["url"].replace("sqlite:///", "")
+    with sqlite3.connect(restored) as conn:
+        assert conn.execute("SELECT value FROM marker").fetchone() == ("before",)
+    # The live database is untouched until the caller switches
+    assert mgr.current_url.endswith("live.db")
+
+
+def test_index_is_rebuilt_for_existing_files(tmp_path):
+    mgr, service = make_service(tmp_path)
+    (mgr.snapshots_dir / "snapshot_old.sql").write_text("-- legacy")
+    (mgr.snapshots_dir / "notes.txt").write_text("ignored")
+
+    assert [s["name"] for s in asyncio.run(service.list_snapshots())] == ["snapshot_old.sql"]
+    assert mgr.get_snapshot_path("../../etc/passwd").parent == mgr.snapshots_dir
+
+
+def test_old_restore_databases_are_pruned(tmp_path):
+    mgr, _ = make_service(tmp_path)
+    for stamp in ("20260101_000000", "20260102_000000", "20260103_000000"):
+        (tmp_path / f"live_restore_{stamp}.db").write_bytes(b"")
+    mgr.initialize(f"sqlite:///{tmp_path / 'live_restore_20260102_000000.db'}")
+
+    assert mgr.prune_restores(1) == ["live_restore_20260101_000000.db"]
+    # The active database and the original are kept even when past the limit
+    assert sorted(p.name for p in tmp_path.glob("live*.db")) == [
+        "live.db", "live_restore_20260102_000000.db", "live_restore_20260103_000000.db"
+    ]
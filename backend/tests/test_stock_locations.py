@@ -138,3 +138,151 @@ def test_stock_movement(client, auth_headers):
         finally:
             real_session.close()
             real_conn.close()
+
+
+def test_stock_bulk_load(client, auth_headers):
+    """Opening balance, then a cycle count: only the differences are posted."""
+    import uuid as _uuid
+    from app.db.session import engine
+    from sqlalchemy.orm import Session as SASession
+    from app.models.item import Item
+    from app.models.location import Location
+    from app.models.stock_ledger import StockLedger
+    from app.models.stock_balance import StockBalance
+
+    suffix = str(_uuid.uuid4())[:8]
+    item_code = f"BULK-ITEM-{suffix}"
+    location_code = f"BULK-WH-{suffix}"
+
+    real_conn = engine.connect()
+    real_session = SASession(real_conn)
+    item = Item(code=item_code, name=f"Bulk Load Item {suffix}", uom="pcs")
+    real_session.add_all([item, Location(code=location_code, name=f"Bulk WH {suffix}")])
+    real_session.commit()
+    item_id = str(item.id)
+
+    def load(rows, **params):
+        content = "Item Code,Location Code,Qty,Attributes\n" + "".join(f"{r}\n" for r in rows)
+        return client.post(
+            "/api/stock/bulk-load",
+            params=params,
+            files={"file": ("stock.csv", content.encode(), "text/csv")},
+            headers=auth_headers,
+        )
+
+    def on_hand():
+        balances = client.get("/api/stock/balance", headers=auth_headers).json()
+        return sum(float(b["qty"]) for b in balances if b["item_id"] == item_id)
+
+    try:
+        resp = load([f"{item_code},{location_code},10,"], mode="opening")
+        assert resp.status_code == 200, resp.text
+        assert resp.json()["posted"] == 1
+        assert on_hand() == 10.0
+
+        rows = [
+            f"{item_code},{location_code},7,",
+            f"NOPE-{suffix},{location_code},1,",
+            f"{item_code},{location_code},abc,",
+            f"{item_code},{location_code},7,",
+            f"{item_code},{location_code},1,Color=Nope",
+        ]
+        preview = load(rows, mode="count", dry_run="true").json()
+        assert preview["status"] == "dry_run"
+        assert preview["variances"][0]["on_hand"] == 10.0
+        assert preview["variances"][0]["variance"] == -3.0
+        assert on_hand() == 10.0
+
+        data = load(rows, mode="count").json()
+        assert data["posted"] == 1
+        assert data["errors"] == [
+            f"Row 2: Item 'NOPE-{suffix}' not found",
+            "Row 3: Qty must be a number",
+            "Row 4: Duplicate of row 1",
+            "Row 5: Unknown attribute value 'Color=Nope'",
+        ]
+        assert on_hand() == 7.0
+
+        # Counting the same quantity again posts nothing
+        assert load([f"{item_code},{location_code},7,"], mode="count").json()["unchanged"] == 1
+    finally:
+        real_session.query(StockLedger).filter(StockLedger.item_id == item.id).delete(synchronize_session=False)
+        real_session.query(StockBalance).filter(StockBalance.item_id == item.id).delete(synchronize_session=False)
+        real_session.query(Item).filter(Item.id == item.id).delete(synchronize_session=False)
+        real_session.query(Location).filter(Location.code == location_code).delete(synchronize_session=False)
+        real_session.commit()
+        real_session.close()
+        real_conn.close()
+
+
+def test_stock_balance_query(client, auth_headers):
+    """Filtered, grouped and paginated balances, plus the streamed export."""
+    import uuid as _uuid
+    from app.db.session import engine
+    from sqlalchemy.orm import Session as SASession
+    from app.models.item import Item
+    from app.models.location import Location
+    from app.models.stock_ledger import StockLedger
+    from app.models.stock_balance import StockBalance
+
+    suffix = str(_uuid.uuid4())[:8]
+    item_code = f"BALQ-ITEM-{suffix}"
+    locations = [Location(code=f"BALQ-WH{n}-{suffix}", name=f"Balance WH {n} {suffix}") for n in (1, 2)]
+
+    real_conn = engine.connect()
+    real_session = SASession(real_conn)
+    item = Item(code=item_code, name=f"Balance Query Item {suffix}", uom="pcs", category=f"BALQ-{suffix}")
+    real_session.add_all([item, *locations])
+    real_session.commit()
+    item_id = str(item.id)
+
+    content = "Item Code,Location Code,Qty,Attributes\n" + "".join(
+        f"{item_code},{loc.code},{qty},\n" for loc, qty in zip(locations, (4, 6))
+    )
+    try:
+        resp = client.post(
+            "/api/stock/bulk-load",
+            files={"file": ("stock.csv", content.encode(), "text/csv")},
+            headers=auth_headers,
+        )
+        assert resp.status_code == 200, resp.text
+
+        def query(**params):
+            resp = client.get("/api/stock/balances", params=params, headers=auth_headers)
+            assert resp.status_code == 200, resp.text
+            return resp.json()
+
+        rows = query(item_id=item_id)
+        assert rows["total"] == 2
+        assert sorted(r["qty"] for r in rows["items"]) == [4.0, 6.0]
+        assert rows["items"][0]["variant_id"] == 0
+
+        page = query(item_id=item_id, limit=1, skip=1)
+        assert page["total"] == 2 and page["size"] == 1 and page["page"] == 2
+
+        by_item = query(group_by="item", category=f"BALQ-{suffix}")
+        assert by_item["items"] == [{"item_id": item_id, "qty": 10.0}]
+
+        by_location = query(group_by="location", location_id=str(locations[1].id))
+        assert by_location["items"] == [{"location_id": str(locations[1].id), "qty": 6.0}]
+
+        resp = client.get(
+            "/api/stock/balances/export",
+            params={"group_by": "item", "item_id": item_id},
+            headers=auth_headers,
+        )
+        assert resp.status_code == 200, resp.text
+        assert resp.text.splitlines() == ["item_id,qty", f"{item_id},10.0"]
+    finally:
+        try:
+            real_session.query(StockLedger).filter(StockLedger.item_id == item.id).delete(synchronize_session=False)
+            real_session.query(StockBalance).filter(StockBalance.item_id == item.id).delete(synchronize_session=False)
+            real_session.query(Item).filter(Item.id == item.id).delete(synchronize_session=False)
+            for loc in locations:
+                real_session.query(Location).filter(Location.id == loc.id).delete(synchronize_session=False)
+            real_session.commit()
+        except Exception:
+            real_session.rollback()
+        finally:
+            real_session.close()
+            real_conn.close()
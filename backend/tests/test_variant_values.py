@@ -0,0 +1,57 @@
+import uuid
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from app.db.base import Base
+from app.models.attribute import Attribute, AttributeValue
+from app.models.stock_ledger import StockLedger
+from app.models.variant_values import canonical_value_ids, variant_cache
+
+
+def test_canonical_value_ids_sorts_and_dedupes():
+    a, b = uuid.UUID(int=2), uuid.UUID(int=1)
+    assert canonical_value_ids([a, str(b), a]) == [b, a]
+
+
+def test_attribute_value_ids_follow_relationship_on_flush():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        attribute = Attribute(name="Color")
+        session.add(attribute)
+        session.flush()
+        values = [AttributeValue(attribute_id=attribute.id, value=v) for v in ("Red", "Blue")]
+        entry = StockLedger(item_id=uuid.uuid4(), location_id=uuid.uuid4(), qty_change=1, reference_type="test", reference_id="1")
+        entry.attribute_values = values
+        session.add(entry)
+        session.commit()
+
+        expected = sorted((v.id for v in values), key=str)
+        assert entry.attribute_value_ids == expected
+
+        session.expire_all()
+        assert session.get(StockLedger, entry.id).attribute_value_ids == expected
+
+
+def test_variant_id_interns_each_set_once():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    variant_cache.clear()
+    with Session(engine) as session:
+        attribute = Attribute(name="Size")
+        session.add(attribute)
+        session.flush()
+        values = [AttributeValue(attribute_id=attribute.id, value=v) for v in ("S", "M")]
+        entries = []
+        for attribute_values in (values, list(reversed(values)), []):
+            entry = StockLedger(item_id=uuid.uuid4(), location_id=uuid.uuid4(), qty_change=1, reference_type="test", reference_id="1")
+            entry.attribute_values = attribute_values
+            session.add(entry)
+            entries.append(entry)
+        session.commit()
+
+        # Same set in any order is one id; no attributes is id 0
+        assert entries[0].variant_id == entries[1].variant_id != 0
+        assert entries[2].variant_id == 0
+        assert variant_cache.cached([v.id for v in values]) == entries[0].variant_id
+        assert variant_cache.intern_many(session, [[uuid.uuid4()]], create=False) == [None]
+    variant_cache.clear()
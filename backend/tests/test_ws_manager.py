@@ -0,0 +1,120 @@
+import asyncio
+import json
+from app.core.ws_manager import ConnectionManager
+from app.core.event_stream import LocalEventStream
+
+
+class FakeSocket:
+    def __init__(self):
+        self.frames = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data):
+        self.frames.append(data)
+
+    @property
+    def events(self):
+        return [json.loads(f) for f in self.frames]
+
+
+def test_broadcast_coalesces_per_topic():
+    async def run():
+        mgr = ConnectionManager()
+        mgr.coalesce_window = 0.02
+        sock_a, sock_b = FakeSocket(), FakeSocket()
+        mgr.active_connections = [sock_a, sock_b]
+
+        for i in range(5):
+            await mgr.broadcast({"type": "WORK_ORDER_UPDATE", "wo_id": str(i)})
+        await mgr.broadcast({"type": "STOCK_UPDATE", "item_id": "x"})
+        assert sock_a.frames == []
+
+        await asyncio.sleep(0.05)
+        return mgr, sock_a, sock_b
+
+    mgr, sock_a, sock_b = asyncio.run(run())
+
+    # One frame per topic, identical encoded text for every socket
+    assert len(sock_a.frames) == 2
+    assert sock_a.frames == sock_b.frames
+    wo_frame, stock_frame = sock_a.events
+    assert [e["wo_id"] for e in wo_frame["data"]] == ["0", "1", "2", "3", "4"]
+    assert stock_frame["data"] == {"type": "STOCK_UPDATE", "item_id": "x"}
+    assert wo_frame["id"] < stock_frame["id"]
+
+
+def test_broadcast_without_window_sends_immediately_and_drops_dead_sockets():
+    class DeadSocket:
+        async def send_text(self, data):
+            raise RuntimeError("closed")
+
+    async def run():
+        mgr = ConnectionManager()
+        mgr.coalesce_window = 0
+        sock, dead = FakeSocket(), DeadSocket()
+        mgr.active_connections = [sock, dead]
+        await mgr.broadcast({"type": "WORK_ORDER_UPDATE", "wo_id": "1"})
+        return mgr, sock, dead
+
+    mgr, sock, dead = asyncio.run(run())
+    assert len(sock.frames) == 1
+    assert dead not in mgr.active_connections
+
+
+def test_reconnect_replays_missed_events():
+    async def run():
+        mgr = ConnectionManager()
+        mgr.coalesce_window = 0
+        first = FakeSocket()
+        await mgr.connect(first)
+        await mgr.broadcast({"type": "WORK_ORDER_UPDATE", "wo_id": "1"})
+        seen_id = first.events[-1]["id"]
+
+        # Client drops off; events keep flowing
+        mgr.disconnect(first)
+        await mgr.broadcast({"type": "WORK_ORDER_UPDATE", "wo_id": "2"})
+        await mgr.broadcast({"type": "WORK_ORDER_UPDATE", "wo_id": "3"})
+
+        resumed = FakeSocket()
+        await mgr.connect(resumed, last_event_id=seen_id)
+        await mgr.broadcast({"type": "WORK_ORDER_UPDATE", "wo_id": "4"})
+        return resumed
+
+    resumed = asyncio.run(run())
+    assert [e["data"]["wo_id"] for e in resumed.events] == ["2", "3", "4"]
+
+
+def test_reconnect_with_unknown_position_requests_resync():
+    async def run():
+        mgr = ConnectionManager()
+        sock = FakeSocket()
+        await mgr.connect(sock, last_event_id="1-0")
+        return sock
+
+    sock = asyncio.run(run())
+    assert sock.events == [{"id": None, "data": {"type": "RESYNC"}}]
+
+
+def test_resync_only_when_missed_events_were_trimmed():
+    async def run():
+        mgr = ConnectionManager()
+        mgr.coalesce_window = 0
+        mgr.stream = LocalEventStream(maxlen=2)
+        ids = []
+        for n in range(3):
+            await mgr.broadcast({"type": "WORK_ORDER_UPDATE", "wo_id": str(n)})
+            ids.append(mgr.last_delivered_id)
+
+        # The client's own last event was trimmed, but everything after it is still there
+        caught_up = FakeSocket()
+        await mgr.connect(caught_up, last_event_id=ids[0])
+        # An event the client never saw is gone
+        behind = FakeSocket()
+        await mgr.connect(behind, last_event_id="1-0")
+        return caught_up, behind
+
+    caught_up, behind = asyncio.run(run())
+    assert [e["data"]["wo_id"] for e in caught_up.events] == ["1", "2"]
+    assert behind.events == [{"id": None, "data": {"type": "RESYNC"}}]
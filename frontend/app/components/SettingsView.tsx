@@ -216,6 +216,20 @@ export default function SettingsView({
       } catch (e) { console.error("Snapshot fetch failed", e); }
   };
 
+  // Snapshot and restore run as background jobs on the server; poll until they finish
+  const waitForJob = async (jobId: string, onProgress?: () => void) => {
+      while (true) {
+          await new Promise(resolve => setTimeout(resolve, 1000));
+          const res = await fetch(`${API_BASE}/admin/database/jobs/${jobId}`, {
+              headers: { 'Authorization': `Bearer ${localStorage.getItem('access_token')}` }
+          });
+          if (!res.ok) throw new Error('Job status unavailable');
+          const job = await res.json();
+          if (job.status !== 'running') return job;
+          onProgress?.();
+      }
+  };
+
   const handleCreateSnapshot = async () => {
       setIsSnapshotLoading(true);
       try {
@@ -224,7 +238,11 @@ export default function SettingsView({
               headers: { 'Authorization': `Bearer ${localStorage.getItem('access_token')}` }
           });
           if (res.ok) {
-              showToast('Snapshot created successfully', 'success');
+              const { data: job } = await res.json();
+              fetchSnapshots();
+              const finished = await waitForJob(job.id, fetchSnapshots);
+              if (finished.status === 'done') showToast('Snapshot created successfully', 'success');
+              else showToast(`Snapshot failed: ${finished.error}`, 'danger');
               fetchSnapshots();
           }
       } catch (e) { showToast('Failed to create snapshot', 'danger'); }
@@ -248,7 +266,7 @@ export default function SettingsView({
   };
 
   const handleRestoreSnapshot = async (filename: string) => {
-      requestConfirm('Restore Snapshot?', `Are you sure you want to restore "${filename}"? Current data will be overwritten.`, async () => {
+      requestConfirm('Restore Snapshot?', `Are you sure you want to restore "${filename}"? The snapshot is loaded into a new database and all users are switched to it.`, async () => {
           setIsSnapshotLoading(true);
           try {
               const res = await fetch(`${API_BASE}/admin/database/snapshots/${filename}/restore`, {
@@ -256,8 +274,14 @@ export default function SettingsView({
                   headers: { 'Authorization': `Bearer ${localStorage.getItem('access_token')}` }
               });
               if (res.ok) {
-                  showToast('Database restored successfully!', 'success');
-                  window.location.reload();
+                  const { data: job } = await res.json();
+                  const finished = await waitForJob(job.id);
+                  if (finished.status === 'done') {
+                      showToast('Database restored successfully!', 'success');
+                      window.location.reload();
+                  } else {
+                      showToast(`Restore failed: ${finished.error}`, 'danger');
+                  }
               } else {
                   const err = await res.json();
                   showToast(`Restore failed: ${err.detail}`, 'danger');
@@ -707,7 +731,7 @@ export default function SettingsView({
                                     >
                                         <td style={classic ? { ...tdBase, fontFamily: "'Courier New', monospace", fontSize: '10px' } : undefined} className={classic ? '' : 'ps-4 font-monospace'}>{s.name}</td>
                                         <td style={classic ? tdBase : undefined}>{new Date(s.created_at).toLocaleString()}</td>
-                                        <td style={classic ? tdBase : undefined}>{(s.size / 1024 / 1024).toFixed(2)} MB</td>
+                                        <td style={classic ? tdBase : undefined}>{s.status === 'running' ? `In progress (${Math.round((s.progress || 0) * 100)}%)` : `${(s.size / 1024 / 1024).toFixed(2)} MB`}</td>
                                         <td style={classic ? { ...tdBase, borderRight: 'none', textAlign: 'right' as const } : undefined} className={classic ? '' : 'text-end pe-4'}>
                                             <div style={classic ? { display: 'flex', gap: 4, justifyContent: 'flex-end' } : undefined} className={classic ? '' : 'd-flex gap-2 justify-content-end'}>
                                                 {classic ? (
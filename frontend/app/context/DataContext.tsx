@@ -250,16 +250,32 @@ export function DataProvider({ children }: { children: React.ReactNode }) {
         const wsUrl = API_BASE.replace(/^http/, 'ws') + '/ws/events';
         let ws: WebSocket;
         let reconnectTimer: any;
+        // Stream position of the last frame seen; sent on reconnect to replay missed events
+        let lastEventId: string | null = null;
 
         const connect = () => {
-            ws = new WebSocket(wsUrl);
+            ws = new WebSocket(lastEventId ? `${wsUrl}?last_event_id=${encodeURIComponent(lastEventId)}` : wsUrl);
             ws.onmessage = (event) => {
                 try {
-                    const data = JSON.parse(event.data);
-                    if (data.type === 'WORK_ORDER_UPDATE') {
-                        setWorkOrders((prev: any) => prev.map((wo: any) => wo.id === data.wo_id ? { ...wo, status: data.status, actual_start_date: data.actual_start_date, actual_end_date: data.actual_end_date } : wo));
+                    const envelope = JSON.parse(event.data);
+                    if (envelope.id) lastEventId = envelope.id;
+                    // Bursts are coalesced server-side into array frames
+                    const parsed = envelope.data;
+                    const events: any[] = Array.isArray(parsed) ? parsed : [parsed];
+                    if (events.some((e: any) => e.type === 'RESYNC')) {
                         fetchDataRef.current();
-                        showToast(`Work Order ${data.code} updated: ${data.status}`, 'info');
+                        return;
+                    }
+                    const woUpdates = events.filter((e: any) => e.type === 'WORK_ORDER_UPDATE');
+                    if (woUpdates.length > 0) {
+                        const byId = new Map(woUpdates.map((e: any) => [e.wo_id, e]));
+                        setWorkOrders((prev: any) => prev.map((wo: any) => {
+                            const data: any = byId.get(wo.id);
+                            return data ? { ...wo, status: data.status, actual_start_date: data.actual_start_date, actual_end_date: data.actual_end_date } : wo;
+                        }));
+                        fetchDataRef.current();
+                        const last = woUpdates[woUpdates.length - 1];
+                        showToast(woUpdates.length === 1 ? `Work Order ${last.code} updated: ${last.status}` : `${woUpdates.length} Work Orders updated`, 'info');
                     }
                 } catch (e) { console.error("WS Error", e); }
             };